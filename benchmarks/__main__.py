@@ -0,0 +1,159 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Dict, List, Optional
+from benchmarks.generator import add_workload_arguments, workload_options, write_workload
+from shipments.__main__ import build_rules
+from shipments.bulkio import read_lines_bulk, write_lines_bulk
+from shipments.parser import parse_line
+
+# -----------------------------
+# Pipeline benchmark suite
+# -----------------------------
+# Times each stage of the pricing pipeline separately: reading input, parsing,
+# every DiscountRule subclass, output formatting and writing. The input is
+# processed in chunks, each stage over a whole chunk at a time (each rule is
+# applied to all of a chunk's shipments in input order, which is equivalent
+# to the per-shipment loop), so memory stays bounded for very large inputs.
+# Results are written as JSON so runs can be compared between commits.
+#
+# Usage:
+#   python -m benchmarks --lines 1000000 --seed 1 -o results.json
+#   python -m benchmarks --input workload.txt --compare baseline.json
+# -----------------------------
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(input_file: str, chunk_size: int = 100000) -> Dict[str, float]:
+    """
+    Runs the pipeline over input_file and returns seconds spent per stage.
+    """
+    rules = build_rules()
+    context: Dict = {}
+    stages: Dict[str, float] = {'read': 0.0, 'parse': 0.0}
+    for rule in rules:
+        stages[f'rule.{type(rule).__name__}'] = 0.0
+    stages.update({'format': 0.0, 'write': 0.0})
+    clock = time.perf_counter
+    # The same bulk reader and writer as python -m shipments
+    with open(os.devnull, 'wb') as out:
+        lines_iter = read_lines_bulk(input_file)
+        while True:
+            start = clock()
+            lines: List[str] = list(islice(lines_iter, chunk_size))
+            stages['read'] += clock() - start
+            if not lines:
+                break
+
+            start = clock()
+            shipments = [parse_line(line) for line in lines]
+            stages['parse'] += clock() - start
+
+            valid = [shipment for shipment in shipments if shipment is not None]
+            for rule in rules:
+                apply = rule.apply
+                start = clock()
+                for shipment in valid:
+                    apply(shipment, context)
+                stages[f'rule.{type(rule).__name__}'] += clock() - start
+
+            start = clock()
+            results = [shipment.output_line() if shipment is not None and not shipment.ignored
+                       else f"{line.strip()} Ignored" for line, shipment in zip(lines, shipments)]
+            stages['format'] += clock() - start
+
+            start = clock()
+            write_lines_bulk(results, out)
+            stages['write'] += clock() - start
+    return stages
+
+
+def count_lines(input_file: str) -> int:
+    with open(input_file, 'rb') as f:
+        return sum(chunk.count(b'\n') for chunk in iter(lambda: f.read(1 << 20), b''))
+
+
+def report(stages: Dict[str, float], lines: int, meta: Dict) -> Dict:
+    """
+    Builds the JSON report for one run.
+    """
+    total = sum(stages.values())
+    return {
+        'meta': meta,
+        'lines': lines,
+        'total_seconds': total,
+        'lines_per_second': lines / total if total else 0.0,
+        'stages': {name: {'seconds': seconds, 'ns_per_line': seconds * 1e9 / lines if lines else 0.0,
+                          'share': seconds / total if total else 0.0}
+                   for name, seconds in stages.items()},
+    }
+
+
+def compare(baseline: Dict, current: Dict) -> str:
+    """
+    Formats a per-stage comparison of two reports (ratio > 1 means the current run is slower).
+    """
+    rows = [f"{'stage':<36}{'baseline ns':>14}{'current ns':>14}{'ratio':>8}"]
+    for name, stage in current['stages'].items():
+        before = baseline['stages'].get(name, {}).get('ns_per_line')
+        ratio = f"{stage['ns_per_line'] / before:.2f}" if before else '-'
+        before_text = f"{before:.1f}" if before is not None else '-'
+        rows.append(f"{name:<36}{before_text:>14}{stage['ns_per_line']:>14.1f}{ratio:>8}")
+    return '\n'.join(rows)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='Pricing pipeline benchmark suite')
+    add_workload_arguments(parser)
+    parser.add_argument('--input', help='benchmark an existing input file instead of a generated workload')
+    parser.add_argument('--chunk-size', type=int, default=100000)
+    parser.add_argument('-o', '--output', help='write the JSON report here (default: stdout)')
+    parser.add_argument('--compare', metavar='BASELINE', help='print a comparison against an earlier JSON report')
+    args = parser.parse_args()
+
+    meta = {
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        input_file = args.input
+        if input_file is None:
+            input_file = os.path.join(tmp, 'workload.txt')
+            options = workload_options(args)
+            with open(input_file, 'w') as f:
+                write_workload(f, args.lines, **options)
+            meta['workload'] = {key: (value.isoformat() if hasattr(value, 'isoformat') else value)
+                                for key, value in options.items()}
+            meta['workload']['lines'] = args.lines
+        else:
+            meta['input'] = input_file
+        result = report(run_suite(input_file, args.chunk_size), count_lines(input_file), meta)
+
+    text = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            print(compare(json.load(f), result), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
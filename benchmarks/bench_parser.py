@@ -0,0 +1,55 @@
+import re
+import sys
+import timeit
+from datetime import datetime
+from typing import List, Optional
+from shipments.config import Shipment
+from shipments.parser import parse_line
+
+# -----------------------------
+# Parser microbenchmark
+# -----------------------------
+# Compares the fast-path parser in shipments.parser against the original
+# per-line regex + datetime.strptime implementation.
+#
+# Usage: python -m benchmarks.bench_parser [INPUT_FILE] [REPEAT]
+# -----------------------------
+
+
+def legacy_parse_line(line: str) -> Optional[Shipment]:
+    """
+    The original parser: full regex match and strptime on every line.
+    """
+    pattern = r"^(\d{4}-\d{2}-\d{2})\s+(XS|S|M|L|XL)\s+(LP|MR)\s+(\w+)\s+(\w+)$"
+    match = re.match(pattern, line.strip())
+    if match:
+        date, size, provider, origin, destination = match.groups()
+        try:
+            datetime.strptime(date, "%Y-%m-%d")
+        except ValueError:
+            return None
+        return Shipment(date, size, provider, origin, destination)
+    return None
+
+
+def bench(lines: List[str], repeat: int = 5) -> None:
+    """
+    Times both parsers over the given lines and prints the per-line cost.
+    """
+    for name, parse in (('legacy', legacy_parse_line), ('fast', parse_line)):
+        best = min(timeit.repeat(lambda: [parse(line) for line in lines], number=1, repeat=repeat))
+        print(f"{name:>8}: {best * 1e9 / len(lines):8.1f} ns/line ({len(lines)} lines, best of {repeat})")
+
+
+def main() -> None:
+    input_file = sys.argv[1] if len(sys.argv) > 1 else 'input.txt'
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    with open(input_file, 'r') as f:
+        lines = f.readlines()
+    # Small inputs are repeated so that timings are not dominated by noise
+    lines = lines * max(1, 100000 // max(1, len(lines)))
+    bench(lines, repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+import sys
+import timeit
+from typing import List, Optional
+from shipments.config import PRICE_TABLE, POPULAR_PAIRS_DISCOUNTS, Shipment
+from shipments.parser import parse_line
+from shipments.rules import CityRule, DiscountRule, LowestSPriceRule, PopularPairDiscountRule
+
+# -----------------------------
+# Rule-table benchmark
+# -----------------------------
+# Compares the per-shipment cost of the stateless rules reading precompiled
+# RuleTables against the original implementations (copied from the first
+# version of shipments/rules.py, float euro prices included) that recompute
+# city adjustments, lowest prices and pair lookups on every shipment.
+#
+# Usage: python -m benchmarks.bench_rules [INPUT_FILE] [REPEAT]
+# -----------------------------
+
+
+def legacy_shipment(line: str) -> Optional[Shipment]:
+    """
+    Parses a line into a shipment priced in float euros, as the original rules expect.
+    """
+    shipment = parse_line(line)
+    if shipment is not None:
+        shipment.price = shipment.final_price = PRICE_TABLE[shipment.provider][shipment.size]
+        shipment.discount = 0.0
+    return shipment
+
+
+# The three classes below are the original rule implementations, unchanged apart from their names
+
+class LegacyCityRule(DiscountRule):
+    """
+    Adjusts price and sets delivery time based on city types (big/small).
+    """
+    def apply(self, shipment: 'Shipment', context: dict) -> None:
+        otype = shipment.origin_type
+        dtype = shipment.destination_type
+        if otype == 'unknown' or dtype == 'unknown':
+            shipment.ignored = True  # Ignore if city is not recognized
+            return
+        # Price adjustment and delivery time
+        if otype == 'big' and dtype == 'big':
+            price_adj = 0
+            shipment.delivery_time = '1-3 days'
+        elif (otype == 'big' and dtype == 'small') or (otype == 'small' and dtype == 'big'):
+            price_adj = 1
+            shipment.delivery_time = '2-5 days'
+        elif otype == 'small' and dtype == 'small':
+            price_adj = 2
+            shipment.delivery_time = '3-6 days'
+        else:
+            price_adj = 0
+            shipment.delivery_time = '-'
+        shipment.price += price_adj  # Adjust base price
+        shipment.final_price += price_adj  # Adjust final price (may be overwritten by other rules)
+
+
+class LegacyLowestSPriceRule(DiscountRule):
+    """
+    Ensures XS and S packages are charged at the lowest XS/S price (plus city adjustment).
+    """
+    def apply(self, shipment: 'Shipment', context: dict) -> None:
+        if shipment.is_free:
+            return
+        if shipment.size in ('XS', 'S'):
+            # Calculate city adjustment for this shipment
+            otype = shipment.origin_type
+            dtype = shipment.destination_type
+            if otype == 'big' and dtype == 'big':
+                city_adj = 0
+            elif (otype == 'big' and dtype == 'small') or (otype == 'small' and dtype == 'big'):
+                city_adj = 1
+            elif otype == 'small' and dtype == 'small':
+                city_adj = 2
+            else:
+                city_adj = 0
+            # Find the lowest price for this size among all providers, then add city adjustment
+            lowest_size_with_city = min(PRICE_TABLE[provider][shipment.size] for provider in PRICE_TABLE) + city_adj
+            shipment.discount = shipment.price - lowest_size_with_city
+            shipment.final_price = lowest_size_with_city
+            shipment.lowest_price_applied = True
+
+
+class LegacyPopularPairDiscountRule(DiscountRule):
+    """
+    Applies a special discount if the shipment is between a popular city pair.
+    Only applies to S shipments (not XS, M, L, XL).
+    """
+    def apply(self, shipment: 'Shipment', context: dict) -> None:
+        if shipment.is_free:
+            return
+        if shipment.size != 'S':
+            return
+        pair = (shipment.origin, shipment.destination)
+        pair_rev = (shipment.destination, shipment.origin)
+        discount = None
+        if pair in POPULAR_PAIRS_DISCOUNTS:
+            discount = POPULAR_PAIRS_DISCOUNTS[pair]
+        elif pair_rev in POPULAR_PAIRS_DISCOUNTS:
+            discount = POPULAR_PAIRS_DISCOUNTS[pair_rev]
+        if discount is not None and discount > 0:
+            # Only apply if discount is less than the current price
+            shipment.discount += min(discount, shipment.final_price)
+            shipment.final_price = max(0.0, shipment.final_price - discount)
+            # Note: discount_str will be set by MonthlyCapRule
+
+
+def bench(lines: List[str], repeat: int = 5) -> None:
+    """
+    Times both rule sets over freshly parsed shipments and prints the per-shipment cost.
+    """
+    variants = (
+        ('legacy', legacy_shipment, [LegacyCityRule(), LegacyLowestSPriceRule(), LegacyPopularPairDiscountRule()]),
+        ('tables', parse_line, [CityRule(), LowestSPriceRule(), PopularPairDiscountRule()]),
+    )
+    for name, parse, rules in variants:
+        def run() -> None:
+            context: dict = {}
+            for shipment in shipments:
+                for rule in rules:
+                    rule.apply(shipment, context)
+        times = []
+        for _ in range(repeat):
+            shipments = [s for s in map(parse, lines) if s is not None]
+            times.append(timeit.timeit(run, number=1))
+        print(f"{name:>8}: {min(times) * 1e9 / len(shipments):8.1f} ns/shipment "
+              f"({len(shipments)} shipments, best of {repeat})")
+
+
+def main() -> None:
+    input_file = sys.argv[1] if len(sys.argv) > 1 else 'input.txt'
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    with open(input_file, 'r') as f:
+        lines = f.readlines()
+    lines = lines * max(1, 100000 // max(1, len(lines)))
+    bench(lines, repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, List
+from benchmarks.generator import write_workload
+from shipments.__main__ import process_stream
+from shipments.bulkio import read_blocks_bulk, read_lines_bulk
+
+# -----------------------------
+# Vectorized engine benchmark
+# -----------------------------
+# Compares the scalar rule chain with the NumPy engine (--engine numpy) on a
+# generated workload, both in process (pricing input already read into
+# memory, output lines included) and end to end (python -m shipments, with
+# startup, reading and writing).
+#
+# Usage: python -m benchmarks.bench_vectorized [LINES] [REPEAT]
+# -----------------------------
+
+
+def best_of(run: Callable[[], object], repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def bench(input_file: str, lines: int, repeat: int = 3) -> None:
+    """
+    Times both engines over input_file and prints their throughput and the speedup.
+    """
+    from shipments.vectorized import process_blocks_vectorized
+    text_lines: List[str] = list(read_lines_bulk(input_file))
+    blocks: List[bytes] = list(read_blocks_bulk(input_file))
+    in_process = {
+        'scalar': best_of(lambda: list(process_stream(text_lines)), repeat),
+        'numpy': best_of(lambda: list(process_blocks_vectorized(blocks)), repeat),
+    }
+    command = [sys.executable, '-m', 'shipments', input_file, '-o', os.devnull]
+    end_to_end = {
+        'scalar': best_of(lambda: subprocess.run(command, check=True), repeat),
+        'numpy': best_of(lambda: subprocess.run(command + ['--engine', 'numpy'], check=True), repeat),
+    }
+    for name, times in (('in process', in_process), ('end to end', end_to_end)):
+        for engine, seconds in times.items():
+            print(f"{name:>10} {engine:>6}: {seconds:6.2f} s  {lines / seconds / 1e6:6.2f} M lines/s")
+        print(f"{name:>10} speedup: {times['scalar'] / times['numpy']:.1f}x ({lines} lines, best of {repeat})")
+
+
+def main() -> None:
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    with tempfile.TemporaryDirectory() as tmp:
+        input_file = os.path.join(tmp, 'workload.txt')
+        with open(input_file, 'w') as f:
+            write_workload(f, lines, seed=1)
+        bench(input_file, lines, repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+import argparse
+import random
+import sys
+from datetime import date, timedelta
+from typing import Dict, Iterator, List, Optional, TextIO
+
+# -----------------------------
+# Synthetic workload generator
+# -----------------------------
+# Produces realistic input files for the pricing pipeline: chronologically
+# ordered dates spread over a number of months, a configurable mix of sizes,
+# providers and city types, and a share of invalid lines (bad format, unknown
+# cities, impossible dates). Output is fully determined by the seed and is
+# written in a streaming way, so it scales from 1k to 100M lines.
+#
+# Usage: python -m benchmarks.generator --lines 1000000 --seed 1 -o workload.txt
+# -----------------------------
+
+BIG = ['Paris', 'Lyon', 'Marseille', 'Toulouse', 'Nice']
+SMALL = ['Dijon', 'Limoges', 'Bastia', 'Tarbes', 'Albi']
+UNKNOWN = ['Nowhere', 'Atlantis']
+
+DEFAULT_SIZE_MIX: Dict[str, float] = {'XS': 0.15, 'S': 0.35, 'M': 0.25, 'L': 0.15, 'XL': 0.10}
+DEFAULT_PROVIDER_MIX: Dict[str, float] = {'LP': 0.5, 'MR': 0.5}
+DEFAULT_CITY_MIX: Dict[str, float] = {'big': 0.6, 'small': 0.39, 'unknown': 0.01}
+
+# Malformed lines: wrong field count, unknown size/provider, impossible date
+INVALID_TEMPLATES = ['{date} {size}', '{date} Q {provider} Paris Lyon', '{date} {size} XX Paris Lyon',
+                     '2015-02-30 {size} {provider} Paris Lyon', 'bad input', '']
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """
+    Parses a mix such as 'S=0.5,M=0.3,L=0.2' into a dict of weights.
+    """
+    mix = {}
+    for part in text.split(','):
+        key, _, weight = part.partition('=')
+        mix[key.strip()] = float(weight)
+    return mix
+
+
+def generate(lines: int, seed: int = 0, start: date = date(2015, 1, 1), months: int = 12,
+             size_mix: Optional[Dict[str, float]] = None, provider_mix: Optional[Dict[str, float]] = None,
+             city_mix: Optional[Dict[str, float]] = None, invalid_ratio: float = 0.01,
+             batch: int = 10000) -> Iterator[str]:
+    """
+    Yields the requested number of input lines (without newlines), spread evenly and in date
+    order over the given number of calendar months.
+    """
+    rng = random.Random(seed)
+    size_mix = size_mix or DEFAULT_SIZE_MIX
+    provider_mix = provider_mix or DEFAULT_PROVIDER_MIX
+    city_mix = city_mix or DEFAULT_CITY_MIX
+    sizes, size_weights = list(size_mix), list(size_mix.values())
+    providers, provider_weights = list(provider_mix), list(provider_mix.values())
+    pools = {'big': BIG, 'small': SMALL, 'unknown': UNKNOWN}
+    cities: List[str] = []
+    city_weights: List[float] = []
+    for city_type, weight in city_mix.items():
+        cities += pools[city_type]
+        city_weights += [weight / len(pools[city_type])] * len(pools[city_type])
+
+    # Calendar days covered by the requested months
+    end = start
+    for _ in range(months):
+        end = (end.replace(day=28) + timedelta(days=4)).replace(day=1)
+    days = [(start + timedelta(days=i)).isoformat() for i in range((end - start).days)]
+
+    produced = 0
+    while produced < lines:
+        n = min(batch, lines - produced)
+        batch_sizes = rng.choices(sizes, size_weights, k=n)
+        batch_providers = rng.choices(providers, provider_weights, k=n)
+        origins = rng.choices(cities, city_weights, k=n)
+        destinations = rng.choices(cities, city_weights, k=n)
+        for i in range(n):
+            day = days[(produced + i) * len(days) // lines]
+            if invalid_ratio and rng.random() < invalid_ratio:
+                yield rng.choice(INVALID_TEMPLATES).format(date=day, size=batch_sizes[i],
+                                                           provider=batch_providers[i])
+            else:
+                yield f"{day} {batch_sizes[i]} {batch_providers[i]} {origins[i]} {destinations[i]}"
+        produced += n
+
+
+def write_workload(out: TextIO, lines: int, **options) -> None:
+    """
+    Writes a generated workload to out, one line per shipment.
+    """
+    buffer: List[str] = []
+    for line in generate(lines, **options):
+        buffer.append(line)
+        if len(buffer) >= 10000:
+            buffer.append('')
+            out.write('\n'.join(buffer))
+            buffer.clear()
+    if buffer:
+        buffer.append('')
+        out.write('\n'.join(buffer))
+
+
+def add_workload_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Adds the workload shape options shared by the generator and the benchmark suite.
+    """
+    parser.add_argument('--lines', type=int, default=100000, help='number of lines to generate')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--start', type=date.fromisoformat, default=date(2015, 1, 1), help='first day (YYYY-MM-DD)')
+    parser.add_argument('--months', type=int, default=12, help='number of calendar months to spread lines over')
+    parser.add_argument('--sizes', type=parse_mix, help='size mix, e.g. XS=0.1,S=0.4,M=0.3,L=0.1,XL=0.1')
+    parser.add_argument('--providers', type=parse_mix, help='provider mix, e.g. LP=0.7,MR=0.3')
+    parser.add_argument('--cities', type=parse_mix, help='city type mix, e.g. big=0.5,small=0.45,unknown=0.05')
+    parser.add_argument('--invalid-ratio', type=float, default=0.01, help='share of malformed lines')
+
+
+def workload_options(args: argparse.Namespace) -> Dict:
+    """
+    Returns generate() keyword arguments from parsed workload options.
+    """
+    return {'seed': args.seed, 'start': args.start, 'months': args.months, 'size_mix': args.sizes,
+            'provider_mix': args.providers, 'city_mix': args.cities, 'invalid_ratio': args.invalid_ratio}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.generator', description='Synthetic workload generator')
+    add_workload_arguments(parser)
+    parser.add_argument('-o', '--output', help='output file (default: stdout)')
+    args = parser.parse_args()
+    if args.output:
+        with open(args.output, 'w') as f:
+            write_workload(f, args.lines, **workload_options(args))
+    else:
+        write_workload(sys.stdout, args.lines, **workload_options(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+import argparse
+import asyncio
+import json
+import time
+from itertools import cycle, islice
+from typing import Dict, List, Optional
+
+# -----------------------------
+# Load generator for the pricing service
+# -----------------------------
+# Replays shipment lines (by default input.txt) against a running
+# shipments.service from many concurrent connections and reports latency
+# percentiles and throughput as JSON.
+#
+# Usage:
+#   python -m shipments.service --port 8765 &
+#   python -m benchmarks.loadgen --port 8765 --concurrency 32 --requests 20000 input.txt
+# -----------------------------
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+async def _client(lines: List[str], latencies: List[float], host: str, port: int,
+                  unix_path: Optional[str], pipeline: int) -> None:
+    """
+    One connection: keeps up to pipeline requests in flight and records each request's latency.
+    """
+    if unix_path:
+        reader, writer = await asyncio.open_unix_connection(unix_path)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    sent: Dict[int, float] = {}
+    position = 0
+    received = 0
+    while received < len(lines):
+        while position < len(lines) and len(sent) < pipeline:
+            sent[position] = time.perf_counter()
+            writer.write(json.dumps({'id': position, 'line': lines[position]}).encode() + b'\n')
+            position += 1
+        await writer.drain()
+        response = json.loads(await reader.readline())
+        latencies.append(time.perf_counter() - sent.pop(response['id']))
+        received += 1
+    writer.close()
+    await writer.wait_closed()
+
+
+async def run_load(lines: List[str], requests: int, concurrency: int, host: str = '127.0.0.1',
+                   port: int = 8765, unix_path: Optional[str] = None, pipeline: int = 1) -> Dict:
+    """
+    Sends requests lines (cycling through lines) over concurrency connections and returns a report.
+    """
+    workload = list(islice(cycle(lines), requests))
+    shares = [workload[i::concurrency] for i in range(concurrency)]
+    latencies: List[float] = []
+    start = time.perf_counter()
+    await asyncio.gather(*(_client(share, latencies, host, port, unix_path, pipeline) for share in shares if share))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'concurrency': concurrency,
+        'pipeline': pipeline,
+        'seconds': elapsed,
+        'throughput_rps': len(latencies) / elapsed if elapsed else 0.0,
+        'latency_ms': {name: percentile(latencies, fraction) * 1000
+                       for name, fraction in (('p50', 0.50), ('p90', 0.90), ('p99', 0.99), ('max', 1.0))},
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.loadgen', description='Pricing service load generator')
+    parser.add_argument('input_file', nargs='?', default='input.txt', help='shipment lines to replay')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', metavar='PATH', help='connect to a Unix socket instead of TCP')
+    parser.add_argument('--requests', type=int, default=10000)
+    parser.add_argument('--concurrency', type=int, default=16, help='number of connections')
+    parser.add_argument('--pipeline', type=int, default=1, help='requests in flight per connection')
+    args = parser.parse_args()
+    with open(args.input_file, 'r') as f:
+        lines = [line.rstrip('\n') for line in f]
+    report = asyncio.run(run_load(lines, args.requests, args.concurrency, args.host, args.port,
+                                  args.unix, args.pipeline))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
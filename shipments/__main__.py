@@ -1,9 +1,15 @@
-import re
-from typing import Optional,  Dict, List
+from typing import TYPE_CHECKING, Optional,  Dict, Iterable, Iterator, List
 from shipments.rules import CityRule, LowestSPriceRule, MonthlyCapRule, DiscountRule, FreeLargeRule, PopularPairDiscountRule
-from shipments.config import PRICE_TABLE, MONTHLY_DISCOUNT_CAP, POPULAR_PAIRS_DISCOUNTS, BIG_CITIES, SMALL_CITIES, ALL_CITIES, Shipment
+from shipments.config import DEFAULT_MAX_ACCOUNTS
+from shipments.parser import parse_line
+from shipments.bulkio import open_output, read_blocks_bulk, read_lines_bulk, write_lines_bulk
+import argparse
+import functools
+import os
 import sys
-from datetime import datetime
+
+if TYPE_CHECKING:
+    from shipments.instrumentation import Instrumentation
 
 # -----------------------------
 # Vinted Shipping Discount System
@@ -16,68 +22,214 @@ from datetime import datetime
 # Output format: <all fields> <final_price> <discount> <delivery_time>
 # -----------------------------
 
-# All config and constants are now in src/config.py
-
+# All config and constants are in shipments/config.py. Keep module-level imports
+# light: optional engines and tools are imported only when selected
+# (tests/test_startup.py guards the cold-start time).
 
-def parse_line(line: str) -> Optional[Shipment]:
-    """
-    Parses a line of input into a Shipment object, or returns None if invalid.
-    """
-    # Regex expects: YYYY-MM-DD SIZE PROVIDER ORIGIN DESTINATION
-    pattern = r"^(\d{4}-\d{2}-\d{2})\s+(XS|S|M|L|XL)\s+(LP|MR)\s+(\w+)\s+(\w+)$"
-    match = re.match(pattern, line.strip())
-    if match:
-        date, size, provider, origin, destination = match.groups()
-        # Validate date
-        try:
-            datetime.strptime(date, "%Y-%m-%d")
-        except ValueError:
-            return None
-        return Shipment(date, size, provider, origin, destination)
-    return None
+STATS_ENV_VAR = 'SHIPMENTS_STATS'  # Default for --stats
 
 
-def process_lines(lines: List[str]) -> List[str]:
+def build_rules() -> List[DiscountRule]:
     """
-    Processes a list of input lines, applies all rules, and returns the output lines.
+    Returns a fresh list of rules in the order they must be applied.
     """
-    context: Dict = {}  # Shared state for rules (e.g., monthly discount tracking)
-    rules: List[DiscountRule] = [
+    return [
         CityRule(),         # Adjusts price and delivery time based on city types
         FreeLargeRule(),    # Every 3rd L and 4th XL via LP per month is free
         LowestSPriceRule(), # Ensures XS/S packages are charged at the lowest price (plus city adj.)
         PopularPairDiscountRule(), # Special discount for popular city pairs
         MonthlyCapRule(),   # Caps total monthly discounts
     ]
-    output: List[str] = []
+
+
+def process_stream(lines: Iterable[str], context: Optional[Dict] = None,
+                   instrumentation: Optional['Instrumentation'] = None) -> Iterator[str]:
+    """
+    Lazily processes input lines, applying all rules, and yields one output line per input line.
+    Only the per-month rule context is kept between lines, so memory does not grow with input size.
+    If instrumentation is given, parsing and every rule are timed and ignored lines are counted by reason.
+    """
+    if context is None:
+        context = {}  # Shared state for rules (e.g., monthly discount tracking)
+    rules = build_rules()
+    parse = parse_line
+    if instrumentation is not None:
+        rules = instrumentation.wrap_rules(rules)
+        parse = instrumentation.wrap_parse(parse)
     for line in lines:
-        shipment = parse_line(line)
+        shipment = parse(line)
         if shipment and not shipment.ignored:
             for rule in rules:
                 rule.apply(shipment, context)  # Apply each rule in order
             if not shipment.ignored:
-                output.append(shipment.output_line())  # Output formatted shipment
+                yield shipment.output_line()  # Output formatted shipment
             else:
-                output.append(f"{line.strip()} Ignored")  # Mark ignored if set by a rule
+                if instrumentation is not None:
+                    instrumentation.record_ignored(line, shipment)
+                yield f"{line.strip()} Ignored"  # Mark ignored if set by a rule
+        else:
+            if instrumentation is not None:
+                instrumentation.record_ignored(line, shipment)
+            yield f"{line.strip()} Ignored"  # Mark ignored if parsing failed
+
+
+def process_lines(lines: List[str]) -> List[str]:
+    """
+    Processes a list of input lines, applies all rules, and returns the output lines.
+    """
+    return list(process_stream(lines))
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """
+    Parses command-line arguments.
+    """
+    parser = argparse.ArgumentParser(prog='python -m shipments', description='Vinted shipping discount calculator')
+    parser.add_argument('input_file', nargs='?', default='input.txt',
+                        help="input file, or '-' for stdin (default: input.txt)")
+    parser.add_argument('-o', '--output', metavar='PATH', help='write results to PATH instead of stdout')
+    parser.add_argument('--engine', choices=('scalar', 'compiled', 'numpy'), default='scalar',
+                        help='pricing engine: per-shipment rule objects, the rules compiled into one function, '
+                             'or the vectorized NumPy batch engine')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='number of worker processes; months are processed in parallel when > 1')
+    parser.add_argument('--checkpoint', metavar='PATH',
+                        help='resume from (and update) a checkpoint file, processing only lines appended since')
+    parser.add_argument('--stats', metavar='PATH',
+                        help='record per-rule timing and ignore reasons to PATH (Prometheus text if it ends '
+                             f'in .prom, JSON otherwise); defaults to ${STATS_ENV_VAR} where supported')
+    parser.add_argument('--sort', action='store_true',
+                        help='accept input that is not in date order: process it chronologically (external sort '
+                             'with spill files) and write results in input order')
+    parser.add_argument('--memory-budget', metavar='SIZE', default='256M',
+                        help='memory for --sort before spilling to temporary files, e.g. 64M (default: 256M)')
+    parser.add_argument('--cache', metavar='DIR',
+                        help='reuse results of months whose input lines and configuration are unchanged')
+    parser.add_argument('--cache-size', metavar='SIZE', default='1G',
+                        help='size bound of the --cache directory, least recently used months are evicted '
+                             '(default: 1G)')
+    parser.add_argument('--format', choices=('text', 'binary'), default='text',
+                        help='input and output format; binary files are made with python -m shipments.binary')
+    parser.add_argument('--accounts', action='store_true',
+                        help='input lines start with an account column; every account has its own counters and '
+                             'discount cap')
+    parser.add_argument('--max-accounts', type=int, metavar='N',
+                        help='account states kept in memory with --accounts; idle ones are moved to a temporary '
+                             f'file (default: {DEFAULT_MAX_ACCOUNTS})')
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error('--workers must be at least 1')
+    if args.checkpoint and args.workers > 1:
+        parser.error('--checkpoint cannot be combined with --workers')
+    if args.checkpoint and args.input_file == '-':
+        parser.error('--checkpoint needs an input file, not stdin')
+    if args.checkpoint and not os.path.isdir(os.path.dirname(os.path.abspath(args.checkpoint))):
+        parser.error(f"--checkpoint directory does not exist: '{os.path.dirname(args.checkpoint)}'")
+    if args.stats and (args.engine != 'scalar' or args.workers > 1):
+        parser.error('--stats is only supported with the scalar engine and a single worker')
+    if args.format == 'binary' and (args.engine != 'scalar' or args.workers > 1 or args.checkpoint or args.stats):
+        parser.error('--format binary is only supported with the scalar engine, a single worker, '
+                     'no checkpoint and no stats')
+    if args.sort and (args.workers > 1 or args.checkpoint or args.format == 'binary'):
+        parser.error('--sort cannot be combined with --workers, --checkpoint or --format binary')
+    if args.cache and (args.checkpoint or args.sort or args.stats or args.format == 'binary'):
+        parser.error('--cache cannot be combined with --checkpoint, --sort, --stats or --format binary')
+    if args.accounts and (args.engine == 'numpy' or args.workers > 1 or args.checkpoint or args.sort or args.cache
+                          or args.stats or args.format == 'binary'):
+        parser.error('--accounts cannot be combined with --engine numpy, --workers, --checkpoint, --sort, '
+                     '--cache, --stats or --format binary')
+    if args.max_accounts is not None and args.max_accounts < 1:
+        parser.error('--max-accounts must be at least 1')
+    # Only the size options that are used are parsed
+    sizes = [option for option, used in (('memory_budget', args.sort), ('cache_size', args.cache)) if used]
+    if sizes:
+        from shipments.extsort import parse_size
+        for option in sizes:
+            try:
+                setattr(args, option, parse_size(getattr(args, option)))
+            except ValueError:
+                parser.error(f"invalid --{option.replace('_', '-')}: '{getattr(args, option)}'")
+    if args.format == 'binary' and args.input_file == '-':
+        parser.error('--format binary needs an input file, not stdin')
+    if args.stats is None and os.environ.get(STATS_ENV_VAR):
+        # Unlike an explicit --stats, the environment default does not make other options an error
+        if (args.engine != 'scalar' or args.workers > 1 or args.format == 'binary' or args.cache
+                or args.accounts):
+            print(f"warning: ${STATS_ENV_VAR} is ignored: stats are only recorded with the scalar engine, "
+                  "a single worker and without --format binary, --cache or --accounts", file=sys.stderr)
         else:
-            output.append(f"{line.strip()} Ignored")  # Mark ignored if parsing failed
-    return output
+            args.stats = os.environ[STATS_ENV_VAR]
+    return args
 
 
-def main() -> None:
+def main(argv: Optional[List[str]] = None) -> None:
     """
-    Main entry point: reads input file, processes lines, and prints results.
+    Main entry point: streams the input through the rules and writes results as they are produced.
     """
-    # Use command-line argument for input file, or default path
-    input_file = sys.argv[1] if len(sys.argv) > 1 else 'input.txt'
+    args = parse_args(argv)
+    instrumentation = None
+    if args.engine == 'numpy':
+        from shipments.vectorized import process_stream_vectorized as stream
+    elif args.engine == 'compiled':
+        from shipments.compiler import process_stream_compiled as stream
+    elif args.stats:
+        from shipments.instrumentation import Instrumentation
+        instrumentation = Instrumentation()
+        stream = functools.partial(process_stream, instrumentation=instrumentation)
+    else:
+        stream = process_stream
+    out = open_output(args.output)
     try:
-        with open(input_file, 'r') as f:
-            lines = f.readlines()
-        results = process_lines(lines)
-        for line in results:
-            print(line)
-    except FileNotFoundError:
-        print(f"Input file '{input_file}' not found.")
+        if args.format == 'binary':
+            from shipments.binary import BinaryFormatError, process_records, read_input, write_output
+            try:
+                write_output(process_records(read_input(args.input_file)), out)
+            except BinaryFormatError as e:
+                sys.exit(str(e))
+        elif args.accounts:
+            from shipments.accounts import AccountStates, process_stream_accounts
+            states = AccountStates(DEFAULT_MAX_ACCOUNTS if args.max_accounts is None else args.max_accounts)
+            try:
+                write_lines_bulk(process_stream_accounts(read_lines_bulk(args.input_file), states,
+                                                         args.engine), out)
+            finally:
+                states.close()
+        elif args.checkpoint:
+            from shipments.checkpoint import CheckpointError, process_incremental
+            try:
+                process_incremental(args.input_file, args.checkpoint, out, stream, write_lines_bulk)
+            except CheckpointError as e:
+                sys.exit(str(e))
+        elif args.cache:
+            from shipments.cache import ResultCache, process_lines_cached
+            # Months are hashed whole, so the whole file is read up front
+            lines = list(read_lines_bulk(args.input_file))
+            cache = ResultCache(args.cache, args.cache_size)
+            write_lines_bulk(process_lines_cached(lines, cache, args.workers, args.engine), out)
+        elif args.sort:
+            from shipments.extsort import process_sorted
+            write_lines_bulk(process_sorted(read_lines_bulk(args.input_file), stream, args.memory_budget), out)
+        elif args.workers > 1:
+            from shipments.parallel import process_lines_parallel
+            # Results are merged in input order, so the whole file is read up front
+            lines = list(read_lines_bulk(args.input_file))
+            write_lines_bulk(process_lines_parallel(lines, args.workers, args.engine), out)
+        elif args.engine == 'numpy':
+            from shipments.vectorized import process_blocks_vectorized
+            # Input blocks are priced as bytes, without splitting them into lines of text
+            out.writelines(process_blocks_vectorized(read_blocks_bulk(args.input_file)))
+            out.flush()
+        else:
+            write_lines_bulk(stream(read_lines_bulk(args.input_file)), out)
+    except FileNotFoundError as e:
+        if e.filename != args.input_file:
+            raise  # Not the input, e.g. an output or cache path
+        print(f"Input file '{args.input_file}' not found.")
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+    if instrumentation is not None:
+        instrumentation.export(args.stats)
 
 if __name__ == '__main__':
-    main() 
\ No newline at end of file
+    main() 
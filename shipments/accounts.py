@@ -0,0 +1,155 @@
+import json
+import os
+import tempfile
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+from shipments.checkpoint import decode_context, encode_context
+from shipments.config import DEFAULT_MAX_ACCOUNTS, Shipment
+from shipments.parser import parse_fields, parse_line
+from shipments.rules import DiscountRule
+
+# -----------------------------
+# Per-account pricing
+# -----------------------------
+# With --accounts every input line starts with an account (seller) column:
+#   ACCOUNT YYYY-MM-DD SIZE PROVIDER ORIGIN DESTINATION
+# and each account gets its own rule context (its own free L/XL counts and
+# monthly discount cap). Output lines keep the account column. Without
+# --accounts such 6-column lines are Ignored, as before.
+#
+# At most max_accounts contexts are held in memory, least recently used
+# first out. An evicted context is written to an SQLite database in a
+# temporary directory (encoded like a checkpoint, see
+# shipments/checkpoint.py) and read back when its account appears again,
+# so memory does not grow with the number of accounts.
+#
+# Shipments are priced with the rule classes, or with the compiled rule
+# chain (shipments/compiler.py) under --engine compiled.
+# -----------------------------
+
+COMMIT_INTERVAL = 10000  # Evictions between commits to the spill database
+
+
+class AccountStates:
+    """
+    Rule contexts by account, with a bounded number in memory and the rest spilled to disk.
+    """
+    def __init__(self, max_accounts: int = DEFAULT_MAX_ACCOUNTS, directory: Optional[str] = None):
+        if max_accounts < 1:
+            raise ValueError('max_accounts must be at least 1')
+        self.max_accounts = max_accounts
+        self.directory = directory
+        self.contexts: 'OrderedDict[str, Dict]' = OrderedDict()
+        self.evictions = 0
+        self.loads = 0
+        self._tmp: Optional[tempfile.TemporaryDirectory] = None
+        self._db = None  # Opened on the first eviction
+
+    def get(self, account: str) -> Dict:
+        """
+        Returns the rule context of account (reading it back from disk if it was evicted).
+        """
+        contexts = self.contexts
+        context = contexts.get(account)
+        if context is not None:
+            contexts.move_to_end(account)
+            return context
+        context = self._load(account) if self._db is not None else None
+        if context is None:
+            context = {}
+        contexts[account] = context
+        if len(contexts) > self.max_accounts:
+            self._evict(*contexts.popitem(last=False))
+        return context
+
+    def _open(self):
+        import sqlite3
+        self._tmp = tempfile.TemporaryDirectory(prefix='shipments-accounts-', dir=self.directory)
+        db = sqlite3.connect(os.path.join(self._tmp.name, 'accounts.db'))
+        # A scratch database: durability is not needed
+        db.execute('PRAGMA journal_mode = OFF')
+        db.execute('PRAGMA synchronous = OFF')
+        db.execute('CREATE TABLE accounts (account TEXT PRIMARY KEY, context TEXT NOT NULL)')
+        return db
+
+    def _evict(self, account: str, context: Dict) -> None:
+        if self._db is None:
+            self._db = self._open()
+        self._db.execute('INSERT OR REPLACE INTO accounts VALUES (?, ?)',
+                         (account, json.dumps(encode_context(context), separators=(',', ':'))))
+        self.evictions += 1
+        if self.evictions % COMMIT_INTERVAL == 0:
+            self._db.commit()
+
+    def _load(self, account: str) -> Optional[Dict]:
+        row = self._db.execute('SELECT context FROM accounts WHERE account = ?', (account,)).fetchone()
+        if row is None:
+            return None
+        self.loads += 1
+        return decode_context(json.loads(row[0]))
+
+    def close(self) -> None:
+        """
+        Drops all state, including the spill database.
+        """
+        self.contexts.clear()
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+            self._tmp.cleanup()
+
+
+def _scalar_pricer(rules: List[DiscountRule]) -> Callable[[Shipment, Dict], Optional[str]]:
+    """
+    Returns a function that applies rules to a parsed shipment like process_stream does,
+    and returns its output line, or None if a rule ignored it.
+    """
+    def price(shipment: Shipment, context: Dict) -> Optional[str]:
+        for rule in rules:
+            rule.apply(shipment, context)
+        return None if shipment.ignored else shipment.output_line()
+
+    return price
+
+
+def _parse_shipment(line: str) -> Optional[Shipment]:
+    """
+    parse_line, with None for shipments ignored while parsing.
+    """
+    shipment = parse_line(line)
+    return None if shipment is None or shipment.ignored else shipment
+
+
+def process_stream_accounts(lines: Iterable[str], states: Optional[AccountStates] = None,
+                            engine: str = 'scalar') -> Iterator[str]:
+    """
+    Lazily processes 'ACCOUNT <shipment>' lines with a separate rule context per account and
+    yields 'ACCOUNT <output>' lines. engine is 'scalar' (the rule classes) or 'compiled'
+    (see shipments/compiler.py). If states is not given, a default AccountStates is used and
+    closed at the end.
+    """
+    from shipments.__main__ import build_rules
+    if engine == 'scalar':
+        parse, price = _parse_shipment, _scalar_pricer(build_rules())
+    elif engine == 'compiled':
+        from shipments.compiler import compile_pricer
+        parse, price = parse_fields, compile_pricer(build_rules())
+    else:
+        raise ValueError(f"unsupported engine for accounts: {engine!r}")
+    own_states = states is None
+    if states is None:
+        states = AccountStates()
+    try:
+        for line in lines:
+            parts = line.split(None, 1)
+            if len(parts) == 2:
+                parsed = parse(parts[1])
+                if parsed is not None:
+                    result = price(parsed, states.get(parts[0]))
+                    if result is not None:
+                        yield f"{parts[0]} {result}"
+                        continue
+            yield f"{line.strip()} Ignored"
+    finally:
+        if own_states:
+            states.close()
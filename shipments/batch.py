@@ -0,0 +1,147 @@
+from array import array
+from typing import Dict, Iterable, Iterator, List, Tuple
+from shipments.config import PROVIDERS, PROVIDER_CODES, SIZES, SIZE_CODES, Shipment
+from shipments.money import format_cents
+
+# -----------------------------
+# Columnar shipment storage
+# -----------------------------
+# ShipmentBatch keeps a large number of shipments as parallel columns instead
+# of one Python object per shipment: enum codes for size/provider, integer ids
+# for repeated strings (dates, cities, delivery times) and array-backed columns
+# for prices and discounts (32-bit integer cents). Use it to keep e.g. a month of shipments resident
+# for reporting; Shipment objects are rebuilt on demand.
+# -----------------------------
+
+# Flag bits stored in the 'flags' column
+FLAG_IGNORED = 1
+FLAG_FREE = 2
+FLAG_LOWEST_PRICE = 4
+FLAG_HAS_DISCOUNT_STR = 8  # discount_str is a formatted amount rather than '-'
+
+
+class StringTable:
+    """
+    Assigns a small integer id to each distinct string (dates, city names, delivery times).
+    """
+    def __init__(self) -> None:
+        self.values: List[str] = []
+        self.ids: Dict[str, int] = {}
+
+    def id(self, value: str) -> int:
+        """
+        Returns the id for value, adding it to the table if it is new.
+        """
+        code = self.ids.get(value)
+        if code is None:
+            code = self.ids[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+class ShipmentBatch:
+    """
+    Column-oriented container for processed shipments.
+    """
+    def __init__(self) -> None:
+        self.dates = StringTable()
+        self.cities = StringTable()
+        self.delivery_times = StringTable()
+        self.date_ids = array('I')
+        self.size_codes = array('B')
+        self.provider_codes = array('B')
+        self.origin_ids = array('I')
+        self.destination_ids = array('I')
+        self.delivery_ids = array('I')
+        self.flags = array('B')
+        self.prices = array('i')
+        self.final_prices = array('i')
+        self.discounts = array('i')
+
+    @classmethod
+    def from_shipments(cls, shipments: Iterable[Shipment]) -> 'ShipmentBatch':
+        """
+        Builds a batch from Shipment objects.
+        """
+        batch = cls()
+        for shipment in shipments:
+            batch.append(shipment)
+        return batch
+
+    def append(self, shipment: Shipment) -> None:
+        """
+        Adds a shipment to the end of the batch.
+        """
+        self.date_ids.append(self.dates.id(shipment.date))
+        self.size_codes.append(SIZE_CODES[shipment.size])
+        self.provider_codes.append(PROVIDER_CODES[shipment.provider])
+        self.origin_ids.append(self.cities.id(shipment.origin))
+        self.destination_ids.append(self.cities.id(shipment.destination))
+        self.delivery_ids.append(self.delivery_times.id(shipment.delivery_time))
+        flags = 0
+        if shipment.ignored:
+            flags |= FLAG_IGNORED
+        if shipment.is_free:
+            flags |= FLAG_FREE
+        if shipment.lowest_price_applied:
+            flags |= FLAG_LOWEST_PRICE
+        if shipment.discount_str != '-':
+            flags |= FLAG_HAS_DISCOUNT_STR
+        self.flags.append(flags)
+        self.prices.append(shipment.price)
+        self.final_prices.append(shipment.final_price)
+        self.discounts.append(shipment.discount)
+
+    def __len__(self) -> int:
+        return len(self.date_ids)
+
+    def __getitem__(self, index: int) -> Shipment:
+        """
+        Rebuilds the Shipment object stored at index.
+        """
+        date = self.dates.values[self.date_ids[index]]
+        shipment = Shipment(
+            date,
+            SIZES[self.size_codes[index]],
+            PROVIDERS[self.provider_codes[index]],
+            self.cities.values[self.origin_ids[index]],
+            self.cities.values[self.destination_ids[index]],
+        )
+        flags = self.flags[index]
+        shipment.price = self.prices[index]
+        shipment.final_price = self.final_prices[index]
+        shipment.discount = self.discounts[index]
+        shipment.discount_str = format_cents(shipment.discount) if flags & FLAG_HAS_DISCOUNT_STR else '-'
+        shipment.delivery_time = self.delivery_times.values[self.delivery_ids[index]]
+        shipment.ignored = bool(flags & FLAG_IGNORED)
+        shipment.is_free = bool(flags & FLAG_FREE)
+        shipment.lowest_price_applied = bool(flags & FLAG_LOWEST_PRICE)
+        return shipment
+
+    def __iter__(self) -> Iterator[Shipment]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def totals(self) -> Tuple[int, int]:
+        """
+        Returns (total final price, total discount) in cents over non-ignored shipments.
+        """
+        revenue = 0
+        discount = 0
+        for flags, final_price, amount in zip(self.flags, self.final_prices, self.discounts):
+            if not flags & FLAG_IGNORED:
+                revenue += final_price
+                discount += amount
+        return revenue, discount
+
+    def nbytes(self) -> int:
+        """
+        Approximate memory used by the per-shipment columns, in bytes.
+        """
+        columns = (self.date_ids, self.size_codes, self.provider_codes, self.origin_ids,
+                   self.destination_ids, self.delivery_ids, self.flags, self.prices,
+                   self.final_prices, self.discounts)
+        return sum(column.itemsize * len(column) for column in columns)
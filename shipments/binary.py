@@ -0,0 +1,278 @@
+import argparse
+import mmap
+import os
+import struct
+import sys
+from datetime import date
+from functools import lru_cache
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+from shipments.config import PROVIDERS, PROVIDER_CODES, SIZES, SIZE_CODES, Shipment
+from shipments.money import format_cents
+from shipments.parser import Fields, parse_fields, year_month
+
+# -----------------------------
+# Binary record format
+# -----------------------------
+# Fixed-width little-endian records, so archived ledgers can be re-priced
+# without tokenizing text. A file is a header, the records, the city table
+# and a footer:
+#
+#   header: magic (4 bytes) | version u16
+#   input record  (INPUT_RECORD):  day ordinal i32 | size code u8 | provider code u8 |
+#                                  origin city id u32 | destination city id u32
+#   output record (OUTPUT_RECORD): input record | final price cents i32 |
+#                                  discount cents i32 (-1 for '-') | delivery time code u8 | flags u8
+#   city table: city names, UTF-8, separated by '\n'
+#   footer: city table offset u64 | city table byte length u32
+#
+# City ids index the file's city table, which lists the cities used by the
+# records in first-seen order. The table is only complete once every record
+# is written, so it follows the records and the footer says where it starts:
+# records are streamed to the output in blocks, and writing works on pipes.
+# Lines that do not parse have no record: they carry no rule state and are
+# always Ignored, so they are dropped (and counted) when converting to binary.
+# -----------------------------
+
+INPUT_MAGIC = b'SHPI'
+OUTPUT_MAGIC = b'SHPO'
+VERSION = 2
+HEADER = struct.Struct('<4sH')
+FOOTER = struct.Struct('<QI')
+INPUT_RECORD = struct.Struct('<iBBII')
+OUTPUT_RECORD = struct.Struct('<iBBIIiiBB')
+NO_DISCOUNT = -1
+WRITE_BUFFER = 1 << 20  # Records are written to the output in blocks of about this many bytes
+FLAG_IGNORED = 1
+DELIVERY_TIMES: Tuple[str, ...] = ('-', '1-3 days', '2-5 days', '3-6 days')
+DELIVERY_CODES: Dict[str, int] = {delivery: code for code, delivery in enumerate(DELIVERY_TIMES)}
+
+
+class BinaryFormatError(Exception):
+    """
+    Raised for files that are not in the expected binary format.
+    """
+
+
+class CityTable:
+    """
+    City name <-> id mapping stored after a binary file's records.
+    """
+    def __init__(self, names: Optional[List[str]] = None):
+        self.names: List[str] = [] if names is None else names
+        self.ids: Dict[str, int] = {name: i for i, name in enumerate(self.names)}
+
+    def id(self, name: str) -> int:
+        city_id = self.ids.get(name)
+        if city_id is None:
+            city_id = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return city_id
+
+    def encode(self) -> bytes:
+        return '\n'.join(self.names).encode('utf-8')
+
+    @classmethod
+    def decode(cls, data: bytes) -> 'CityTable':
+        return cls(data.decode('utf-8').split('\n') if data else [])
+
+
+@lru_cache(maxsize=8192)
+def date_from_ordinal(ordinal: int) -> str:
+    return date.fromordinal(ordinal).isoformat()
+
+
+@lru_cache(maxsize=8192)
+def ordinal_from_date(text: str) -> int:
+    return date.fromisoformat(text).toordinal()
+
+
+def _write_records(out: BinaryIO, magic: bytes, cities: CityTable, records: Iterable[bytes]) -> int:
+    """
+    Writes a header, then records in blocks as they come, then the city table (complete only
+    once all records are encoded) and the footer. Returns the number of records.
+    """
+    # The header goes out with the first block, so nothing is written if records fails
+    # before its first record (e.g. the input file is missing)
+    offset = 0
+    block = bytearray(HEADER.pack(magic, VERSION))
+    count = 0
+    for record in records:
+        block += record
+        count += 1
+        if len(block) >= WRITE_BUFFER:
+            out.write(block)
+            offset += len(block)
+            block.clear()
+    out.write(block)
+    offset += len(block)
+    table = cities.encode()
+    out.write(table)
+    out.write(FOOTER.pack(offset, len(table)))
+    out.flush()
+    return count
+
+
+def _open_records(path: str, magic: bytes, record: struct.Struct) -> Tuple[CityTable, memoryview, mmap.mmap]:
+    """
+    Memory-maps a binary file. Returns (city table, zero-copy view of the records, the map to close).
+    """
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < HEADER.size + FOOTER.size:
+            raise BinaryFormatError(f"'{path}' is not a shipments binary file")
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    found, version = HEADER.unpack_from(mapped, 0)
+    if found != magic or version != VERSION:
+        mapped.close()
+        raise BinaryFormatError(f"'{path}' is not a version {VERSION} {magic.decode()} file")
+    table_start, table_size = FOOTER.unpack_from(mapped, size - FOOTER.size)
+    if table_start < HEADER.size or table_start + table_size != size - FOOTER.size \
+            or (table_start - HEADER.size) % record.size:
+        mapped.close()
+        raise BinaryFormatError(f"'{path}' is truncated or corrupt")
+    cities = CityTable.decode(mapped[table_start:table_start + table_size])
+    view = memoryview(mapped)[HEADER.size:table_start]
+    return cities, view, mapped
+
+
+def encode_input(lines: Iterable[str], out: BinaryIO) -> Tuple[int, int]:
+    """
+    Converts text input lines to binary input written to out. Returns (records written, lines dropped).
+    """
+    cities = CityTable()
+    pack = INPUT_RECORD.pack
+    dropped = 0
+
+    def records() -> Iterator[bytes]:
+        nonlocal dropped
+        for line in lines:
+            fields = parse_fields(line)
+            if fields is None:
+                dropped += 1
+                continue
+            day, size, provider, origin, destination = fields
+            yield pack(ordinal_from_date(day), SIZE_CODES[size], PROVIDER_CODES[provider],
+                       cities.id(origin), cities.id(destination))
+
+    written = _write_records(out, INPUT_MAGIC, cities, records())
+    return written, dropped
+
+
+def read_input(path: str) -> Iterator[Fields]:
+    """
+    Yields (date, size, provider, origin, destination) for each record of a binary input file.
+    """
+    cities, view, mapped = _open_records(path, INPUT_MAGIC, INPUT_RECORD)
+    names = cities.names
+    try:
+        for day, size, provider, origin, destination in INPUT_RECORD.iter_unpack(view):
+            yield date_from_ordinal(day), SIZES[size], PROVIDERS[provider], names[origin], names[destination]
+    finally:
+        view.release()
+        mapped.close()
+
+
+def decode_input(path: str) -> Iterator[str]:
+    """
+    Converts a binary input file back to text input lines.
+    """
+    for fields in read_input(path):
+        yield ' '.join(fields)
+
+
+def process_records(records: Iterable[Fields], context: Optional[Dict] = None) -> Iterator[Shipment]:
+    """
+    Runs already-parsed records through the rule chain, yielding each processed shipment.
+    """
+    from shipments.__main__ import build_rules
+    if context is None:
+        context = {}
+    rules = build_rules()
+    for fields in records:
+        shipment = Shipment(*fields, year_month=year_month(fields[0]))
+        for rule in rules:
+            rule.apply(shipment, context)
+        yield shipment
+
+
+def write_output(shipments: Iterable[Shipment], out: BinaryIO) -> int:
+    """
+    Writes processed shipments as binary output to out. Returns the number of records.
+    """
+    cities = CityTable()
+    pack = OUTPUT_RECORD.pack
+
+    def records() -> Iterator[bytes]:
+        for shipment in shipments:
+            if shipment.ignored:
+                final, discount, flags = 0, NO_DISCOUNT, FLAG_IGNORED
+            else:
+                final = shipment.final_price
+                discount = NO_DISCOUNT if shipment.discount_str == '-' else shipment.discount
+                flags = 0
+            yield pack(ordinal_from_date(shipment.date), SIZE_CODES[shipment.size],
+                       PROVIDER_CODES[shipment.provider], cities.id(shipment.origin),
+                       cities.id(shipment.destination), final, discount,
+                       DELIVERY_CODES[shipment.delivery_time], flags)
+
+    return _write_records(out, OUTPUT_MAGIC, cities, records())
+
+
+def decode_output(path: str) -> Iterator[str]:
+    """
+    Converts a binary output file to text output lines.
+    """
+    cities, view, mapped = _open_records(path, OUTPUT_MAGIC, OUTPUT_RECORD)
+    names = cities.names
+    try:
+        for day, size, provider, origin, destination, final, discount, delivery, flags \
+                in OUTPUT_RECORD.iter_unpack(view):
+            prefix = f"{date_from_ordinal(day)} {SIZES[size]} {PROVIDERS[provider]} {names[origin]} {names[destination]}"
+            if flags & FLAG_IGNORED:
+                yield f"{prefix} Ignored"
+            else:
+                discount_str = '-' if discount == NO_DISCOUNT else format_cents(discount)
+                yield f"{prefix} {format_cents(final)} {discount_str} {DELIVERY_TIMES[delivery]}"
+    finally:
+        view.release()
+        mapped.close()
+
+
+def load_array(path: str, output: bool = False):
+    """
+    Returns the records of a binary file as a zero-copy NumPy structured array (requires numpy),
+    together with the file's city names.
+    """
+    import numpy as np
+    fields = [('day', '<i4'), ('size', 'u1'), ('provider', 'u1'), ('origin', '<u4'), ('destination', '<u4')]
+    if output:
+        fields += [('final_cents', '<i4'), ('discount_cents', '<i4'), ('delivery', 'u1'), ('flags', 'u1')]
+    cities, view, _ = _open_records(path, OUTPUT_MAGIC if output else INPUT_MAGIC,
+                                    OUTPUT_RECORD if output else INPUT_RECORD)
+    return np.frombuffer(view, dtype=np.dtype(fields)), cities.names
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog='python -m shipments.binary',
+                                     description='Convert between the text and binary shipment formats')
+    sub = parser.add_subparsers(dest='command', required=True)
+    encode = sub.add_parser('encode', help='text input -> binary input')
+    encode.add_argument('input_file')
+    encode.add_argument('output_file')
+    for name, help_text in (('decode', 'binary input -> text input'), ('decode-output', 'binary output -> text output')):
+        command = sub.add_parser(name, help=help_text)
+        command.add_argument('input_file')
+    args = parser.parse_args()
+    if args.command == 'encode':
+        from shipments.bulkio import read_lines_bulk
+        with open(args.output_file, 'wb') as out:
+            written, dropped = encode_input(read_lines_bulk(args.input_file), out)
+        print(f"{written} records written, {dropped} unparseable lines dropped", file=sys.stderr)
+    else:
+        from shipments.bulkio import write_lines_bulk
+        lines = decode_input(args.input_file) if args.command == 'decode' else decode_output(args.input_file)
+        write_lines_bulk(lines, sys.stdout.buffer)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+import mmap
+import os
+import stat
+import sys
+from typing import BinaryIO, Iterable, Iterator, List, Optional
+
+# -----------------------------
+# Bulk input/output
+# -----------------------------
+# Reading: input files are memory-mapped and cut into large blocks at newline
+# boundaries; each block is decoded once and split into lines, instead of
+# decoding every line separately. stdin is read in blocks the same way.
+# read_blocks_bulk hands out the blocks themselves, undecoded, to engines
+# that parse bytes (shipments/vectorized.py).
+# Line breaks follow text-mode (universal newline) semantics, so the lines
+# seen by the pipeline are the same as with open(path).readlines().
+#
+# Writing: output lines are joined into large byte buffers and written with
+# few syscalls, to a file or to stdout.
+# -----------------------------
+
+BLOCK_SIZE = 1 << 22   # 4 MiB of input decoded at a time
+WRITE_BUFFER = 1 << 20  # Flush output once roughly this many characters are buffered
+
+
+def _split_block(data: bytes, encoding: str) -> List[str]:
+    """
+    Decodes a block that ends at a line boundary and splits it into lines (without newlines).
+    """
+    text = data.decode(encoding)
+    if '\r' in text:
+        # Universal newlines: \r\n and a lone \r also end a line
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    lines = text.split('\n')
+    if lines[-1] == '':
+        lines.pop()
+    return lines
+
+
+def _blocks(buffer, block_size: int) -> Iterator[bytes]:
+    """
+    Yields consecutive slices of a bytes-like buffer, each ending just after a newline
+    (except possibly the last one).
+    """
+    size = len(buffer)
+    start = 0
+    while start < size:
+        end = min(start + block_size, size)
+        if end < size:
+            newline = buffer.rfind(b'\n', start, end)
+            if newline < 0:
+                newline = buffer.find(b'\n', end)  # Line longer than a block
+                if newline < 0:
+                    newline = size - 1
+            end = newline + 1
+        yield buffer[start:end]
+        start = end
+
+
+def _file_blocks(f: BinaryIO, block_size: int) -> Iterator[bytes]:
+    """
+    Yields the raw blocks of an open file, each ending just after a newline (except possibly the
+    last one), using a memory map, or block reads for pipes.
+    """
+    info = os.fstat(f.fileno())
+    if not stat.S_ISREG(info.st_mode):
+        # Pipes and other special files report no size and cannot be memory-mapped
+        yield from _stream_blocks(f, block_size)
+        return
+    if info.st_size == 0:
+        return  # Empty files cannot be memory-mapped
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        yield from _blocks(mapped, block_size)
+
+
+def _stream_blocks(stream: BinaryIO, block_size: int) -> Iterator[bytes]:
+    """
+    Reads a binary stream in large blocks and yields them cut after their last newline
+    (the rest is carried over to the next block).
+    """
+    pending = b''
+    while True:
+        data = stream.read(block_size)
+        if not data:
+            break
+        data = pending + data
+        cut = data.rfind(b'\n') + 1
+        if cut == 0:
+            pending = data
+            continue
+        pending = data[cut:]
+        yield data[:cut]
+    if pending:
+        yield pending
+
+
+def read_file_lines(path: str, encoding: str = 'utf-8', block_size: int = BLOCK_SIZE) -> Iterator[str]:
+    """
+    Yields the lines of a file (without newlines) using a memory map, or block reads for pipes.
+    """
+    with open(path, 'rb') as f:
+        for block in _file_blocks(f, block_size):
+            yield from _split_block(block, encoding)
+
+
+def read_stream_lines(stream: BinaryIO, encoding: str = 'utf-8', block_size: int = BLOCK_SIZE) -> Iterator[str]:
+    """
+    Yields the lines of a binary stream such as stdin (without newlines), reading large blocks.
+    """
+    for block in _stream_blocks(stream, block_size):
+        yield from _split_block(block, encoding)
+
+
+def read_lines_bulk(path: str, encoding: str = 'utf-8') -> Iterator[str]:
+    """
+    Yields input lines from path, or from stdin if path is '-'.
+    """
+    if path == '-':
+        return read_stream_lines(sys.stdin.buffer, encoding)
+    return read_file_lines(path, encoding)
+
+
+def _newline_blocks(blocks: Iterable[bytes]) -> Iterator[bytes]:
+    """
+    Translates \r\n and a lone \r in raw blocks to \n and ends the last block with a newline.
+    """
+    for block in blocks:
+        if b'\r' in block:
+            block = block.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+        if not block.endswith(b'\n'):
+            block += b'\n'
+        yield block
+
+
+def read_blocks_bulk(path: str, block_size: int = BLOCK_SIZE) -> Iterator[bytes]:
+    """
+    Yields the input from path (or stdin if path is '-') as undecoded blocks of whole lines.
+    Every line ends in b'\n', including the last one; line breaks are the same as in read_lines_bulk.
+    """
+    if path == '-':
+        yield from _newline_blocks(_stream_blocks(sys.stdin.buffer, block_size))
+        return
+    with open(path, 'rb') as f:
+        yield from _newline_blocks(_file_blocks(f, block_size))
+
+
+def write_lines_bulk(results: Iterable[str], out: BinaryIO, encoding: str = 'utf-8',
+                     buffer_size: int = WRITE_BUFFER) -> None:
+    """
+    Writes output lines, each followed by a newline, to a binary stream in large buffers.
+    """
+    buffer: List[str] = []
+    buffered = 0
+    for line in results:
+        buffer.append(line)
+        buffered += len(line) + 1
+        if buffered >= buffer_size:
+            buffer.append('')
+            out.write('\n'.join(buffer).encode(encoding))
+            buffer.clear()
+            buffered = 0
+    if buffer:
+        buffer.append('')
+        out.write('\n'.join(buffer).encode(encoding))
+    out.flush()
+
+
+def open_output(path: Optional[str]) -> BinaryIO:
+    """
+    Opens path for binary writing, or returns stdout's binary buffer for None or '-'.
+    """
+    if path is None or path == '-':
+        sys.stdout.flush()
+        return sys.stdout.buffer
+    return open(path, 'wb')
@@ -0,0 +1,157 @@
+import hashlib
+import os
+from typing import List, Optional
+from shipments.parallel import partition_by_month, process_months
+
+# -----------------------------
+# Per-month result cache
+# -----------------------------
+# Months are independent given the rule context, so a month whose input lines
+# have not changed produces the same output lines. Results are stored on disk
+# under a content address:
+#   key = sha256(configuration fingerprint, the month's input lines)
+# The fingerprint covers PRICE_TABLE, MONTHLY_DISCOUNT_CAP,
+# POPULAR_PAIRS_DISCOUNTS, the city data (cities.json, or the city index
+# named by $SHIPMENTS_CITY_INDEX), the rule list and the source of every
+# shipments module (and of rules defined outside it), so any change to them
+# misses the cache. Entries are evicted least
+# recently used first (by modification time, refreshed on every hit) once the
+# cache grows past its size bound.
+# -----------------------------
+
+CACHE_VERSION = 2
+DEFAULT_CACHE_SIZE = 1 << 30
+
+
+def source_files() -> List[str]:
+    """
+    Paths of every module of the package, so parsing, formatting and engine changes miss the cache too.
+    """
+    package = os.path.dirname(os.path.abspath(__file__))
+    return sorted(os.path.join(package, name) for name in os.listdir(package) if name.endswith('.py'))
+
+
+def config_fingerprint() -> str:
+    """
+    Hash of everything besides the input lines that determines the output.
+    """
+    import sys
+    from shipments.__main__ import build_rules
+    from shipments.cities import CITY_INDEX_ENV_VAR
+    from shipments.config import (CITIES_CONFIG_PATH, MONTHLY_DISCOUNT_CAP, POPULAR_PAIRS_DISCOUNTS,
+                                  PRICE_TABLE)
+    digest = hashlib.sha256()
+    digest.update(repr((CACHE_VERSION, sorted((p, sorted(sizes.items())) for p, sizes in PRICE_TABLE.items()),
+                        MONTHLY_DISCOUNT_CAP, list(POPULAR_PAIRS_DISCOUNTS.items()))).encode())
+    rules = build_rules()
+    digest.update(repr([type(rule).__qualname__ for rule in rules]).encode())
+    sources = {CITIES_CONFIG_PATH, os.environ.get(CITY_INDEX_ENV_VAR) or CITIES_CONFIG_PATH}
+    sources.update(source_files())
+    sources.update(sys.modules[type(rule).__module__].__file__ for rule in rules)  # Rules defined elsewhere
+    for path in sorted(sources):
+        with open(path, 'rb') as f:
+            digest.update(hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    Content-addressed, size-bounded on-disk cache of per-month output lines.
+    """
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_CACHE_SIZE, fingerprint: Optional[str] = None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.fingerprint = fingerprint if fingerprint is not None else config_fingerprint()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, lines: List[str]) -> str:
+        digest = hashlib.sha256(self.fingerprint.encode())
+        digest.update(len(lines).to_bytes(8, 'little'))
+        for line in lines:
+            digest.update(line.encode())
+            digest.update(b'\n')
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f'{key}.txt')
+
+    def get(self, key: str, count: int) -> Optional[List[str]]:
+        """
+        Returns the cached output lines for key, or None. An entry with the wrong number
+        of lines is treated as a miss.
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8', newline='\n') as f:
+                results = f.read().split('\n')
+        except FileNotFoundError:
+            return None
+        results.pop()  # Every entry ends with a newline
+        if len(results) != count:
+            return None
+        os.utime(path)  # Most recently used
+        return results
+
+    def put(self, key: str, results: List[str]) -> None:
+        """
+        Stores output lines under key (atomically), then evicts old entries over the size bound.
+        """
+        path = self._path(key)
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'w', encoding='utf-8', newline='\n') as f:
+            f.write('\n'.join(results))
+            f.write('\n')
+        os.replace(tmp, path)
+        self.evict()
+
+    def evict(self) -> None:
+        """
+        Removes least recently used entries until the cache fits in max_bytes.
+        """
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if entry.name.endswith('.txt') and entry.is_file():
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+                    total += stat.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+def process_lines_cached(lines: List[str], cache: ResultCache, workers: int = 1,
+                         engine: str = 'scalar') -> List[str]:
+    """
+    Processes lines month by month, serving unchanged months from the cache.
+    Only the missing months are processed (in parallel when workers > 1) and then stored.
+    Returns the output lines in the original input order.
+    """
+    output: List[str] = [''] * len(lines)
+    missing = []
+    for indices in partition_by_month(lines).values():
+        month_lines = [lines[i] for i in indices]
+        key = cache.key(month_lines)
+        results = cache.get(key, len(month_lines))
+        if results is None:
+            cache.misses += 1
+            missing.append((key, indices, month_lines))
+            continue
+        cache.hits += 1
+        for index, result in zip(indices, results):
+            output[index] = result
+    computed = process_months([month_lines for _, _, month_lines in missing], workers, engine)
+    for (key, indices, _), results in zip(missing, computed):
+        cache.put(key, results)
+        for index, result in zip(indices, results):
+            output[index] = result
+    return output
@@ -0,0 +1,153 @@
+import hashlib
+import json
+import os
+from collections import defaultdict
+from typing import IO, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+# -----------------------------
+# Incremental, resumable processing
+# -----------------------------
+# The rule context (per-month counters, free-shipment flags and discount
+# totals) is saved to a checkpoint file together with the byte offset of the
+# input that has been processed. The next run seeks to that offset and only
+# processes the lines appended since, giving the same results as a full rerun.
+#
+# Only complete lines (ending in a newline) are processed; a partially written
+# last line is left for the next run. Line breaks are universal newlines, as
+# in the other input paths. The checkpoint is written after the
+# output, so a crash in between re-emits the last batch on the next run
+# rather than losing it.
+# -----------------------------
+
+CHECKPOINT_VERSION = 2  # 2: monthly discount totals in integer cents
+TAIL_BYTES = 4096  # Bytes before the offset that are hashed to detect a replaced input file
+
+
+class CheckpointError(Exception):
+    """
+    Raised when a checkpoint does not match the input file it is resumed against.
+    """
+
+
+def encode_context(context: Dict) -> Dict:
+    """
+    Converts a rule context into JSON-compatible data.
+    Supports the value types the rules use: dicts (including defaultdicts) and sets, keyed by tuples.
+    """
+    encoded = {}
+    for name, value in context.items():
+        if isinstance(value, set):
+            encoded[name] = {'type': 'set', 'items': sorted(list(key) for key in value)}
+        elif isinstance(value, dict):
+            default = getattr(value, 'default_factory', None)
+            encoded[name] = {
+                'type': 'dict',
+                'default': default.__name__ if default in (int, float) else None,
+                'items': [[list(key), amount] for key, amount in value.items()],
+            }
+        else:
+            raise TypeError(f"Cannot checkpoint context entry {name!r} of type {type(value).__name__}")
+    return encoded
+
+
+def decode_context(encoded: Dict) -> Dict:
+    """
+    Rebuilds a rule context from encode_context() output.
+    """
+    context: Dict = {}
+    for name, value in encoded.items():
+        if value['type'] == 'set':
+            context[name] = {tuple(key) for key in value['items']}
+        else:
+            default = {'int': int, 'float': float}.get(value['default'])
+            items = {tuple(key): amount for key, amount in value['items']}
+            context[name] = defaultdict(default, items) if default else items
+    return context
+
+
+def _tail_hash(f, offset: int) -> str:
+    """
+    Hashes the last TAIL_BYTES bytes of the input before offset.
+    """
+    start = max(0, offset - TAIL_BYTES)
+    f.seek(start)
+    return hashlib.sha256(f.read(offset - start)).hexdigest()
+
+
+def load_checkpoint(path: str) -> Tuple[Dict, int, Optional[str]]:
+    """
+    Returns (context, input offset, tail hash) from a checkpoint file, or an empty state if it does not exist.
+    """
+    if not os.path.exists(path):
+        return {}, 0, None
+    with open(path, 'r') as f:
+        data = json.load(f)
+    if data.get('version') != CHECKPOINT_VERSION:
+        raise CheckpointError(f"Unsupported checkpoint version in '{path}'")
+    return decode_context(data['context']), data['offset'], data['tail_hash']
+
+
+def save_checkpoint(path: str, context: Dict, offset: int, tail_hash: str) -> None:
+    """
+    Atomically writes the context and input offset to a checkpoint file.
+    """
+    data = {'version': CHECKPOINT_VERSION, 'offset': offset, 'tail_hash': tail_hash,
+            'context': encode_context(context)}
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, separators=(',', ':'))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class _InputCursor:
+    """
+    Iterates over the complete lines of a binary file from its current position,
+    tracking the offset just past the last line handed out.
+    """
+    def __init__(self, f, offset: int):
+        self.f = f
+        self.offset = offset
+        self.lines = 0
+
+    def __iter__(self) -> Iterator[str]:
+        # \r\n and a lone \r also end a line
+        for raw in self.f:
+            complete = raw.endswith(b'\n')
+            newline = (2 if raw.endswith(b'\r\n') else 1) if complete else 0
+            *lines, last = raw[:len(raw) - newline].split(b'\r')
+            for line in lines:
+                self.offset += len(line) + 1
+                self.lines += 1
+                yield line.decode()
+            if not complete:
+                return  # Partially written line: leave it for the next run
+            self.offset += len(last) + newline
+            self.lines += 1
+            yield last.decode()
+
+
+def process_incremental(input_file: str, checkpoint_file: str, out: IO,
+                        stream: Callable[[Iterable[str], Dict], Iterator[str]],
+                        write: Callable[[Iterable[str], IO], None]) -> int:
+    """
+    Processes the lines appended to input_file since the last checkpoint and writes their results to out.
+    stream is a pipeline such as process_stream(lines, context); write writes its results to out.
+    Returns the number of lines processed.
+    """
+    context, offset, tail_hash = load_checkpoint(checkpoint_file)
+    with open(input_file, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < offset or (tail_hash is not None and _tail_hash(f, offset) != tail_hash):
+            raise CheckpointError(f"Input file '{input_file}' does not match checkpoint '{checkpoint_file}'")
+        if offset:
+            # A run that ended on a lone \r has not seen the \n that may have followed it
+            f.seek(offset - 1)
+            if f.read(2) == b'\r\n':
+                offset += 1
+        f.seek(offset)
+        cursor = _InputCursor(f, offset)
+        write(stream(cursor, context), out)
+        save_checkpoint(checkpoint_file, context, cursor.offset, _tail_hash(f, cursor.offset))
+    return cursor.lines
@@ -0,0 +1,238 @@
+import os
+import struct
+import sys
+from array import array
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+from shipments.money import to_cents
+
+# -----------------------------
+# City and pair registry
+# -----------------------------
+# Every known city gets an integer id; its type is one byte per id. Popular
+# pair discounts (in cents) are stored under integer keys instead of name tuples:
+#   symmetric[(low_id << 32) | high_id] -> discount for both directions
+#   directed[(origin_id << 32) | destination_id] -> discount for one direction
+# A pair listed once applies both ways; when a pair is listed in both
+# directions with different discounts, the second direction is kept as a
+# directed override. Cities that appear only in pairs get the 'unknown' type.
+#
+# The registry is built on first use from cities.json and
+# POPULAR_PAIRS_DISCOUNTS, or loaded from a compact index file (see
+# `python -m shipments.cities build`) named by $SHIPMENTS_CITY_INDEX.
+# Pair dicts are only built on the first pair lookup.
+# -----------------------------
+
+CITY_INDEX_ENV_VAR = 'SHIPMENTS_CITY_INDEX'
+CITY_TYPES: Tuple[str, ...] = ('big', 'small', 'unknown')
+UNKNOWN_TYPE = CITY_TYPES.index('unknown')
+NO_CITY = -1  # Id of names that are not in the registry
+
+INDEX_MAGIC = b'SHCI'
+INDEX_VERSION = 2  # 2: pair discounts in cents
+INDEX_HEADER = struct.Struct('<4sHIIII')  # magic, version, names bytes, cities, symmetric pairs, directed pairs
+
+
+class CityIndexError(Exception):
+    """
+    Raised when a city index file cannot be read.
+    """
+
+
+def pair_key(first: int, second: int) -> int:
+    return (first << 32) | second
+
+
+class CityRegistry:
+    """
+    Integer ids, types and pair discounts for a set of cities.
+    """
+    def __init__(self, names: List[str], types: array, symmetric_keys: array, symmetric_values: array,
+                 directed_keys: array, directed_values: array):
+        self.names: List[str] = [sys.intern(name) for name in names]
+        self.ids: Dict[str, int] = {name: i for i, name in enumerate(self.names)}
+        self.types = types
+        self.type_names: List[str] = [CITY_TYPES[t] for t in types]
+        self._pair_arrays = (symmetric_keys, symmetric_values, directed_keys, directed_values)
+        self._symmetric: Optional[Dict[int, int]] = None
+        self._directed: Optional[Dict[int, int]] = None
+
+    @classmethod
+    def from_config(cls, big: Iterable[str], small: Iterable[str],
+                    pair_discounts: Dict[Tuple[str, str], float]) -> 'CityRegistry':
+        """
+        Builds a registry from city lists and (origin, destination) -> discount entries (in euros).
+        A city listed as both big and small counts as big.
+        """
+        names: List[str] = []
+        types = array('B')
+        ids: Dict[str, int] = {}
+
+        def add(name: str, city_type: int) -> int:
+            city_id = ids.get(name)
+            if city_id is None:
+                city_id = ids[name] = len(names)
+                names.append(name)
+                types.append(city_type)
+            return city_id
+
+        for name in big:
+            add(name, 0)
+        for name in small:
+            add(name, 1)
+        symmetric: Dict[int, int] = {}
+        directed: Dict[int, int] = {}
+        for (origin, destination), discount in pair_discounts.items():
+            discount = to_cents(discount)
+            origin_id, destination_id = add(origin, UNKNOWN_TYPE), add(destination, UNKNOWN_TYPE)
+            key = pair_key(min(origin_id, destination_id), max(origin_id, destination_id))
+            if key not in symmetric:
+                symmetric[key] = discount
+            elif symmetric[key] != discount:
+                directed[pair_key(origin_id, destination_id)] = discount
+        return cls(names, types, array('Q', symmetric), array('q', symmetric.values()),
+                   array('Q', directed), array('q', directed.values()))
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def id(self, name: str) -> int:
+        """
+        Returns the id of a city, or NO_CITY.
+        """
+        return self.ids.get(name, NO_CITY)
+
+    def type_of(self, city_id: int) -> str:
+        """
+        Returns 'big', 'small' or 'unknown' for a city id (NO_CITY is 'unknown').
+        """
+        return self.type_names[city_id] if city_id >= 0 else 'unknown'
+
+    def _build_pairs(self) -> None:
+        symmetric_keys, symmetric_values, directed_keys, directed_values = self._pair_arrays
+        self._symmetric = dict(zip(symmetric_keys, symmetric_values))
+        self._directed = dict(zip(directed_keys, directed_values))
+
+    def pair_discount(self, origin_id: int, destination_id: int) -> Optional[int]:
+        """
+        Returns the popular pair discount from origin to destination in cents, or None.
+        """
+        if origin_id < 0 or destination_id < 0:
+            return None
+        if self._symmetric is None:
+            self._build_pairs()
+        if self._directed:
+            discount = self._directed.get((origin_id << 32) | destination_id)
+            if discount is not None:
+                return discount
+        if origin_id <= destination_id:
+            return self._symmetric.get((origin_id << 32) | destination_id)
+        return self._symmetric.get((destination_id << 32) | origin_id)
+
+    def pair_discount_by_name(self, origin: str, destination: str) -> Optional[int]:
+        return self.pair_discount(self.id(origin), self.id(destination))
+
+    def save(self, path: str) -> None:
+        """
+        Writes the registry as a compact little-endian index file.
+        """
+        names = '\n'.join(self.names).encode('utf-8')
+        arrays = [array(a.typecode, a) for a in self._pair_arrays]
+        if sys.byteorder == 'big':
+            for a in arrays:
+                a.byteswap()
+        with open(path, 'wb') as f:
+            f.write(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, len(names), len(self.names),
+                                      len(arrays[0]), len(arrays[2])))
+            f.write(names)
+            f.write(self.types.tobytes())
+            for a in arrays:
+                f.write(a.tobytes())
+
+    @classmethod
+    def load(cls, path: str) -> 'CityRegistry':
+        """
+        Reads a registry from an index file written by save().
+        """
+        with open(path, 'rb') as f:
+            data = memoryview(f.read())
+        if len(data) < INDEX_HEADER.size:
+            raise CityIndexError(f"'{path}' is not a city index")
+        magic, version, names_size, cities, symmetric, directed = INDEX_HEADER.unpack_from(data)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            raise CityIndexError(f"'{path}' is not a version {INDEX_VERSION} city index")
+        offset = INDEX_HEADER.size
+        sizes = [names_size, cities, symmetric * 8, symmetric * 8, directed * 8, directed * 8]
+        if len(data) != offset + sum(sizes):
+            raise CityIndexError(f"'{path}' is truncated")
+        chunks = []
+        for size in sizes:
+            chunks.append(data[offset:offset + size])
+            offset += size
+        names = bytes(chunks[0]).decode('utf-8').split('\n') if names_size else []
+        arrays = []
+        for typecode, chunk in zip('BQqQq', chunks[1:]):
+            a = array(typecode)
+            a.frombytes(chunk)
+            if sys.byteorder == 'big' and typecode != 'B':
+                a.byteswap()
+            arrays.append(a)
+        return cls(names, *arrays)
+
+
+def default_registry() -> CityRegistry:
+    """
+    Builds the registry from cities.json and POPULAR_PAIRS_DISCOUNTS.
+    """
+    from shipments.config import POPULAR_PAIRS_DISCOUNTS, load_cities
+    cities = load_cities()
+    return CityRegistry.from_config(cities['big'], cities['small'], POPULAR_PAIRS_DISCOUNTS)
+
+
+@lru_cache(maxsize=1)
+def get_registry() -> CityRegistry:
+    """
+    Returns the city registry, loading it on first use ($SHIPMENTS_CITY_INDEX if set).
+    """
+    path = os.environ.get(CITY_INDEX_ENV_VAR)
+    if path:
+        return CityRegistry.load(path)
+    return default_registry()
+
+
+def read_pairs_csv(path: str) -> Dict[Tuple[str, str], float]:
+    """
+    Reads origin,destination,discount rows into pair discounts.
+    """
+    import csv
+    pairs: Dict[Tuple[str, str], float] = {}
+    with open(path, newline='') as f:
+        for row in csv.reader(f):
+            if row and not row[0].startswith('#'):
+                origin, destination, discount = (field.strip() for field in row)
+                pairs[(origin, destination)] = float(discount)
+    return pairs
+
+
+def main() -> None:
+    import argparse
+    import json
+    parser = argparse.ArgumentParser(prog='python -m shipments.cities', description='City registry tools')
+    sub = parser.add_subparsers(dest='command', required=True)
+    build = sub.add_parser('build', help='build a city index file')
+    build.add_argument('output_file')
+    build.add_argument('--cities', metavar='JSON', help='city file shaped like cities.json (default: cities.json)')
+    build.add_argument('--pairs', metavar='CSV',
+                       help='origin,destination,discount rows (default: POPULAR_PAIRS_DISCOUNTS)')
+    args = parser.parse_args()
+    from shipments.config import CITIES_CONFIG_PATH, POPULAR_PAIRS_DISCOUNTS
+    with open(args.cities or CITIES_CONFIG_PATH) as f:
+        cities = json.load(f)
+    pairs = read_pairs_csv(args.pairs) if args.pairs else POPULAR_PAIRS_DISCOUNTS
+    registry = CityRegistry.from_config(cities['big'], cities['small'], pairs)
+    registry.save(args.output_file)
+    print(f"{len(registry)} cities, {len(pairs)} pairs written to {args.output_file}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
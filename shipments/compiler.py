@@ -0,0 +1,193 @@
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+from shipments.cities import get_registry
+from shipments.config import PRICE_TABLE_CENTS
+from shipments.money import format_cents
+from shipments.parser import Fields, parse_fields, year_month
+from shipments.rulespec import CITY, LOWEST_PRICE, MONTHLY_CAP, NTH_FREE, PAIR_DISCOUNT, RuleStep
+
+# -----------------------------
+# Declarative rule specs and the rule compiler
+# -----------------------------
+# Every DiscountRule declares what it does as data: a tuple of RuleSteps
+# (see shipments/rulespec.py). compile_pricer() fuses an ordered
+# rule list into one per-shipment function (compile_rules() wraps it to take
+# and return whole lines):
+#   - the stateless steps (city adjustment, lowest price, pair discount) are
+#     evaluated once per (size, provider, origin, destination) route into a
+#     RoutePlan, so city types, pair lookups and is_free checks are not
+#     repeated per shipment;
+#   - only the per-month counters (FreeLargeRule) and the monthly cap run per
+#     shipment, writing each output field once.
+# The rule context has the same layout as with the rule classes, so the two
+# can share checkpoints. tests/test_compiler.py checks the compiled function
+# against the rule classes on randomized input.
+# -----------------------------
+
+STATELESS_EFFECTS = (CITY, LOWEST_PRICE, PAIR_DISCOUNT)
+
+
+class RoutePlan(NamedTuple):
+    """
+    Result of the stateless steps for one route, for a shipment that is not made free.
+    """
+    prefix: str             # 'SIZE PROVIDER ORIGIN DESTINATION' for the output line
+    ignored: bool
+    delivery_time: str
+    price: int              # Adjusted price, charged in full when there is no discount
+    final_price: int        # Price after the stateless discounts
+    discount: int           # Discount before the monthly cap
+    counters: Tuple[Tuple[str, str, int], ...]  # (count key, given key, nth) of the matching NTH_FREE steps
+
+
+def rule_steps(rule) -> Tuple[RuleStep, ...]:
+    """
+    Returns the steps declared by the class that implements rule.apply.
+    Raises ValueError if that class declares none (e.g. a custom rule that only overrides apply).
+    """
+    owner = next(cls for cls in type(rule).__mro__ if 'apply' in vars(cls))
+    steps = vars(owner).get('steps')
+    if steps is None:
+        raise ValueError(f"{type(rule).__name__} does not declare its steps and cannot be compiled")
+    return steps
+
+
+def _check_order(steps: Sequence[Tuple[object, RuleStep]]) -> None:
+    """
+    Rejects step orders the compiler cannot fuse: after the first NTH_FREE step every stateless
+    step must skip free shipments (so a free shipment's price is final), and MONTHLY_CAP must be
+    last and unconditional.
+    """
+    counting = False
+    for position, (_, step) in enumerate(steps):
+        if step.effect == MONTHLY_CAP:
+            if position != len(steps) - 1 or step.sizes is not None or step.providers is not None:
+                raise ValueError('the monthly cap must be the last rule step and apply to all shipments')
+        elif step.effect == NTH_FREE:
+            if not step.skip_free:
+                raise ValueError('free-shipment counters must skip shipments that are already free')
+            counting = True
+        elif step.effect not in STATELESS_EFFECTS:
+            raise ValueError(f"unknown rule effect {step.effect!r}")
+        elif counting and (not step.skip_free or step.effect == CITY):
+            raise ValueError(f"a {step.effect!r} step after a free-shipment counter must skip free shipments")
+
+
+def _plan(steps: Sequence[Tuple[object, RuleStep]], route: Tuple[str, str, str, str]) -> RoutePlan:
+    """
+    Evaluates the stateless steps for a route, in rule order.
+    """
+    size, provider, origin, destination = route
+    cities = get_registry()  # Shipments take their city ids and types from here
+    origin_id, destination_id = cities.id(origin), cities.id(destination)
+    otype, dtype = cities.type_of(origin_id), cities.type_of(destination_id)
+    price = final = PRICE_TABLE_CENTS[provider][size]
+    discount = 0
+    delivery, ignored = '-', False
+    counters = []
+    for rule, step in steps:
+        if not step.matches(size, provider):
+            continue
+        if step.effect == CITY:
+            if otype == 'unknown' or dtype == 'unknown':
+                ignored = True
+                continue
+            entry = rule.tables.routes[(size, provider, otype, dtype)]
+            delivery = entry.delivery_time
+            price += entry.city_adj
+            final += entry.city_adj
+        elif step.effect == NTH_FREE:
+            counters.append((f'{step.counter}_count', f'{step.counter}_discount_given', step.nth))
+        elif step.effect == LOWEST_PRICE:
+            final = rule.tables.routes[(size, provider, otype, dtype)].lowest_price
+            discount = price - final
+        elif step.effect == PAIR_DISCOUNT:
+            pair = rule.cities.pair_discount(origin_id, destination_id)
+            if pair is not None and pair > 0:
+                discount += min(pair, final)
+                final = max(0, final - pair)
+    return RoutePlan(' '.join(route), ignored, delivery, price, final, discount, tuple(counters))
+
+
+def compile_pricer(rules: Sequence) -> Callable[[Fields, Dict], Optional[str]]:
+    """
+    Fuses an ordered rule list (see build_rules) into one function that prices parsed fields
+    (see parse_fields), reading and updating the rule context like the rule classes do.
+    It returns the output line, or None if the shipment is ignored.
+    Raises ValueError for rules or orders that cannot be compiled.
+    """
+    steps = [(rule, step) for rule in rules for step in rule_steps(rule)]
+    _check_order(steps)
+    cap: Optional[int] = steps[-1][1].limit if steps and steps[-1][1].effect == MONTHLY_CAP else None
+    plans: Dict[Tuple[str, str, str, str], RoutePlan] = {}
+    fmt = format_cents
+
+    def price_fields(fields: Fields, context: Dict) -> Optional[str]:
+        date, route = fields[0], fields[1:]
+        plan = plans.get(route)
+        if plan is None:
+            plan = plans[route] = _plan(steps, route)
+        ym = year_month(date)
+        # Per-month counters: unknown-city shipments count too, like with the rule classes
+        free = False
+        for count_key, given_key, nth in plan.counters:
+            counts = context.setdefault(count_key, defaultdict(int))
+            given = context.setdefault(given_key, set())
+            counts[ym] += 1
+            if counts[ym] == nth and ym not in given:
+                given.add(ym)
+                free = True
+                break
+        if cap is None:
+            final, discount_str = (0 if free else plan.final_price), '-'
+        elif free:
+            final, discount_str = 0, fmt(plan.price)
+        else:
+            monthly_discount = context.setdefault('monthly_discount', defaultdict(int))
+            spent = monthly_discount[ym]
+            discount = plan.discount
+            if spent >= cap or discount <= 0:
+                final, discount_str = plan.price, '-'
+            else:
+                discount = min(discount, cap - spent)
+                monthly_discount[ym] = spent + discount
+                final, discount_str = plan.price - discount, fmt(discount)
+        if plan.ignored:
+            return None
+        return f"{date} {plan.prefix} {fmt(final)} {discount_str} {plan.delivery_time}"
+
+    return price_fields
+
+
+def compile_rules(rules: Sequence) -> Callable[[str, Dict], str]:
+    """
+    Like compile_pricer, but the function takes an input line and returns its output line
+    ('<line> Ignored' for lines that do not parse or are ignored).
+    """
+    price_fields = compile_pricer(rules)
+
+    def price_line(line: str, context: Dict) -> str:
+        fields = parse_fields(line)
+        result = None if fields is None else price_fields(fields, context)
+        return f"{line.strip()} Ignored" if result is None else result
+
+    return price_line
+
+
+def process_stream_compiled(lines: Iterable[str], context: Optional[Dict] = None) -> Iterator[str]:
+    """
+    Compiled equivalent of process_stream.
+    """
+    from shipments.__main__ import build_rules
+    if context is None:
+        context = {}
+    price_line = compile_rules(build_rules())
+    for line in lines:
+        yield price_line(line, context)
+
+
+def process_lines_compiled(lines: List[str]) -> List[str]:
+    """
+    Compiled equivalent of process_lines.
+    """
+    return list(process_stream_compiled(lines))
@@ -1,71 +1,98 @@
-import json
 import os
-from typing import Dict, Tuple, Set
+import sys
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+from shipments.cities import get_registry
+from shipments.money import format_cents, to_cents
 
-# Load city definitions from config file
-CITIES_CONFIG_PATH = os.path.join(os.path.dirname(__file__), '../cities.json')
-with open(CITIES_CONFIG_PATH, 'r') as f:
-    cities_data = json.load(f)
-BIG_CITIES: Set[str] = set(cities_data['big'])
-SMALL_CITIES: Set[str] = set(cities_data['small'])
-ALL_CITIES: Set[str] = BIG_CITIES | SMALL_CITIES
+# City definitions are read from this file on first use, not at import time
+CITIES_CONFIG_PATH = os.path.normpath(os.path.join(os.path.dirname(__file__), '..', 'cities.json'))
 
-# Price table: provider -> size -> price
+
+@lru_cache(maxsize=1)
+def load_cities() -> Dict[str, List[str]]:
+    """
+    Parses cities.json once and returns its big and small city lists.
+    Pricing reads cities through the registry (shipments.cities.get_registry()), not from here.
+    """
+    import json
+    with open(CITIES_CONFIG_PATH, 'r') as f:
+        return json.load(f)
+
+
+# Price table: provider -> size -> price (in euros; the rules work on PRICE_TABLE_CENTS)
 PRICE_TABLE: Dict[str, Dict[str, float]] = {
     'LP': {'XS': 1.00, 'S': 1.50, 'M': 4.90, 'L': 6.90, 'XL': 9.00},
     'MR': {'XS': 1.20, 'S': 2.00, 'M': 3.00, 'L': 4.00, 'XL': 7.00},
 }
+PRICE_TABLE_CENTS: Dict[str, Dict[str, int]] = {
+    provider: {size: to_cents(price) for size, price in prices.items()} for provider, prices in PRICE_TABLE.items()
+}
+
+# Enum codes for sizes and providers (index in the tuple is the code)
+SIZES: Tuple[str, ...] = ('XS', 'S', 'M', 'L', 'XL')
+PROVIDERS: Tuple[str, ...] = ('LP', 'MR')
+SIZE_CODES: Dict[str, int] = {size: code for code, size in enumerate(SIZES)}
+PROVIDER_CODES: Dict[str, int] = {provider: code for code, provider in enumerate(PROVIDERS)}
 
 # Maximum total discount allowed per month
 MONTHLY_DISCOUNT_CAP: float = 10.0
+MONTHLY_DISCOUNT_CAP_CENTS: int = to_cents(MONTHLY_DISCOUNT_CAP)
+
+# Account states kept in memory with --accounts (about 1.3 KB per account with two months of state)
+DEFAULT_MAX_ACCOUNTS: int = 50000
 
-# Special discounts for popular city pairs
+# Special discounts for popular city pairs (in euros, rounded to whole cents by the city registry)
 POPULAR_PAIRS_DISCOUNTS: Dict[Tuple[str, str], float] = {
     ('Paris', 'Lyon'): 0.5,
     ('Lyon', 'Paris'): 0.5,
     ('Lyon', 'Marseille'): 0.7,
     ('Paris', 'Nice'): 1.0,
-    # ...add both (A, B) and (B, A) for bidirectional
+    # A pair applies in both directions unless the reverse direction has its own entry
 }
 
 class Shipment:
     """
     Represents a single shipment record, including all fields needed for pricing and discount rules.
+    Uses __slots__ and interned strings so that large numbers of shipments stay compact in memory.
+    Prices and discounts are integer cents (see shipments/money.py).
     """
-    def __init__(self, date: str, size: str, provider: str, origin: str, destination: str):
-        self.date: str = date
-        self.size: str = size
-        self.provider: str = provider
-        self.origin: str = origin
-        self.destination: str = destination
-        self.price: float = PRICE_TABLE[provider][size]  # Base price before any rules
-        self.final_price: float = self.price  # Will be adjusted by rules
-        self.discount: float = 0.0
+    __slots__ = (
+        'date', 'size', 'provider', 'origin', 'destination',
+        'price', 'final_price', 'discount', 'discount_str', 'year_month',
+        'ignored', 'origin_id', 'destination_id', 'origin_type', 'destination_type', 'delivery_time',
+        'is_free', 'lowest_price_applied',
+    )
+
+    def __init__(self, date: str, size: str, provider: str, origin: str, destination: str,
+                 year_month: Optional[Tuple[str, str]] = None):
+        # Interning makes repeated values (dates, sizes, providers, cities) share one string object
+        self.date: str = sys.intern(date)
+        self.size: str = SIZES[SIZE_CODES[size]]
+        self.provider: str = PROVIDERS[PROVIDER_CODES[provider]]
+        self.origin: str = sys.intern(origin)
+        self.destination: str = sys.intern(destination)
+        self.price: int = PRICE_TABLE_CENTS[provider][size]  # Base price before any rules
+        self.final_price: int = self.price  # Will be adjusted by rules
+        self.discount: int = 0
         self.discount_str: str = '-'
-        # Extract year and month for monthly rules
-        yyyy, mm, *_ = date.split('-')
-        self.year_month: Tuple[str, str] = (yyyy, mm)  # (YYYY, MM)
+        # Extract year and month for monthly rules (the parser may pass them in precomputed)
+        if year_month is None:
+            yyyy, mm, *_ = date.split('-')
+            year_month = (sys.intern(yyyy), sys.intern(mm))
+        self.year_month: Tuple[str, str] = year_month  # (YYYY, MM)
         self.ignored: bool = False  # Set to True if the shipment should be ignored
-        self.origin_type: str = self.city_type(origin)  # 'big', 'small', or 'unknown'
-        self.destination_type: str = self.city_type(destination)
+        cities = get_registry()
+        self.origin_id: int = cities.id(origin)  # City registry ids (NO_CITY if unknown)
+        self.destination_id: int = cities.id(destination)
+        self.origin_type: str = cities.type_of(self.origin_id)  # 'big', 'small', or 'unknown'
+        self.destination_type: str = cities.type_of(self.destination_id)
         self.delivery_time: str = '-'  # Will be set by CityRule
         self.is_free: bool = False  # Set to True if shipment is made free by a rule
         self.lowest_price_applied: bool = False  # Set to True if lowest XS/S price rule applied
 
-    @staticmethod
-    def city_type(city: str) -> str:
-        """
-        Returns 'big', 'small', or 'unknown' for a given city name.
-        """
-        if city in BIG_CITIES:
-            return 'big'
-        elif city in SMALL_CITIES:
-            return 'small'
-        else:
-            return 'unknown'
-
     def output_line(self) -> str:
         """
         Formats the shipment's output line for display or file output.
         """
-        return f"{self.date} {self.size} {self.provider} {self.origin} {self.destination} {self.final_price:.2f} {self.discount_str} {self.delivery_time}" 
\ No newline at end of file
+        return f"{self.date} {self.size} {self.provider} {self.origin} {self.destination} {format_cents(self.final_price)} {self.discount_str} {self.delivery_time}" 
\ No newline at end of file
@@ -0,0 +1,124 @@
+import heapq
+import os
+import tempfile
+from itertools import count, tee
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+# -----------------------------
+# Out-of-order input (external sort)
+# -----------------------------
+# FreeLargeRule and MonthlyCapRule expect each month's lines in date order.
+# --sort accepts unsorted input by running it through two external sorts:
+#   1. input lines, keyed by (date, input index): buffered up to the memory
+#      budget, then sorted and spilled as runs to temporary files; the runs
+#      are merged back in chronological (year_month, date) order, with lines
+#      of the same day kept in input order;
+#   2. output lines, keyed by input index, the same way, so results come out
+#      in the original input order.
+# Lines that do not parse never touch rule state, so their sort key (the
+# first token) does not matter. Memory is bounded by the budget, not by the
+# input size.
+# -----------------------------
+
+DEFAULT_MEMORY_BUDGET = 256 << 20
+ENTRY_OVERHEAD = 120  # Approximate bytes per buffered entry beyond its text (tuple, int, str headers)
+MAX_FAN_IN = 64  # Most runs merged at once; more runs are first merged into longer runs
+
+
+def parse_size(text: str) -> int:
+    """
+    Parses a byte size such as '512K', '64M' or '2G' (plain numbers are bytes).
+    """
+    units = {'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30}
+    text = text.strip().upper().removesuffix('B')
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+def _sort_key(line: str) -> str:
+    """
+    Sort key for an input line: its date token ('' for blank lines).
+    """
+    parts = line.split(None, 1)
+    return parts[0] if parts else ''
+
+
+def _write_run(run: List[Tuple], path: str) -> None:
+    # One record per line: fields joined by tabs; only the last field may contain tabs
+    with open(path, 'w', encoding='utf-8', newline='\n') as f:
+        for record in run:
+            f.write('\t'.join(map(str, record)))
+            f.write('\n')
+
+
+def _read_run(path: str, decode: Callable[[str], Tuple]) -> Iterator[Tuple]:
+    with open(path, 'r', encoding='utf-8', newline='\n') as f:
+        for record in f:
+            yield decode(record[:-1])
+
+
+def _decode_input(record: str) -> Tuple[str, int, str]:
+    key, index, line = record.split('\t', 2)
+    return key, int(index), line
+
+
+def _decode_output(record: str) -> Tuple[int, str]:
+    index, line = record.split('\t', 1)
+    return int(index), line
+
+
+def external_sort(records: Iterable[Tuple], memory_budget: int, directory: str,
+                  decode: Callable[[str], Tuple]) -> Iterator[Tuple]:
+    """
+    Yields records in sorted order. Records are tuples whose last field is the only one that
+    may contain tabs and whose leading fields are unique, so the last field is never compared.
+    At most memory_budget bytes of records (approximately) are held in memory.
+    """
+    names = (os.path.join(directory, f'run{n}') for n in count())
+    runs: List[str] = []
+    buffer: List[Tuple] = []
+    buffered = 0
+    for record in records:
+        buffer.append(record)
+        buffered += len(record[-1]) + ENTRY_OVERHEAD
+        if buffered >= memory_budget:
+            buffer.sort()
+            runs.append(next(names))
+            _write_run(buffer, runs[-1])
+            buffer.clear()
+            buffered = 0
+    buffer.sort()
+    # Merge runs in groups until one merge pass can read them all
+    while len(runs) > MAX_FAN_IN:
+        group, runs = runs[:MAX_FAN_IN], runs[MAX_FAN_IN:]
+        runs.append(next(names))
+        _write_run(heapq.merge(*(_read_run(path, decode) for path in group)), runs[-1])
+        for path in group:
+            os.remove(path)
+    if not runs:
+        yield from buffer
+        return
+    yield from heapq.merge(buffer, *(_read_run(path, decode) for path in runs))
+
+
+def process_sorted(lines: Iterable[str], stream: Callable[[Iterable[str]], Iterator[str]],
+                   memory_budget: int = DEFAULT_MEMORY_BUDGET, directory: Optional[str] = None) -> Iterator[str]:
+    """
+    Processes input lines in chronological order with stream (e.g. process_stream) and yields
+    the output lines in the original input order. Spill files go to a temporary directory
+    (inside directory, if given), removed when done. The budget is shared by the two sorts.
+    """
+    with tempfile.TemporaryDirectory(prefix='shipments-sort-', dir=directory) as tmp:
+        input_dir, output_dir = os.path.join(tmp, 'input'), os.path.join(tmp, 'output')
+        os.mkdir(input_dir)
+        os.mkdir(output_dir)
+        ordered = external_sort(((_sort_key(line), index, line) for index, line in enumerate(lines)),
+                                memory_budget // 2, input_dir, _decode_input)
+        # Two views of the sorted input: lines for the engine and indexes for its results.
+        # tee only buffers what the engine reads ahead (one chunk at most).
+        for_engine, for_index = tee(ordered)
+        outputs = stream(line for _, _, line in for_engine)
+        results = ((index, output) for (_, index, _), output in zip(for_index, outputs))
+        for _, output in external_sort(results, memory_budget // 2, output_dir, _decode_output):
+            yield output
@@ -0,0 +1,169 @@
+import json
+from collections import Counter
+from time import perf_counter_ns
+from typing import Callable, Dict, List, Optional, Tuple
+from shipments.config import Shipment
+from shipments.parser import BAD_DATE, PARSE_FAILURE, invalid_reason
+from shipments.rules import DiscountRule
+
+# -----------------------------
+# Hot-path instrumentation
+# -----------------------------
+# Optional counters and latency histograms around parse_line and every
+# DiscountRule.apply, plus how many shipments each rule actually changed and
+# why lines were ignored. Nothing here runs unless instrumentation is enabled
+# (--stats PATH, or the SHIPMENTS_STATS environment variable read by
+# shipments/__main__.py); the plain pipeline is unchanged when it is off.
+# -----------------------------
+
+# Histogram bucket upper bounds, in nanoseconds
+BUCKETS_NS: Tuple[int, ...] = (250, 500, 1000, 2500, 5000, 10000, 25000, 100000, 1000000)
+
+UNKNOWN_CITY = 'unknown_city'  # Ignore reason for lines that parse but name a city that is not configured
+
+
+class LatencyStats:
+    """
+    Call count, cumulative time and a latency histogram for one instrumented function.
+    """
+    def __init__(self) -> None:
+        self.calls = 0
+        self.total_ns = 0
+        self.buckets: List[int] = [0] * (len(BUCKETS_NS) + 1)  # Last bucket is +Inf
+
+    def record(self, elapsed_ns: int) -> None:
+        self.calls += 1
+        self.total_ns += elapsed_ns
+        for i, bound in enumerate(BUCKETS_NS):
+            if elapsed_ns <= bound:
+                self.buckets[i] += 1
+                return
+        self.buckets[-1] += 1
+
+    def to_dict(self) -> Dict:
+        return {
+            'calls': self.calls,
+            'total_seconds': self.total_ns / 1e9,
+            'mean_ns': self.total_ns / self.calls if self.calls else 0.0,
+            'histogram_ns': {**{str(bound): count for bound, count in zip(BUCKETS_NS, self.buckets)},
+                             '+Inf': self.buckets[-1]},
+        }
+
+
+def _state(shipment: Shipment) -> Tuple:
+    """
+    The shipment fields a rule can change.
+    """
+    return (shipment.price, shipment.final_price, shipment.discount, shipment.discount_str,
+            shipment.delivery_time, shipment.ignored, shipment.is_free, shipment.lowest_price_applied)
+
+
+class InstrumentedRule(DiscountRule):
+    """
+    Wraps a rule, timing each apply call and counting the shipments it modifies.
+    """
+    def __init__(self, rule: DiscountRule, latency: LatencyStats, modified: Counter):
+        self.rule = rule
+        self.name = type(rule).__name__
+        self.latency = latency
+        self.modified = modified
+
+    def apply(self, shipment: Shipment, context: dict) -> None:
+        before = _state(shipment)
+        start = perf_counter_ns()
+        self.rule.apply(shipment, context)
+        self.latency.record(perf_counter_ns() - start)
+        if _state(shipment) != before:
+            self.modified[self.name] += 1
+
+
+class Instrumentation:
+    """
+    Collects parse and per-rule statistics for one run.
+    """
+    def __init__(self) -> None:
+        self.parse = LatencyStats()
+        self.rules: Dict[str, LatencyStats] = {}
+        self.modified: Counter = Counter()
+        self.ignored: Counter = Counter()
+
+    def wrap_rules(self, rules: List[DiscountRule]) -> List[DiscountRule]:
+        """
+        Returns the rules wrapped so that every apply call is recorded.
+        """
+        return [InstrumentedRule(rule, self.rules.setdefault(type(rule).__name__, LatencyStats()), self.modified)
+                for rule in rules]
+
+    def wrap_parse(self, parse: Callable[[str], Optional[Shipment]]) -> Callable[[str], Optional[Shipment]]:
+        """
+        Returns parse wrapped so that every call is recorded.
+        """
+        latency = self.parse
+
+        def instrumented(line: str) -> Optional[Shipment]:
+            start = perf_counter_ns()
+            shipment = parse(line)
+            latency.record(perf_counter_ns() - start)
+            return shipment
+        return instrumented
+
+    def record_ignored(self, line: str, shipment: Optional[Shipment]) -> None:
+        """
+        Counts an ignored line under its reason.
+        """
+        if shipment is None:
+            self.ignored[invalid_reason(line)] += 1
+        else:
+            self.ignored[UNKNOWN_CITY] += 1
+
+    def to_dict(self) -> Dict:
+        return {
+            'parse': self.parse.to_dict(),
+            'rules': {name: {**stats.to_dict(), 'modified': self.modified[name]}
+                      for name, stats in self.rules.items()},
+            'ignored': dict(self.ignored),
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), indent=2)
+
+    def to_prometheus(self) -> str:
+        """
+        Renders the statistics in the Prometheus text exposition format.
+        """
+        lines: List[str] = []
+
+        def histogram(name: str, help_text: str, series: List[Tuple[str, LatencyStats]]) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for labels, stats in series:
+                prefix = f"{labels}," if labels else ''
+                cumulative = 0
+                for bound, count in zip(BUCKETS_NS, stats.buckets):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{{prefix}le="{bound / 1e9:g}"}} {cumulative}')
+                lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {stats.calls}')
+                suffix = f"{{{labels}}}" if labels else ''
+                lines.append(f"{name}_sum{suffix} {stats.total_ns / 1e9:.9f}")
+                lines.append(f"{name}_count{suffix} {stats.calls}")
+
+        histogram('shipments_parse_seconds', 'Time spent parsing input lines.', [('', self.parse)])
+        histogram('shipments_rule_seconds', 'Time spent in DiscountRule.apply.',
+                  [(f'rule="{name}"', stats) for name, stats in self.rules.items()])
+        lines.append('# HELP shipments_rule_modified_total Shipments changed by each rule.')
+        lines.append('# TYPE shipments_rule_modified_total counter')
+        for name in self.rules:
+            lines.append(f'shipments_rule_modified_total{{rule="{name}"}} {self.modified[name]}')
+        lines.append('# HELP shipments_ignored_total Ignored input lines by reason.')
+        lines.append('# TYPE shipments_ignored_total counter')
+        for reason in (PARSE_FAILURE, BAD_DATE, UNKNOWN_CITY):
+            lines.append(f'shipments_ignored_total{{reason="{reason}"}} {self.ignored[reason]}')
+        return '\n'.join(lines) + '\n'
+
+    def export(self, path: str) -> None:
+        """
+        Writes the statistics to path: Prometheus text for *.prom files, JSON otherwise.
+        """
+        text = self.to_prometheus() if path.endswith('.prom') else self.to_json() + '\n'
+        with open(path, 'w') as f:
+            f.write(text)
@@ -0,0 +1,35 @@
+from typing import List
+
+# -----------------------------
+# Integer-cent money
+# -----------------------------
+# Prices and discounts are whole cents (int) throughout the rule chain, so
+# sums and the monthly cap are exact. Configured amounts in euros are
+# converted once with to_cents(); output goes through format_cents(), which
+# returns precomputed strings for amounts below TABLE_SIZE cents.
+# -----------------------------
+
+CENTS_PER_EURO = 100
+TABLE_SIZE = 100 * CENTS_PER_EURO  # Amounts up to 99.99 are formatted by lookup
+
+_SUFFIXES = ['.%02d' % cents for cents in range(CENTS_PER_EURO)]
+_FORMATTED: List[str] = [euros + suffix for euros in map(str, range(TABLE_SIZE // CENTS_PER_EURO))
+                         for suffix in _SUFFIXES]
+
+
+def to_cents(amount: float) -> int:
+    """
+    Converts an amount in euros to whole cents (rounded to the nearest cent).
+    """
+    return round(amount * CENTS_PER_EURO)
+
+
+def format_cents(cents: int) -> str:
+    """
+    Formats cents as euros with two decimals, e.g. 1250 -> '12.50' (same text as f"{cents / 100:.2f}").
+    """
+    if 0 <= cents < TABLE_SIZE:
+        return _FORMATTED[cents]
+    sign = '-' if cents < 0 else ''
+    euros, rest = divmod(abs(cents), CENTS_PER_EURO)
+    return f"{sign}{euros}{_SUFFIXES[rest]}"
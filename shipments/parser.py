@@ -0,0 +1,96 @@
+import re
+from functools import lru_cache
+from typing import Optional, Tuple
+from shipments.config import PROVIDER_CODES, SIZE_CODES, Shipment
+
+# -----------------------------
+# Fast-path input parser
+# -----------------------------
+# Accepts exactly the same lines as the original regex + strptime parser:
+#   ^(\d{4}-\d{2}-\d{2})\s+(XS|S|M|L|XL)\s+(LP|MR)\s+(\w+)\s+(\w+)$
+# but splits on whitespace instead of running the full regex on every line,
+# and memoizes date and city validation since both repeat heavily.
+# -----------------------------
+
+_DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+_WORD_RE = re.compile(r"\w+")
+_DAYS_IN_MONTH = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+# Reasons reported by invalid_reason()
+PARSE_FAILURE = 'parse_failure'
+BAD_DATE = 'bad_date'
+
+Fields = Tuple[str, str, str, str, str]  # (date, size, provider, origin, destination)
+
+
+@lru_cache(maxsize=4096)
+def is_valid_date(date: str) -> bool:
+    """
+    Returns True if date is a YYYY-MM-DD string naming a real calendar day
+    (the same days datetime.strptime accepts, without importing it).
+    Results are cached per date string.
+    """
+    if not _DATE_RE.fullmatch(date) or not date.isascii():  # strptime rejects non-ASCII digits
+        return False
+    year, month, day = int(date[:4]), int(date[5:7]), int(date[8:])
+    if year < 1 or not 1 <= month <= 12 or day < 1:
+        return False
+    leap = month == 2 and year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+    return day <= _DAYS_IN_MONTH[month - 1] + leap
+
+
+@lru_cache(maxsize=4096)
+def year_month(date: str) -> Tuple[str, str]:
+    """
+    Returns the shared (YYYY, MM) tuple for a date string.
+    """
+    return date[:4], date[5:7]
+
+
+@lru_cache(maxsize=65536)
+def is_valid_city(city: str) -> bool:
+    """
+    Returns True if city is a single word token (same as the regex's \\w+).
+    """
+    return _WORD_RE.fullmatch(city) is not None
+
+
+def parse_fields(line: str) -> Optional[Fields]:
+    """
+    Splits a line into (date, size, provider, origin, destination), or returns None if invalid.
+    """
+    parts = line.split()
+    if len(parts) != 5:
+        return None
+    date, size, provider, origin, destination = parts
+    if size not in SIZE_CODES or provider not in PROVIDER_CODES:
+        return None
+    if not is_valid_city(origin) or not is_valid_city(destination):
+        return None
+    if not is_valid_date(date):
+        return None
+    return date, size, provider, origin, destination
+
+
+def invalid_reason(line: str) -> Optional[str]:
+    """
+    Explains why parse_fields rejects a line: BAD_DATE if only the date is not a real
+    calendar day, PARSE_FAILURE otherwise. Returns None for a valid line.
+    """
+    if parse_fields(line) is not None:
+        return None
+    parts = line.split()
+    if (len(parts) == 5 and _DATE_RE.fullmatch(parts[0]) and parts[1] in SIZE_CODES
+            and parts[2] in PROVIDER_CODES and is_valid_city(parts[3]) and is_valid_city(parts[4])):
+        return BAD_DATE
+    return PARSE_FAILURE
+
+
+def parse_line(line: str) -> Optional[Shipment]:
+    """
+    Parses a line of input into a Shipment object, or returns None if invalid.
+    """
+    fields = parse_fields(line)
+    if fields is None:
+        return None
+    return Shipment(*fields, year_month=year_month(fields[0]))
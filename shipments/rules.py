@@ -1,11 +1,23 @@
 from collections import defaultdict
-from typing import Dict, Set
-from shipments.config import PRICE_TABLE, Shipment, MONTHLY_DISCOUNT_CAP, POPULAR_PAIRS_DISCOUNTS
+from typing import Dict, Optional, Set, Tuple
+from shipments.cities import CityRegistry, get_registry
+from shipments.rulespec import CITY, LOWEST_PRICE, MONTHLY_CAP, NTH_FREE, PAIR_DISCOUNT, RuleStep
+from shipments.config import Shipment, MONTHLY_DISCOUNT_CAP_CENTS
+from shipments.money import format_cents
+from shipments.tables import RuleTables, get_tables
 
 class DiscountRule:
     """
     Base class for all discount and adjustment rules.
+    Rules read fixed values from precompiled RuleTables (see shipments/tables.py).
+    All amounts are integer cents.
+    steps declares what apply() does as data, for the rule compiler (see shipments/rulespec.py).
     """
+    steps: Optional[Tuple[RuleStep, ...]] = None
+
+    def __init__(self, tables: Optional[RuleTables] = None):
+        self.tables: RuleTables = tables if tables is not None else get_tables()
+
     def apply(self, shipment: Shipment, context: dict) -> None:
         pass
 
@@ -13,6 +25,8 @@ class CityRule(DiscountRule):
     """
     Adjusts price and sets delivery time based on city types (big/small).
     """
+    steps = (RuleStep(CITY, skip_free=False),)
+
     def apply(self, shipment: 'Shipment', context: dict) -> None:
         otype = shipment.origin_type
         dtype = shipment.destination_type
@@ -20,18 +34,9 @@ class CityRule(DiscountRule):
             shipment.ignored = True  # Ignore if city is not recognized
             return
         # Price adjustment and delivery time
-        if otype == 'big' and dtype == 'big':
-            price_adj = 0
-            shipment.delivery_time = '1-3 days'
-        elif (otype == 'big' and dtype == 'small') or (otype == 'small' and dtype == 'big'):
-            price_adj = 1
-            shipment.delivery_time = '2-5 days'
-        elif otype == 'small' and dtype == 'small':
-            price_adj = 2
-            shipment.delivery_time = '3-6 days'
-        else:
-            price_adj = 0
-            shipment.delivery_time = '-'
+        route = self.tables.routes[(shipment.size, shipment.provider, otype, dtype)]
+        price_adj = route.city_adj
+        shipment.delivery_time = route.delivery_time
         shipment.price += price_adj  # Adjust base price
         shipment.final_price += price_adj  # Adjust final price (may be overwritten by other rules)
 
@@ -39,23 +44,16 @@ class LowestSPriceRule(DiscountRule):
     """
     Ensures XS and S packages are charged at the lowest XS/S price (plus city adjustment).
     """
+    steps = (RuleStep(LOWEST_PRICE, sizes=frozenset({'XS', 'S'})),)
+
     def apply(self, shipment: 'Shipment', context: dict) -> None:
         if shipment.is_free:
             return
         if shipment.size in ('XS', 'S'):
-            # Calculate city adjustment for this shipment
-            otype = shipment.origin_type
-            dtype = shipment.destination_type
-            if otype == 'big' and dtype == 'big':
-                city_adj = 0
-            elif (otype == 'big' and dtype == 'small') or (otype == 'small' and dtype == 'big'):
-                city_adj = 1
-            elif otype == 'small' and dtype == 'small':
-                city_adj = 2
-            else:
-                city_adj = 0
-            # Find the lowest price for this size among all providers, then add city adjustment
-            lowest_size_with_city = min(PRICE_TABLE[provider][shipment.size] for provider in PRICE_TABLE) + city_adj
+            # Lowest price for this size among all providers, plus city adjustment (precomputed)
+            route = self.tables.routes[(shipment.size, shipment.provider,
+                                        shipment.origin_type, shipment.destination_type)]
+            lowest_size_with_city = route.lowest_price
             shipment.discount = shipment.price - lowest_size_with_city
             shipment.final_price = lowest_size_with_city
             shipment.lowest_price_applied = True
@@ -65,6 +63,11 @@ class FreeLargeRule(DiscountRule):
     Every 3rd L package via LP per month is free (once per month).
     Every 4th XL package via LP per month is free (once per month).
     """
+    steps = (
+        RuleStep(NTH_FREE, sizes=frozenset({'L'}), providers=frozenset({'LP'}), counter='l_lp', nth=3),
+        RuleStep(NTH_FREE, sizes=frozenset({'XL'}), providers=frozenset({'LP'}), counter='xl_lp', nth=4),
+    )
+
     def apply(self, shipment: 'Shipment', context: dict) -> None:
         if shipment.is_free:
             return
@@ -76,7 +79,7 @@ class FreeLargeRule(DiscountRule):
                 l_lp_count[shipment.year_month] += 1
                 if l_lp_count[shipment.year_month] == 3 and shipment.year_month not in l_lp_discount_given:
                     shipment.discount = shipment.price
-                    shipment.final_price = 0.0
+                    shipment.final_price = 0
                     shipment.is_free = True
                     l_lp_discount_given.add(shipment.year_month)
             # XL logic: every 4th XL per month
@@ -86,7 +89,7 @@ class FreeLargeRule(DiscountRule):
                 xl_lp_count[shipment.year_month] += 1
                 if xl_lp_count[shipment.year_month] == 4 and shipment.year_month not in xl_lp_discount_given:
                     shipment.discount = shipment.price
-                    shipment.final_price = 0.0
+                    shipment.final_price = 0
                     shipment.is_free = True
                     xl_lp_discount_given.add(shipment.year_month)
 
@@ -94,19 +97,21 @@ class MonthlyCapRule(DiscountRule):
     """
     Caps total monthly discounts at a fixed amount (e.g., 10 EUR).
     """
+    steps = (RuleStep(MONTHLY_CAP, skip_free=False, limit=MONTHLY_DISCOUNT_CAP_CENTS),)
+
     def apply(self, shipment: 'Shipment', context: dict) -> None:
         if shipment.is_free:
-            shipment.final_price = 0.0
+            shipment.final_price = 0
             shipment.discount = shipment.price
-            shipment.discount_str = f"{shipment.discount:.2f}"
+            shipment.discount_str = format_cents(shipment.discount)
             return
-        # Track total discount given per month
-        monthly_discount: Dict = context.setdefault('monthly_discount', defaultdict(float))
-        available = MONTHLY_DISCOUNT_CAP - monthly_discount[shipment.year_month]
+        # Track total discount given per month (in cents, so the cap is exact)
+        monthly_discount: Dict = context.setdefault('monthly_discount', defaultdict(int))
+        available = MONTHLY_DISCOUNT_CAP_CENTS - monthly_discount[shipment.year_month]
         if available <= 0:
             # Cap reached, no discount, revert to original price and exit
             shipment.final_price = shipment.price
-            shipment.discount = 0.0
+            shipment.discount = 0
             shipment.discount_str = '-'
             return
         if shipment.discount > 0:
@@ -115,16 +120,16 @@ class MonthlyCapRule(DiscountRule):
                 shipment.discount = available
                 shipment.final_price = shipment.price - shipment.discount
                 monthly_discount[shipment.year_month] += shipment.discount
-                shipment.discount_str = f"{shipment.discount:.2f}"
+                shipment.discount_str = format_cents(shipment.discount)
             else:
                 # Full discount
                 shipment.final_price = shipment.price - shipment.discount
                 monthly_discount[shipment.year_month] += shipment.discount
-                shipment.discount_str = f"{shipment.discount:.2f}"
+                shipment.discount_str = format_cents(shipment.discount)
         else:
             # No discount
             shipment.final_price = shipment.price
-            shipment.discount = 0.0
+            shipment.discount = 0
             shipment.discount_str = '-'
 
 class PopularPairDiscountRule(DiscountRule):
@@ -132,20 +137,22 @@ class PopularPairDiscountRule(DiscountRule):
     Applies a special discount if the shipment is between a popular city pair.
     Only applies to S shipments (not XS, M, L, XL).
     """
+    steps = (RuleStep(PAIR_DISCOUNT, sizes=frozenset({'S'})),)
+
+    def __init__(self, tables: Optional[RuleTables] = None, cities: Optional[CityRegistry] = None):
+        super().__init__(tables)
+        # Must be the registry the shipments' city ids come from
+        self.cities: CityRegistry = cities if cities is not None else get_registry()
+
     def apply(self, shipment: 'Shipment', context: dict) -> None:
         if shipment.is_free:
             return
         if shipment.size != 'S':
             return
-        pair = (shipment.origin, shipment.destination)
-        pair_rev = (shipment.destination, shipment.origin)
-        discount = None
-        if pair in POPULAR_PAIRS_DISCOUNTS:
-            discount = POPULAR_PAIRS_DISCOUNTS[pair]
-        elif pair_rev in POPULAR_PAIRS_DISCOUNTS:
-            discount = POPULAR_PAIRS_DISCOUNTS[pair_rev]
+        # Symmetric integer pair keys, with directed overrides (see shipments/cities.py)
+        discount = self.cities.pair_discount(shipment.origin_id, shipment.destination_id)
         if discount is not None and discount > 0:
             # Only apply if discount is less than the current price
             shipment.discount += min(discount, shipment.final_price)
-            shipment.final_price = max(0.0, shipment.final_price - discount)
+            shipment.final_price = max(0, shipment.final_price - discount)
             # Note: discount_str will be set by MonthlyCapRule 
\ No newline at end of file
@@ -0,0 +1,36 @@
+from typing import FrozenSet, NamedTuple, Optional
+
+# -----------------------------
+# Declarative rule specs
+# -----------------------------
+# Every DiscountRule declares what it does as a tuple of RuleSteps: an
+# effect, the sizes/providers it applies to, whether free shipments skip it,
+# and its per-month counter or limit. The rule compiler
+# (shipments/compiler.py) fuses them into one function. This module has no
+# dependencies so that declaring steps costs nothing at startup.
+# -----------------------------
+
+# Effects a RuleStep can have
+CITY = 'city'                # Add the city-type price adjustment, set delivery time; unknown cities are ignored
+NTH_FREE = 'nth_free'        # The nth matching shipment of a month is free (once per month)
+LOWEST_PRICE = 'lowest_price'  # Charge the lowest price for the size among providers
+PAIR_DISCOUNT = 'pair_discount'  # Subtract the popular pair discount from the current price
+MONTHLY_CAP = 'monthly_cap'  # Cap the month's total discount; sets the discount text
+
+
+class RuleStep(NamedTuple):
+    """
+    One declarative step of a rule: effect applies to shipments matching sizes and providers
+    (None matches all). Steps with skip_free do nothing for a shipment already made free.
+    """
+    effect: str
+    sizes: Optional[FrozenSet[str]] = None
+    providers: Optional[FrozenSet[str]] = None
+    skip_free: bool = True
+    counter: Optional[str] = None  # NTH_FREE: context key prefix ('<counter>_count', '<counter>_discount_given')
+    nth: int = 0                   # NTH_FREE: position of the free shipment in the month
+    limit: int = 0                 # MONTHLY_CAP: the cap, in cents
+
+    def matches(self, size: str, provider: str) -> bool:
+        return ((self.sizes is None or size in self.sizes)
+                and (self.providers is None or provider in self.providers))
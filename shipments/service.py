@@ -0,0 +1,164 @@
+import argparse
+import asyncio
+import json
+from typing import Dict, List, Optional, Tuple
+from shipments.__main__ import process_stream
+
+# -----------------------------
+# Asyncio pricing service
+# -----------------------------
+# A long-running local service that prices shipments online with the same
+# rule chain as the batch tool. Clients send JSON lines over TCP or a Unix
+# socket:
+#   request:  {"id": <any>, "line": "2015-02-01 S MR Paris Lyon"}
+#   response: {"id": <same>, "result": "2015-02-01 S MR Paris Lyon 1.00 1.00 1-3 days"}
+# Responses on one connection may arrive out of order; match them by id.
+#
+# Concurrent requests are coalesced into micro-batches by a single batching
+# task, which is also the only code that touches the month context. Batches
+# are processed one at a time in arrival order, so free-shipment counts and
+# the monthly cap stay exact under concurrency.
+# -----------------------------
+
+
+class PricingService:
+    """
+    Prices shipment lines in micro-batches against a shared rule context.
+    """
+    def __init__(self, max_batch: int = 256, max_delay: float = 0.001, context: Optional[Dict] = None):
+        self.max_batch = max_batch
+        self.max_delay = max_delay  # Seconds to wait for more requests once a batch has started
+        self.context: Dict = {} if context is None else context
+        self.queue: 'asyncio.Queue[Tuple[str, asyncio.Future]]' = asyncio.Queue()
+        self.batches = 0
+        self.priced = 0
+
+    async def price(self, line: str) -> str:
+        """
+        Prices one input line and returns its output line.
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((line, future))
+        return await future
+
+    async def run(self) -> None:
+        """
+        Batching loop: collects queued requests and processes them in order.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch:
+                if self.queue.empty():
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    batch.append(self.queue.get_nowait())
+            self._process(batch)
+
+    def _process(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        try:
+            results = list(process_stream((line for line, _ in batch), self.context))
+        except Exception as e:  # Never leave callers waiting
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():  # The caller may have gone away
+                future.set_result(result)
+        self.batches += 1
+        self.priced += len(batch)
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        Serves one connection: reads JSON-line requests and writes JSON-line responses.
+        """
+        pending = set()
+
+        def respond(request_id, future: asyncio.Future) -> None:
+            pending.discard(future)
+            if writer.is_closing() or future.cancelled():
+                return
+            error = future.exception()
+            if error is None:
+                response = {'id': request_id, 'result': future.result()}
+            else:
+                response = {'id': request_id, 'error': str(error)}
+            writer.write(json.dumps(response).encode() + b'\n')
+
+        try:
+            while True:
+                try:
+                    raw = await reader.readline()
+                except (ValueError, asyncio.LimitOverrunError):
+                    # Longer than the reader's limit: the rest of the connection cannot be split into
+                    # requests reliably, so answer the ones already read and close it
+                    error = 'Bad request: line too long'
+                    writer.write(json.dumps({'id': None, 'error': error}).encode() + b'\n')
+                    break
+                if not raw:
+                    break
+                try:
+                    request = json.loads(raw)
+                except ValueError:
+                    request = None
+                line = request.get('line') if isinstance(request, dict) else None
+                if not isinstance(line, str):
+                    error = "Bad request: expected a JSON object with a string 'line'"
+                    writer.write(json.dumps({'id': None, 'error': error}).encode() + b'\n')
+                    continue
+                request_id = request.get('id')
+                task = asyncio.ensure_future(self.price(line))
+                pending.add(task)
+                task.add_done_callback(lambda future, request_id=request_id: respond(request_id, future))
+                await writer.drain()
+            if pending:
+                await asyncio.wait(pending)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(host: str = '127.0.0.1', port: int = 8765, unix_path: Optional[str] = None,
+                max_batch: int = 256, max_delay: float = 0.001) -> None:
+    """
+    Runs the pricing service until cancelled.
+    """
+    service = PricingService(max_batch, max_delay)
+    batcher = asyncio.ensure_future(service.run())
+    if unix_path:
+        server = await asyncio.start_unix_server(service.handle_client, path=unix_path)
+    else:
+        server = await asyncio.start_server(service.handle_client, host, port)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        batcher.cancel()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog='python -m shipments.service', description='Shipment pricing service')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', metavar='PATH', help='listen on a Unix socket instead of TCP')
+    parser.add_argument('--max-batch', type=int, default=256, help='largest micro-batch')
+    parser.add_argument('--max-delay', type=float, default=0.001, help='seconds to wait to fill a micro-batch')
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.unix, args.max_batch, args.max_delay))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,256 @@
+import argparse
+import json
+import sys
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from shipments.cities import CityRegistry, get_registry
+from shipments.config import MONTHLY_DISCOUNT_CAP, PRICE_TABLE, PROVIDER_CODES, SIZE_CODES
+from shipments.money import format_cents, to_cents
+from shipments.parser import parse_fields, year_month
+from shipments.rules import FreeLargeRule
+from shipments.tables import RuleTables
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; only the simulation needs it
+    np = None
+
+# -----------------------------
+# What-if tariff simulation
+# -----------------------------
+# Prices the same input under N candidate tariffs (PRICE_TABLE,
+# MONTHLY_DISCOUNT_CAP and POPULAR_PAIRS_DISCOUNTS variants) in one pass and
+# reports revenue and discount totals per tariff and month:
+#   python -m shipments.simulate tariffs.json input.txt
+# Lines are parsed once into route ids and months. Which shipments are free
+# (FreeLargeRule) and which are ignored does not depend on the tariff, so it
+# is worked out once. Per-route prices and pre-cap discounts are tabulated per
+# tariff, and MonthlyCapRule runs as a NumPy cumsum over (tariff x shipment)
+# matrices: a month's discount total before a shipment is the cumsum of the
+# discounts before it, and the shipment gets min(discount, cap - total
+# before), clipped at 0. A month is processed in blocks of about BLOCK_CELLS
+# cells, carrying each tariff's running total from one block to the next, so
+# memory does not grow with the size of a month.
+#
+# tariffs.json is a list of objects; missing keys keep the current values:
+#   [{"name": "current"},
+#    {"name": "cheap-s", "price_table": {"LP": {"S": 1.40}}, "monthly_discount_cap": 12.5,
+#     "popular_pairs_discounts": [["Paris", "Lyon", 0.5]]}]
+# price_table entries override single prices; popular_pairs_discounts
+# replaces the whole pair list. Without it a tariff uses the pair discounts of
+# the city registry in use (shipments/cities.py, $SHIPMENTS_CITY_INDEX if set),
+# like the pipeline does.
+# -----------------------------
+
+UNKNOWN = 'unknown'
+BLOCK_CELLS = 1 << 20  # (tariff x shipment) cells per block: 8 MiB per int64 matrix
+
+
+class Tariff(NamedTuple):
+    """
+    One candidate configuration.
+    """
+    name: str
+    price_table: Dict[str, Dict[str, float]]
+    monthly_discount_cap: float
+    popular_pairs_discounts: Optional[Dict[Tuple[str, str], float]]  # None: the city registry's pairs
+
+
+class MonthTotals(NamedTuple):
+    """
+    Totals of the priced (not ignored) shipments of one month under one tariff, in cents.
+    """
+    revenue: int
+    discount: int
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise ImportError("Tariff simulation requires numpy (pip install numpy).")
+
+
+def parse_tariffs(data: List[Dict]) -> List[Tariff]:
+    """
+    Builds tariffs from decoded tariffs.json data. Raises ValueError for unknown keys, sizes or providers.
+    """
+    if not isinstance(data, list) or not data:
+        raise ValueError('tariffs must be a non-empty list of objects')
+    tariffs = []
+    for index, entry in enumerate(data):
+        unknown = set(entry) - {'name', 'price_table', 'monthly_discount_cap', 'popular_pairs_discounts'}
+        if unknown:
+            raise ValueError(f"tariff {index}: unknown keys {sorted(unknown)}")
+        price_table = {provider: dict(prices) for provider, prices in PRICE_TABLE.items()}
+        for provider, prices in entry.get('price_table', {}).items():
+            for size, price in prices.items():
+                if provider not in PROVIDER_CODES or size not in SIZE_CODES:
+                    raise ValueError(f"tariff {index}: unknown provider or size {provider} {size}")
+                price_table[provider][size] = float(price)
+        pairs = None
+        if 'popular_pairs_discounts' in entry:
+            pairs = {(origin, destination): float(discount)
+                     for origin, destination, discount in entry['popular_pairs_discounts']}
+        tariffs.append(Tariff(str(entry.get('name', f'tariff{index}')), price_table,
+                              float(entry.get('monthly_discount_cap', MONTHLY_DISCOUNT_CAP)), pairs))
+    return tariffs
+
+
+def load_tariffs(path: str) -> List[Tariff]:
+    """
+    Reads tariffs from a JSON file (see the module comment for the format).
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        return parse_tariffs(json.load(f))
+
+
+class _Input(NamedTuple):
+    """
+    Parsed input shared by all tariffs: one entry per parsed line, in input order.
+    """
+    routes: List[Tuple[str, str, str, str]]  # Distinct (size, provider, origin, destination), by route id
+    route_ids: List[int]
+    months: List[Tuple[str, str]]            # (YYYY, MM) per line
+
+
+def _parse(lines: Iterable[str]) -> _Input:
+    routes: Dict[Tuple[str, str, str, str], int] = {}
+    route_ids: List[int] = []
+    months: List[Tuple[str, str]] = []
+    for line in lines:
+        fields = parse_fields(line)
+        if fields is None:
+            continue  # Never reaches the rules
+        rid = routes.get(fields[1:])
+        if rid is None:
+            rid = routes[fields[1:]] = len(routes)
+        route_ids.append(rid)
+        months.append(year_month(fields[0]))
+    return _Input(list(routes), route_ids, months)
+
+
+def _route_tables(tariffs: List[Tariff], routes: List[Tuple[str, str, str, str]]):
+    """
+    Returns (price, discount) arrays of shape (tariffs, routes) in cents: the price after the
+    city adjustment, and the discount of LowestSPriceRule and PopularPairDiscountRule before the cap.
+    Also returns the per-route ignored mask (an unknown origin or destination).
+    """
+    cities = get_registry()
+    types = [(cities.type_of(cities.id(origin)), cities.type_of(cities.id(destination)))
+             for _, _, origin, destination in routes]
+    ignored = np.array([UNKNOWN in pair for pair in types], dtype=bool)
+    price = np.zeros((len(tariffs), len(routes)), dtype=np.int64)
+    discount = np.zeros_like(price)
+    for t, tariff in enumerate(tariffs):
+        tables = RuleTables(tariff.price_table)
+        pairs = cities  # The pipeline's pair discounts
+        if tariff.popular_pairs_discounts is not None:
+            pairs = CityRegistry.from_config([], [], tariff.popular_pairs_discounts)
+        for r, ((size, provider, origin, destination), (otype, dtype)) in enumerate(zip(routes, types)):
+            entry = tables.routes[(size, provider, otype, dtype)]  # No adjustment if a city is unknown
+            route_price = price[t, r] = entry.price
+            if size in ('XS', 'S'):
+                final = entry.lowest_price
+                route_discount = route_price - final
+                pair = pairs.pair_discount_by_name(origin, destination) if size == 'S' else None
+                if pair is not None and pair > 0:
+                    route_discount += min(pair, final)
+                discount[t, r] = route_discount
+    return price, discount, ignored
+
+
+def _free_rows(parsed: _Input) -> 'np.ndarray':
+    """
+    FreeLargeRule, which is the same under every tariff: the nth shipment of each of its
+    counters (3rd L, 4th XL via LP) in a month is free.
+    """
+    free = np.zeros(len(parsed.route_ids), dtype=bool)
+    steps = FreeLargeRule.steps
+    step_by_route = [next((step for step in steps if step.matches(size, provider)), None)
+                     for size, provider, _, _ in parsed.routes]
+    counts: Dict[Tuple[str, Tuple[str, str]], int] = {}
+    for row, (rid, month) in enumerate(zip(parsed.route_ids, parsed.months)):
+        step = step_by_route[rid]
+        if step is not None:
+            key = (step.counter, month)
+            counts[key] = counts.get(key, 0) + 1
+            if counts[key] == step.nth:
+                free[row] = True
+    return free
+
+
+def simulate(lines: Iterable[str], tariffs: List[Tariff]) -> Dict[Tuple[str, str], List[MonthTotals]]:
+    """
+    Prices lines under every tariff. Returns {(YYYY, MM): [MonthTotals per tariff]}, months in first-seen order.
+    """
+    _require_numpy()
+    parsed = _parse(lines)
+    if not parsed.route_ids:
+        return {}
+    price, discount, route_ignored = _route_tables(tariffs, parsed.routes)
+    caps = np.array([to_cents(tariff.monthly_discount_cap) for tariff in tariffs], dtype=np.int64)[:, None]
+    rid = np.array(parsed.route_ids, dtype=np.int64)
+    free = _free_rows(parsed)
+    priced = ~route_ignored[rid]
+    month_codes: Dict[Tuple[str, str], int] = {}
+    month = np.array([month_codes.setdefault(ym, len(month_codes)) for ym in parsed.months], dtype=np.int64)
+
+    results: Dict[Tuple[str, str], List[MonthTotals]] = {}
+    order = np.argsort(month, kind='stable')  # Rows grouped by month, input order within a month
+    bounds = np.searchsorted(month[order], np.arange(len(month_codes) + 1))
+    block = max(1, BLOCK_CELLS // len(tariffs))
+    for ym, code in month_codes.items():
+        month_rows = order[bounds[code]:bounds[code + 1]]
+        spent = np.zeros((len(tariffs), 1), dtype=np.int64)  # Discounts of the month's earlier blocks
+        revenue = np.zeros(len(tariffs), dtype=np.int64)
+        discounts = np.zeros_like(revenue)
+        for start in range(0, len(month_rows), block):
+            rows = month_rows[start:start + block]
+            routes = rid[rows]
+            row_price = price[:, routes]
+            row_discount = np.where(free[rows], 0, discount[:, routes])
+            # MonthlyCapRule; ignored shipments count toward the cap as with the rule classes
+            total = spent + np.cumsum(row_discount, axis=1)
+            applied = np.clip(np.minimum(row_discount, caps - (total - row_discount)), 0, None)
+            spent = total[:, -1:]
+            paid = ~free[rows] & priced[rows]
+            given = free[rows] & priced[rows]
+            revenue += ((row_price - applied) * paid).sum(axis=1)
+            discounts += (applied * paid).sum(axis=1) + (row_price * given).sum(axis=1)
+        results[ym] = [MonthTotals(int(r), int(d)) for r, d in zip(revenue.tolist(), discounts.tolist())]
+    return results
+
+
+def format_results(results: Dict[Tuple[str, str], List[MonthTotals]], tariffs: List[Tariff]) -> Iterable[str]:
+    """
+    Yields 'TARIFF YYYY-MM REVENUE DISCOUNT' lines, by tariff and then by month.
+    """
+    for t, tariff in enumerate(tariffs):
+        for (yyyy, mm), totals in sorted(results.items()):
+            yield f"{tariff.name} {yyyy}-{mm} {format_cents(totals[t].revenue)} {format_cents(totals[t].discount)}"
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog='python -m shipments.simulate',
+                                     description='Compare revenue and discount totals under candidate tariffs')
+    parser.add_argument('tariffs', help='JSON file with a list of tariffs')
+    parser.add_argument('input_file', nargs='?', default='input.txt',
+                        help="input file, or '-' for stdin (default: input.txt)")
+    parser.add_argument('-o', '--output', metavar='PATH', help='write results to PATH instead of stdout')
+    args = parser.parse_args(argv)
+    from shipments.bulkio import open_output, read_lines_bulk, write_lines_bulk
+    try:
+        tariffs = load_tariffs(args.tariffs)
+    except (OSError, ValueError, TypeError) as e:
+        sys.exit(f"Invalid tariffs file '{args.tariffs}': {e}")
+    out = open_output(args.output)
+    try:
+        results = simulate(read_lines_bulk(args.input_file), tariffs)
+        write_lines_bulk(format_results(results, tariffs), out)
+    except FileNotFoundError:
+        print(f"Input file '{args.input_file}' not found.")
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+
+
+if __name__ == '__main__':
+    main()
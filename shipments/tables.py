@@ -0,0 +1,59 @@
+from functools import lru_cache
+from typing import Dict, NamedTuple, Tuple
+from shipments.cities import CITY_TYPES
+from shipments.config import PRICE_TABLE, SIZES
+from shipments.money import to_cents
+
+# -----------------------------
+# Precomputed rule tables
+# -----------------------------
+# Everything the rules look up is fixed for the life of a run, so it is
+# compiled once from PRICE_TABLE and the city types into a flat table of
+# integer-cent amounts:
+#   routes[(size, provider, origin_type, destination_type)] -> RouteEntry
+# Popular pair discounts live in the city registry (shipments/cities.py).
+# -----------------------------
+
+# (origin_type, destination_type) -> (price adjustment in euros, delivery time); any other pair adjusts nothing
+CITY_ADJUSTMENTS: Dict[Tuple[str, str], Tuple[int, str]] = {
+    ('big', 'big'): (0, '1-3 days'),
+    ('big', 'small'): (1, '2-5 days'),
+    ('small', 'big'): (1, '2-5 days'),
+    ('small', 'small'): (2, '3-6 days'),
+}
+
+
+class RouteEntry(NamedTuple):
+    """
+    Precomputed values for one (size, provider, origin_type, destination_type) combination.
+    """
+    city_adj: int           # Price adjustment for the city types, in cents
+    delivery_time: str      # Delivery time for the city types
+    price: int              # Base price plus city adjustment, in cents
+    lowest_price: int       # Lowest price for the size among providers, plus city adjustment, in cents
+
+
+class RuleTables:
+    """
+    Flat lookup tables compiled from the pricing configuration (prices in euros).
+    """
+    def __init__(self, price_table: Dict[str, Dict[str, float]]):
+        self.routes: Dict[Tuple[str, str, str, str], RouteEntry] = {}
+        for size in SIZES:
+            lowest = min(to_cents(price_table[provider][size]) for provider in price_table)
+            for provider in price_table:
+                price = to_cents(price_table[provider][size])
+                for otype in CITY_TYPES:
+                    for dtype in CITY_TYPES:
+                        adj, delivery = CITY_ADJUSTMENTS.get((otype, dtype), (0, '-'))
+                        adj = to_cents(adj)
+                        self.routes[(size, provider, otype, dtype)] = RouteEntry(
+                            adj, delivery, price + adj, lowest + adj)
+
+
+@lru_cache(maxsize=1)
+def get_tables() -> RuleTables:
+    """
+    Returns the rule tables for the current configuration, compiled on first use.
+    """
+    return RuleTables(PRICE_TABLE)
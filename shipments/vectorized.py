@@ -0,0 +1,652 @@
+from collections import defaultdict
+from functools import lru_cache
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from shipments.config import (PRICE_TABLE_CENTS, MONTHLY_DISCOUNT_CAP_CENTS, PROVIDERS, PROVIDER_CODES, SIZES,
+                              SIZE_CODES)
+from shipments.money import format_cents, to_cents
+from shipments.parser import is_valid_date, parse_fields, year_month
+from shipments.cities import CITY_TYPES, get_registry
+from shipments.tables import CITY_ADJUSTMENTS
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; only this engine needs it
+    np = None
+
+# -----------------------------
+# Vectorized batch pricing engine
+# -----------------------------
+# Prices input a block of bytes at a time (read_blocks_bulk). Every line is
+# read through a fixed window of its first bytes: the date, checked for its
+# dashes, and the text after it as 64-bit words, are hashed and looked up in
+# open-addressing tables of keys parse_fields has already accepted, so only
+# new dates and texts, and lines that do not fit the window (leading spaces,
+# non-ASCII bytes, long texts), are parsed one by one. Routes (size, provider,
+# origin, destination) are encoded once as integer-coded NumPy arrays (city
+# types, popular-pair discount, all amounts in int64 cents) and the
+# stateless rules (CityRule, LowestSPriceRule, PopularPairDiscountRule) are
+# evaluated per route with array ops and lookup tables.
+# The stateful rules (FreeLargeRule, MonthlyCapRule) then run in input order,
+# but only over the rows they can affect, using the same context dict layout
+# as the rule classes. Each route's output text is encoded once, with and
+# without its discount, so the output block is built as a byte matrix of
+# cached suffixes under each line's date and cut to the line lengths with a
+# single mask. Output is byte-identical to process_stream.
+#
+# benchmarks/bench_vectorized.py on 1M generated lines: about 12x the rule
+# classes in process and 7-8x end to end (python -m shipments), where about
+# 0.15 s of the NumPy run is interpreter startup and the numpy import.
+# -----------------------------
+
+UNKNOWN = CITY_TYPES.index('unknown')
+DATE_LENGTH = len('YYYY-MM-DD')
+TEXT_WIDTH = 48  # Longest text after the date that is looked up by hash; longer lines are parsed one by one
+PLACEHOLDER_DATE = '2000-01-01'  # A valid date to check route texts without their own date
+TEXT_WORDS = TEXT_WIDTH // 8
+LINE_WINDOW = DATE_LENGTH + TEXT_WIDTH
+DASH, NEWLINE, SPACE = ord('-'), ord('\n'), ord(' ')
+# A line's date is read as a little-endian word of its bytes 2-9, 'YY-MM-DD': the dashes are
+# its bytes 2 and 5, which the date key replaces with the century digits
+DASHES_MASK = 0xFF << 16 | 0xFF << 40
+DASHES = DASH << 16 | DASH << 40
+HIGH_BITS = 0x8080808080808080  # The high bit of each byte of a word: set for non-ASCII bytes
+# WORD_MASKS[j][length]: the bytes of word j of a text of that length that belong to the text
+WORD_MASKS = [[(1 << 8 * min(max(length - 8 * j, 0), 8)) - 1 for length in range(TEXT_WIDTH + 1)]
+              for j in range(TEXT_WORDS)]
+# Odd 64-bit multipliers of the text hash: one for the length, one per text word
+SLOT_MULTIPLIER = 0x9E3779B97F4A7C15  # Spreads keys over hash table slots
+HASH_MULTIPLIERS = [(SLOT_MULTIPLIER * (2 * k + 1)) % (1 << 64) for k in range(TEXT_WORDS + 1)]
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise ImportError("The vectorized engine requires numpy (pip install numpy).")
+
+
+@lru_cache(maxsize=65536)
+def _parse_slow(line: bytes) -> Tuple[Optional[str], Optional[Tuple[str, str, str, str]], bytes]:
+    """
+    Parses a line that is not looked up by its date and text: returns its date (None if the
+    line is invalid), its route and its Ignored output.
+    """
+    text = line.decode()
+    fields = parse_fields(text)
+    ignored_line = f"{text.strip()} Ignored\n".encode()
+    if fields is None:
+        return None, None, ignored_line
+    return fields[0], fields[1:], ignored_line
+
+
+def _first_rows(keys) -> Tuple:
+    """
+    Returns the index of one row per distinct value of a uint64 array, in no particular order,
+    and for each row the position of its value's row in that index: np.unique(keys,
+    return_index=True, return_inverse=True)[1:] without sorting. In each round every hash slot is
+    won by one of the rows that reach it, and the rows with the winner's value are done.
+    """
+    bits = len(keys).bit_length() + 1
+    slots = ((keys * np.uint64(SLOT_MULTIPLIER)) >> np.uint64(64 - bits)).astype(np.int64)
+    winners = np.empty(1 << bits, dtype=np.int64)
+    first_row = np.empty(len(keys), dtype=np.int64)
+    pending = np.arange(len(keys))
+    first = []
+    while len(pending):
+        winners[slots[pending]] = pending
+        winner = winners[slots[pending]]
+        first.append(pending[winner == pending])
+        done = keys[winner] == keys[pending]
+        first_row[pending[done]] = winner[done]
+        pending = pending[~done]
+    first = np.concatenate(first)
+    position = np.empty(len(keys), dtype=np.int64)
+    position[first] = np.arange(len(first))
+    return first, position[first_row]
+
+
+class _KeyIndex:
+    """
+    Hash table from uint64 keys to int64 values (open addressing with linear probing), looked
+    up and filled an array of keys at a time.
+    """
+    def __init__(self, bits: int = 10):
+        self.size = 0
+        self._allocate(bits)
+
+    def _allocate(self, bits: int) -> None:
+        self.bits = bits
+        self.keys = np.zeros(1 << bits, dtype=np.uint64)
+        self.values = np.zeros(1 << bits, dtype=np.int64)
+        self.filled = np.zeros(1 << bits, dtype=bool)
+
+    def _slots(self, keys):
+        return ((keys * np.uint64(SLOT_MULTIPLIER)) >> np.uint64(64 - self.bits)).astype(np.int64)
+
+    def get(self, keys) -> Tuple:
+        """
+        Returns the values of keys (arbitrary where a key is missing) and a mask of the keys found.
+        """
+        slots = self._slots(keys)
+        values = self.values[slots]
+        filled = self.filled[slots]
+        found = filled & (self.keys[slots] == keys)
+        # Keys whose slot holds another key probe the slots after it
+        pending = np.flatnonzero(filled & ~found)
+        while len(pending):
+            slot = slots[pending] = (slots[pending] + 1) & (len(self.keys) - 1)
+            filled = self.filled[slot]
+            hit = filled & (self.keys[slot] == keys[pending])
+            values[pending[hit]] = self.values[slot[hit]]
+            found[pending[hit]] = True
+            pending = pending[filled & ~hit]
+        return values, found
+
+    def add(self, keys, values) -> None:
+        """
+        Adds distinct keys that are not in the table yet. The table is kept at most a quarter full.
+        """
+        values = np.asarray(values, dtype=np.int64)
+        if 4 * (self.size + len(keys)) > len(self.keys):
+            old_keys, old_values = self.keys[self.filled], self.values[self.filled]
+            bits = self.bits
+            while 4 * (self.size + len(keys)) > 1 << bits:
+                bits += 1
+            self._allocate(bits)
+            self._insert(old_keys, old_values)
+        self._insert(keys, values)
+        self.size += len(keys)
+
+    def _insert(self, keys, values) -> None:
+        slots = self._slots(keys)
+        pending = np.arange(len(keys))
+        while len(pending):
+            slot = slots[pending]
+            # Each free slot takes the first key that reaches it in this round
+            taken = np.zeros(len(pending), dtype=bool)
+            taken[np.unique(slot, return_index=True)[1]] = True
+            taken &= ~self.filled[slot]
+            self.filled[slot[taken]] = True
+            self.keys[slot[taken]] = keys[pending[taken]]
+            self.values[slot[taken]] = values[pending[taken]]
+            pending = pending[~taken]
+            slots[pending] = (slot[~taken] + 1) & (len(self.keys) - 1)
+
+
+class VectorizedEngine:
+    """
+    Batch pricing engine that produces the same output as the scalar rule chain.
+    """
+    def __init__(self, context: Optional[Dict] = None):
+        _require_numpy()
+        self.context: Dict = {} if context is None else context
+        # Routes are distinct (size, provider, origin, destination) combinations, encoded once
+        self.routes: Dict[Tuple[str, str, str, str], int] = {}
+        self.route_prefixes: List[str] = []
+        self._route_codes: List[Tuple[int, ...]] = []
+        self._route_pair_discounts: List[int] = []
+        self._route_arrays: Optional[Tuple] = None
+        self._route_delivery: List[str] = []
+        # Output after the date, as bytes: two suffixes per route (see _format_routes) and the
+        # Ignored output of each route text; _suffix_table() packs them into one array. Suffix 0
+        # is empty, a placeholder for lines formatted one by one
+        self._suffixes: List[bytes] = [b'']
+        self._suffix_arrays: Tuple = (np.zeros((0, DATE_LENGTH), dtype=np.uint8), np.zeros(0, dtype=np.int64))
+        self._route_suffix_ids: List[int] = []
+        # Route texts (the bytes of a line after its date) -> text id, with the route id (-1 if
+        # the text makes the line invalid) and the Ignored suffix of each text id; _text_table()
+        # packs them into arrays and _text_index finds them by hash
+        self._texts: Dict[bytes, int] = {}
+        self._text_routes: List[int] = []
+        self._text_suffix_ids: List[int] = []
+        self._text_arrays: Optional[Tuple] = None
+        self._text_index = _KeyIndex()
+        # Calendar months seen so far: date key (see _price_block) -> month code (-1 for
+        # impossible dates) -> (YYYY, MM) context key
+        self._dates = _KeyIndex()
+        self._month_ids: Dict[Tuple[str, str], int] = {}
+        self.month_keys: List[Tuple[str, str]] = []
+        # Lookup tables (in cents) derived from PRICE_TABLE and CityRule
+        self.base_price = np.array([[PRICE_TABLE_CENTS[p][s] for s in SIZES] for p in PROVIDERS], dtype=np.int64)
+        self.lowest_price = np.array([min(PRICE_TABLE_CENTS[p][s] for p in PRICE_TABLE_CENTS) for s in SIZES],
+                                     dtype=np.int64)
+        self.city_adj = np.zeros((len(CITY_TYPES), len(CITY_TYPES)), dtype=np.int64)
+        self.delivery = np.full((len(CITY_TYPES), len(CITY_TYPES)), 0, dtype=np.int8)
+        self.delivery_times: List[str] = ['-']
+        for (otype, dtype), (adj, delivery) in CITY_ADJUSTMENTS.items():
+            o, d = CITY_TYPES.index(otype), CITY_TYPES.index(dtype)
+            self.city_adj[o, d] = to_cents(adj)
+            self.delivery[o, d] = len(self.delivery_times)
+            self.delivery_times.append(delivery)
+        # City types and popular pair discounts are looked up once per route
+        self.cities = get_registry()
+
+    def _route_id(self, route: Tuple[str, str, str, str]) -> int:
+        """
+        Registers a (size, provider, origin, destination) route and returns its id.
+        """
+        size, provider, origin, destination = route
+        rid = self.routes[route] = len(self.route_prefixes)
+        self.route_prefixes.append(' '.join(route))
+        cities = self.cities
+        origin_id, destination_id = cities.id(origin), cities.id(destination)
+        self._route_codes.append((
+            SIZE_CODES[size], PROVIDER_CODES[provider],
+            CITY_TYPES.index(cities.type_of(origin_id)), CITY_TYPES.index(cities.type_of(destination_id)),
+        ))
+        self._route_pair_discounts.append(cities.pair_discount(origin_id, destination_id) or 0)
+        self._route_arrays = None
+        return rid
+
+    def _route_columns(self) -> Tuple:
+        """
+        Applies the stateless rules to every route and returns per-route arrays: size and
+        provider codes, price after CityRule, discount before the monthly cap and ignored mask.
+        """
+        if self._route_arrays is None:
+            codes = np.array(self._route_codes, dtype=np.int32).reshape(-1, 4)
+            size, provider, otype, dtype = (codes[:, column] for column in range(4))
+            pair = np.array(self._route_pair_discounts, dtype=np.int64)
+
+            # CityRule: base price plus city adjustment; unknown cities are ignored
+            adj = self.city_adj[otype, dtype]
+            price = self.base_price[provider, size] + adj
+            ignored = (otype == UNKNOWN) | (dtype == UNKNOWN)
+
+            # LowestSPriceRule: XS/S at the lowest price for the size plus city adjustment
+            small = size <= SIZE_CODES['S']
+            lowest = self.lowest_price[size] + adj
+            discount = np.where(small, price - lowest, 0)
+            final = np.where(small, lowest, price)
+
+            # PopularPairDiscountRule: S shipments between popular city pairs
+            popular = (size == SIZE_CODES['S']) & (pair > 0)
+            discount = np.where(popular, discount + np.minimum(pair, final), discount)
+
+            self._route_arrays = (size, provider, price, discount, ignored)
+            self._format_routes(price, discount, self.delivery[otype, dtype])
+        return self._route_arrays
+
+    def _format_routes(self, price, discount, delivery) -> None:
+        """
+        Formats the output of the routes registered since the last call, as it reads after the
+        date: ' SIZE PROVIDER ORIGIN DESTINATION PRICE DISCOUNT DELIVERY\\n'. Each route gets two
+        suffixes: one with its discount given in full and, next to it, one with no discount.
+        """
+        fmt = format_cents
+        start = len(self._route_delivery)
+        for rid, (amount, shown, code) in enumerate(zip(price[start:].tolist(), discount[start:].tolist(),
+                                                        delivery[start:].tolist()), start):
+            delivery_time = self.delivery_times[code]
+            prefix = self.route_prefixes[rid]
+            self._route_delivery.append(delivery_time)
+            self._route_suffix_ids.append(len(self._suffixes))
+            self._add_suffix(f" {prefix} {fmt(amount - shown)} {fmt(shown) if shown > 0 else '-'} {delivery_time}\n")
+            self._add_suffix(f" {prefix} {fmt(amount)} - {delivery_time}\n")
+
+    def _add_suffix(self, text: str) -> int:
+        self._suffixes.append(text.encode())
+        return len(self._suffixes) - 1
+
+    def _suffix_table(self) -> Tuple:
+        """
+        Returns the suffixes as rows of a zero-padded uint8 array, each after DATE_LENGTH bytes of
+        room for the date, and the output size of each suffix. Suffixes added since the last call
+        are appended to the array.
+        """
+        table, sizes = self._suffix_arrays
+        new = self._suffixes[len(sizes):]
+        if new:
+            width = max(table.shape[1], DATE_LENGTH + max(map(len, new)))
+            room = bytes(DATE_LENGTH)
+            rows = np.frombuffer(b''.join(room + suffix.ljust(width - DATE_LENGTH, b'\0') for suffix in new),
+                                 dtype=np.uint8).reshape(len(new), width)
+            table = np.concatenate((np.pad(table, ((0, 0), (0, width - table.shape[1]))), rows))
+            sizes = np.concatenate((sizes, DATE_LENGTH + np.array(list(map(len, new)), dtype=np.int64)))
+            self._suffix_arrays = table, sizes
+        return table, sizes
+
+    def _route(self, route: Tuple[str, str, str, str]) -> int:
+        rid = self.routes.get(route)
+        return self._route_id(route) if rid is None else rid
+
+    def _month_code(self, date: str) -> int:
+        """
+        Returns the month code of a valid date, registering its (YYYY, MM) key on first use.
+        """
+        ym = year_month(date)
+        code = self._month_ids.get(ym)
+        if code is None:
+            code = self._month_ids[ym] = len(self.month_keys)
+            self.month_keys.append(ym)
+        return code
+
+    def _date_codes(self, keys):
+        """
+        Returns the month codes of date keys (see _price_block), -1 for dates that are not real
+        calendar days.
+        """
+        codes, found = self._dates.get(keys)
+        if not found.all():
+            missed = np.flatnonzero(~found)
+            first, inverse = _first_rows(keys[missed])
+            new = keys[missed[first]]
+            new_codes = np.array([self._date_code(key) for key in new.tolist()], dtype=np.int64)
+            self._dates.add(new, new_codes)
+            codes[missed] = new_codes[inverse]
+        return codes
+
+    def _date_code(self, key: int) -> int:
+        y3, y4, c1, m1, m2, c2, d1, d2 = key.to_bytes(8, 'little')
+        date = bytes((c1, c2, y3, y4, DASH, m1, m2, DASH, d1, d2)).decode()
+        return self._month_code(date) if is_valid_date(date) else -1
+
+    def _text_id(self, text: bytes) -> int:
+        """
+        Returns the id of a route text (the bytes of a line after its date), registering it on first use.
+        """
+        tid = self._texts.get(text)
+        if tid is None:
+            decoded = text.decode()
+            # Only the date column can make a line with this text invalid, and it is checked separately
+            fields = parse_fields(PLACEHOLDER_DATE + decoded)
+            tid = self._texts[text] = len(self._text_routes)
+            self._text_routes.append(-1 if fields is None else self._route(fields[1:]))
+            # The date has no whitespace, so line.strip() only strips the text's end
+            self._text_suffix_ids.append(self._add_suffix(f"{decoded.rstrip()} Ignored\n"))
+            self._text_arrays = None
+        return tid
+
+    def _text_table(self) -> Tuple:
+        """
+        Returns per text id: its words (one row per word, zero-padded to TEXT_WORDS), length,
+        route id and Ignored suffix id.
+        """
+        if self._text_arrays is None:
+            words = np.frombuffer(b''.join(text.ljust(TEXT_WIDTH, b'\0') for text in self._texts),
+                                  dtype='<u8').reshape(-1, TEXT_WORDS).T.copy()
+            self._text_arrays = (words, np.array(list(map(len, self._texts)), dtype=np.int64),
+                                 np.array(self._text_routes, dtype=np.int64),
+                                 np.array(self._text_suffix_ids, dtype=np.int64))
+        return self._text_arrays
+
+    def _find_texts(self, key, words, lengths) -> Tuple:
+        """
+        Looks texts up by their hash key and returns their ids and a mask of the texts found,
+        checked word by word (see _text_ids).
+        """
+        tid, found = self._text_index.get(key)
+        if self._texts:
+            known_words, known_lengths = self._text_table()[:2]
+            found &= known_lengths[tid] == lengths
+            for known, column in zip(known_words, words):
+                found &= known[tid] == column
+        return tid, found
+
+    def _text_ids(self, data: bytes, rows, words, lengths, offsets):
+        """
+        Returns the text ids of the lines in rows (other entries are arbitrary), given the words
+        of each line's text (one row per word, masked to the text's length), its length and its
+        offset in data. Texts are found by a hash of their words; new texts are registered once
+        per distinct hash.
+        """
+        key = lengths.astype(np.uint64) * np.uint64(HASH_MULTIPLIERS[0])
+        for column, multiplier in zip(words, HASH_MULTIPLIERS[1:]):
+            key += column * np.uint64(multiplier)
+        tid, found = self._find_texts(key, words, lengths)
+        missed = rows[~found[rows]]
+        if len(missed):
+            first = missed[_first_rows(key[missed])[0]]
+            new = key[first]
+            ids = np.array([self._text_id(data[offset:offset + length]) for offset, length in
+                            zip(offsets[first].tolist(), lengths[first].tolist())], dtype=np.int64)
+            # A hash that already belongs to another text stays with it
+            unindexed = ~self._text_index.get(new)[1]
+            self._text_index.add(new[unindexed], ids[unindexed])
+            tid[missed], found[missed] = self._find_texts(key[missed], words[:, missed], lengths[missed])
+            # Texts that share their hash with another text are looked up one by one
+            for row in missed[~found[missed]].tolist():
+                tid[row] = self._text_id(data[offsets[row]:offsets[row] + lengths[row]])
+        return tid
+
+    def _price_block(self, data: bytes, starts, ends) -> Tuple[bytes, 'np.ndarray']:
+        """
+        Prices the lines data[starts[i]:ends[i]] in order and returns their output (each line
+        ending in a newline) and the size of each line's output in bytes.
+        """
+        n = len(starts)
+        buf = np.frombuffer(data + bytes(LINE_WINDOW), dtype=np.uint8)
+        # Each line is read as its first LINE_WINDOW bytes: the date, whose 'YY-MM-DD' is read as
+        # one little-endian word, then the text as TEXT_WORDS words
+        window = np.lib.stride_tricks.sliding_window_view(buf, LINE_WINDOW)[starts]
+        date_word = window[:, 2:DATE_LENGTH].view('<u8')[:, 0]
+        words = window[:, DATE_LENGTH:].view('<u8')
+        lengths = ends - starts - DATE_LENGTH
+        # Lines that start with DATE_LENGTH ASCII characters, not whitespace at either end, are
+        # looked up by those characters and their text: their output, even when Ignored, is those
+        # characters and a suffix of the text
+        head = window[:, :8].view('<u8')[:, 0]
+        fast = ((((head | date_word) & np.uint64(HIGH_BITS)) == 0) & ((head & np.uint64(0xFF)) > SPACE)
+                & ((date_word >> np.uint64(56)) > SPACE) & (lengths > 0) & (lengths <= TEXT_WIDTH))
+        month = np.full(n, -1, dtype=np.int64)
+        rid = np.full(n, -1, dtype=np.int64)
+        suffix = np.zeros(n, dtype=np.int64)
+        rows = np.flatnonzero(fast)
+        dated = rows[(date_word[rows] & np.uint64(DASHES_MASK)) == np.uint64(DASHES)]
+        if len(dated):
+            # With its dashes checked, the date key holds the two century digits in their place
+            head = head[dated]
+            month[dated] = self._date_codes((date_word[dated] & ~np.uint64(DASHES_MASK))
+                                            | ((head & np.uint64(0xFF)) << np.uint64(16))
+                                            | (((head >> np.uint64(8)) & np.uint64(0xFF)) << np.uint64(40)))
+        if len(rows):
+            # Text bytes past the end of the line are zeroed, a word at a time
+            count = int(lengths[rows].max() + 7) // 8
+            word_masks = np.array(WORD_MASKS, dtype=np.uint64)
+            clipped = np.clip(lengths, 0, TEXT_WIDTH)
+            text = np.empty((count, n), dtype=np.uint64)
+            for j in range(count):
+                np.bitwise_and(words[:, j], word_masks[j][clipped], out=text[j])
+            tid = self._text_ids(data, rows, text, lengths, starts + DATE_LENGTH)[rows]
+            text_routes, text_suffixes = self._text_table()[2:]
+            rid[rows] = np.where(month[rows] >= 0, text_routes[tid], -1)
+            suffix[rows] = text_suffixes[tid]
+        # Other lines (leading whitespace, short or long lines) are parsed one by one
+        slow = np.flatnonzero(~fast).tolist()
+        slow_lines = []
+        for row, start, end in zip(slow, starts[slow].tolist(), ends[slow].tolist()):
+            date, route, ignored_line = _parse_slow(data[start:end])
+            if date is not None:
+                rid[row], month[row] = self._route(route), self._month_code(date)
+            slow_lines.append((row, date, ignored_line))
+
+        valid = np.flatnonzero(rid >= 0)
+        final = np.zeros(n, dtype=np.int64)
+        shown = np.zeros(n, dtype=np.int64)
+        full_discount = np.zeros(n, dtype=np.int64)
+        ignored = self._route_columns()[4]
+        if len(valid):
+            final[valid], shown[valid], full_discount[valid] = self.price(month[valid], rid[valid])
+            valid = valid[~ignored[rid[valid]]]
+        # Each line is output as its first DATE_LENGTH bytes and a suffix: one of its route's two
+        # suffixes (see _format_routes), or its text's Ignored output. Free and partly capped
+        # shipments and slow lines are formatted one by one.
+        suffix[valid] = np.array(self._route_suffix_ids, dtype=np.int64)[rid[valid]] + (shown[valid] == 0)
+        lines: Dict[int, bytes] = {}
+        for row in valid[(shown[valid] != 0) & (shown[valid] != full_discount[valid])].tolist():
+            lines[row] = self._format(data[starts[row]:starts[row] + DATE_LENGTH].decode(), int(rid[row]),
+                                      int(final[row]), int(shown[row]))
+        for row, date, ignored_line in slow_lines:
+            if date is not None and not ignored[rid[row]]:
+                lines[row] = self._format(date, int(rid[row]), int(final[row]), int(shown[row]))
+            else:
+                lines[row] = ignored_line
+
+        table, suffix_sizes = self._suffix_table()
+        sizes = suffix_sizes[suffix]
+        # Lines formatted one by one replace their row of the output, or are spliced into it if
+        # they are wider than the suffix table
+        spliced = sorted(row for row, line in lines.items() if len(line) > table.shape[1])
+        inline = [row for row in lines if len(lines[row]) <= table.shape[1]]
+        sizes[spliced] = 0
+        sizes[inline] = [len(lines[row]) for row in inline]
+        width = max(int(sizes.max()), DATE_LENGTH)
+        matrix = table[:, :width][suffix]
+        matrix[:, :DATE_LENGTH] = window[:, :DATE_LENGTH]
+        if inline:
+            matrix[inline] = np.frombuffer(b''.join(lines[row].ljust(width, b'\0') for row in inline),
+                                           dtype=np.uint8).reshape(-1, width)
+        output = matrix[(np.arange(width) < np.arange(width + 1)[:, None])[sizes]].tobytes()
+        if spliced:
+            pieces = []
+            previous = 0
+            for row, offset in zip(spliced, np.cumsum(sizes)[spliced].tolist()):
+                pieces += (output[previous:offset], lines[row])
+                previous = offset
+            pieces.append(output[previous:])
+            output = b''.join(pieces)
+            sizes[spliced] = [len(lines[row]) for row in spliced]
+        return output, sizes
+
+    def _format(self, date: str, rid: int, final: int, shown: int) -> bytes:
+        fmt = format_cents
+        return (f"{date} {self.route_prefixes[rid]} {fmt(final)} {fmt(shown) if shown else '-'} "
+                f"{self._route_delivery[rid]}\n").encode()
+
+    def process_block(self, data: bytes) -> bytes:
+        """
+        Processes a block of whole input lines, each ending in b'\\n' (see bulkio.read_blocks_bulk),
+        and returns their output lines.
+        """
+        if not data:
+            return b''
+        ends = np.flatnonzero(np.frombuffer(data, dtype=np.uint8) == NEWLINE)
+        starts = np.concatenate(([0], ends[:-1] + 1))
+        return self._price_block(data, starts, ends)[0]
+
+    def process(self, lines: List[str]) -> List[str]:
+        """
+        Processes one chunk of input lines and returns the output lines.
+        """
+        if not lines:
+            return []
+        encoded = list(map(str.encode, lines))
+        ends = np.cumsum(np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded)))
+        starts = np.concatenate(([0], ends[:-1]))
+        output, sizes = self._price_block(b''.join(encoded), starts, ends)
+        results = output.decode().split('\n')
+        results.pop()
+        if len(results) != len(lines):
+            # A line with a newline inside it keeps it in its Ignored output: cut by output sizes instead
+            offsets = np.cumsum(sizes).tolist()
+            results = [output[start:end - 1].decode() for start, end in zip([0] + offsets, offsets)]
+        return results
+
+    def price(self, month, rid) -> Tuple:
+        """
+        Prices encoded shipments (month codes and route ids) in input order.
+        Returns the final prices, the discounts shown (0 is shown as '-') and the discounts
+        before the monthly cap, in cents.
+        """
+        n = len(rid)
+        sizes, providers, route_price, route_discount, _ = self._route_columns()
+        size, provider = sizes[rid], providers[rid]
+        price = route_price[rid]
+        full_discount = route_discount[rid]
+        discount = full_discount.copy()
+
+        # Stateful rules (FreeLargeRule, MonthlyCapRule), one calendar month at a time, over the
+        # rows they can affect: LP L and XL shipments and shipments with a discount
+        lp = provider == PROVIDER_CODES['LP']
+        large = {'l': lp & (size == SIZE_CODES['L']), 'xl': lp & (size == SIZE_CODES['XL'])}
+        free = np.zeros(n, dtype=bool)
+        applied = np.zeros(n, dtype=bool)  # Discount applied (before any partial cap)
+        partial: List[Tuple[int, int]] = []
+        affected = np.flatnonzero(large['l'] | large['xl'] | (discount > 0))
+        # Input order within a month (a stable sort, by radix for month codes in 8 or 16 bits)
+        affected = affected[np.argsort(month[affected].astype(np.min_scalar_type(len(self.month_keys))),
+                                       kind='stable')]
+        months = month[affected]
+        for rows in np.split(affected, np.flatnonzero(months[1:] != months[:-1]) + 1):
+            if not len(rows):
+                continue
+            ym = self.month_keys[month[rows[0]]]
+            for prefix, nth in (('l', 3), ('xl', 4)):
+                self._free_large(rows[large[prefix][rows]], ym, prefix, nth, free)
+            rows = rows[(discount[rows] > 0) & ~free[rows]]
+            partial.extend(self._monthly_cap(rows, ym, discount, applied))
+        # Without a discount, MonthlyCapRule reverts to the adjusted price; free shipments show their price
+        shown = np.where(applied, discount, 0)
+        shown[free] = price[free]
+        for i, amount in partial:
+            shown[i] = amount
+        return price - shown, shown, full_discount
+
+    def _free_large(self, rows, ym: Tuple[str, str], prefix: str, nth: int, free) -> None:
+        """
+        FreeLargeRule for one month: the nth LP shipment of a size is free, once per month.
+        rows are the month's LP shipments of that size, in input order.
+        """
+        count: Dict = self.context.setdefault(f'{prefix}_lp_count', defaultdict(int))
+        given: set = self.context.setdefault(f'{prefix}_lp_discount_given', set())
+        before = count[ym]
+        count[ym] = before + len(rows)
+        if before < nth <= before + len(rows) and ym not in given:
+            free[rows[nth - before - 1]] = True
+            given.add(ym)
+
+    def _monthly_cap(self, rows, ym: Tuple[str, str], discount, applied) -> List[Tuple[int, int]]:
+        """
+        MonthlyCapRule for one month over rows with a positive discount, in input order.
+        Marks fully applied discounts in applied, zeroes discounts past the cap and returns
+        the (row, amount) pair of the one row that only got part of its discount, if any.
+        """
+        monthly_discount: Dict = self.context.setdefault('monthly_discount', defaultdict(int))
+        if not len(rows):
+            return []
+        amounts = discount[rows]
+        # running[k] is the month's total before row k (exact: amounts are cents)
+        running = np.cumsum(np.concatenate(([monthly_discount[ym]], amounts)))
+        available = MONTHLY_DISCOUNT_CAP_CENTS - running[:-1]
+        capped = np.flatnonzero((available <= 0) | (amounts > available))
+        stop = int(capped[0]) if len(capped) else len(rows)
+        applied[rows[:stop]] = True
+        total = int(running[stop])
+        partial = []
+        if stop < len(rows) and total < MONTHLY_DISCOUNT_CAP_CENTS:
+            # Only part of this discount fits under the cap; the month is then at the cap
+            partial.append((int(rows[stop]), MONTHLY_DISCOUNT_CAP_CENTS - total))
+            total = MONTHLY_DISCOUNT_CAP_CENTS
+        discount[rows[stop:]] = 0
+        monthly_discount[ym] = total
+        return partial
+
+
+def process_stream_vectorized(lines: Iterable[str], context: Optional[Dict] = None,
+                              chunk_size: int = 65536) -> Iterator[str]:
+    """
+    Vectorized equivalent of process_stream: processes lines in chunks of chunk_size.
+    """
+    engine = VectorizedEngine(context)
+    iterator = iter(lines)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield from engine.process(chunk)
+
+
+def process_blocks_vectorized(blocks: Iterable[bytes], context: Optional[Dict] = None) -> Iterator[bytes]:
+    """
+    Byte-level equivalent of process_stream: prices blocks of whole input lines (as made by
+    bulkio.read_blocks_bulk) and yields a block of output lines for each.
+    """
+    engine = VectorizedEngine(context)
+    for block in blocks:
+        yield engine.process_block(block)
+
+
+def process_lines_vectorized(lines: List[str]) -> List[str]:
+    """
+    Vectorized equivalent of process_lines.
+    """
+    return list(process_stream_vectorized(lines))
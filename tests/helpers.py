@@ -0,0 +1,19 @@
+import os
+import tempfile
+from typing import Callable, List, Optional, Sequence
+
+
+def run_cli(lines: Sequence[str], args: Sequence[str] = (), main: Optional[Callable] = None) -> List[str]:
+    """
+    Writes lines to an input file in a temporary directory, runs main(args + [input, '-o', output])
+    (python -m shipments by default) and returns the output lines.
+    """
+    if main is None:
+        from shipments.__main__ import main
+    with tempfile.TemporaryDirectory() as tmp:
+        path, out = os.path.join(tmp, 'input.txt'), os.path.join(tmp, 'out.txt')
+        with open(path, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        main([*args, path, '-o', out])
+        with open(out) as f:
+            return f.read().splitlines()
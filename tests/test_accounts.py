@@ -0,0 +1,95 @@
+import os
+import random
+import tempfile
+import unittest
+from unittest import mock
+from benchmarks.generator import generate
+from helpers import run_cli
+from shipments.__main__ import parse_args, process_lines
+from shipments.accounts import AccountStates, process_stream_accounts
+from shipments.config import DEFAULT_MAX_ACCOUNTS
+from shipments.rules import DiscountRule
+
+LINES = [
+    'shop1 2015-02-01 L LP Paris Lyon',
+    'shop2 2015-02-01 L LP Paris Lyon',
+    'shop1 2015-02-02 L LP Paris Lyon',
+    'shop2 2015-02-02 L LP Paris Lyon',
+    'shop1 2015-02-03 L LP Paris Lyon',  # shop1's 3rd L via LP this month
+    'shop2 2015-02-03 S MR Paris Nowhere',
+    'shop2 2015-02-04 L LP Paris Lyon',  # shop2's 3rd
+    'shop1 bad input',
+    '2015-02-05 S MR Paris Lyon',
+]
+
+
+def per_account_expected(lines):
+    # Each account's lines processed on their own with plain process_lines
+    by_account = {}
+    for index, line in enumerate(lines):
+        parts = line.split(None, 1)
+        by_account.setdefault(parts[0] if len(parts) == 2 else None, []).append(index)
+    expected = [''] * len(lines)
+    for account, indices in by_account.items():
+        results = process_lines([lines[i].split(None, 1)[1] if account else lines[i] for i in indices])
+        for i, result in zip(indices, results):
+            ignored = account is None or result.endswith(' Ignored')
+            expected[i] = f"{lines[i].strip()} Ignored" if ignored else f"{account} {result}"
+    return expected
+
+
+class TestAccounts(unittest.TestCase):
+    def test_accounts_have_separate_state(self):
+        results = list(process_stream_accounts(LINES))
+        self.assertEqual(results[4], 'shop1 2015-02-03 L LP Paris Lyon 0.00 6.90 1-3 days')
+        self.assertEqual(results[6], 'shop2 2015-02-04 L LP Paris Lyon 0.00 6.90 1-3 days')
+        self.assertEqual(results[5], 'shop2 2015-02-03 S MR Paris Nowhere Ignored')
+        self.assertEqual(results[7:], ['shop1 bad input Ignored', '2015-02-05 S MR Paris Lyon Ignored'])
+        self.assertEqual(results, per_account_expected(LINES))
+
+    def test_evicted_accounts_are_restored(self):
+        rng = random.Random(5)
+        lines = [f"seller{rng.randint(1, 40)} {line}" for line in generate(3000, seed=5, months=2)]
+        with tempfile.TemporaryDirectory() as tmp:
+            expected = per_account_expected(lines)
+            for engine in ('scalar', 'compiled'):
+                with self.subTest(engine=engine):
+                    states = AccountStates(max_accounts=3, directory=tmp)
+                    self.assertEqual(list(process_stream_accounts(lines, states, engine)), expected)
+                    self.assertGreater(states.loads, 0)
+                    self.assertLessEqual(len(states.contexts), 3)
+                    states.close()
+                    self.assertEqual(os.listdir(tmp), [])
+
+    def test_rules_without_steps(self):
+        # A custom rule that only overrides apply works with the default engine, not the compiled one
+        class IgnoreLyonRule(DiscountRule):
+            def apply(self, shipment, context):
+                if shipment.destination == 'Lyon':
+                    shipment.ignored = True
+
+        with mock.patch('shipments.__main__.build_rules', return_value=[IgnoreLyonRule()]):
+            results = list(process_stream_accounts(['shop1 2015-02-01 S MR Paris Lyon',
+                                                    'shop1 2015-02-01 S MR Paris Nice']))
+            self.assertEqual(results, ['shop1 2015-02-01 S MR Paris Lyon Ignored',
+                                       'shop1 2015-02-01 S MR Paris Nice 2.00 - -'])
+            with self.assertRaises(ValueError):
+                list(process_stream_accounts(LINES, engine='compiled'))
+
+    def test_cli_accounts(self):
+        for engine in ('scalar', 'compiled'):
+            self.assertEqual(run_cli(LINES, ['--accounts', '--max-accounts', '1', '--engine', engine]),
+                             per_account_expected(LINES))
+        # Without --accounts the account column makes every line invalid
+        self.assertEqual(run_cli(LINES)[:-1], [f"{line} Ignored" for line in LINES[:-1]])
+
+    def test_default_max_accounts(self):
+        # Without --max-accounts the --accounts branch uses DEFAULT_MAX_ACCOUNTS
+        with mock.patch('shipments.accounts.AccountStates.__init__', side_effect=ValueError) as init:
+            with self.assertRaises(ValueError):
+                run_cli(LINES, ['--accounts'])
+        init.assert_called_once_with(DEFAULT_MAX_ACCOUNTS)
+        self.assertIsNone(parse_args(['--accounts', 'input.txt']).max_accounts)
+
+if __name__ == '__main__':
+    unittest.main()
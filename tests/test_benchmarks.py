@@ -0,0 +1,57 @@
+import os
+import tempfile
+import unittest
+from benchmarks.__main__ import report, run_suite
+from benchmarks.bench_rules import (LegacyCityRule, LegacyLowestSPriceRule, LegacyPopularPairDiscountRule,
+                                    legacy_shipment)
+from benchmarks.generator import generate, write_workload
+from shipments.money import to_cents
+from shipments.parser import parse_fields, parse_line
+from shipments.rules import CityRule, LowestSPriceRule, PopularPairDiscountRule
+
+
+class TestBenchmarkSuite(unittest.TestCase):
+    def test_generator_is_seeded_and_ordered(self):
+        lines = list(generate(2000, seed=5, months=3, invalid_ratio=0.0))
+        self.assertEqual(lines, list(generate(2000, seed=5, months=3, invalid_ratio=0.0)))
+        self.assertNotEqual(lines, list(generate(2000, seed=6, months=3, invalid_ratio=0.0)))
+        dates = [line.split()[0] for line in lines]
+        self.assertEqual(dates, sorted(dates))
+        self.assertEqual({date[:7] for date in dates}, {'2015-01', '2015-02', '2015-03'})
+        self.assertTrue(all(parse_fields(line) for line in lines))
+
+    def test_invalid_ratio(self):
+        lines = list(generate(5000, seed=1, invalid_ratio=0.2))
+        invalid = sum(parse_fields(line) is None for line in lines)
+        self.assertTrue(800 < invalid < 1200, invalid)
+
+    def test_suite_reports_every_stage(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'workload.txt')
+            with open(path, 'w') as f:
+                write_workload(f, 1000, seed=1)
+            stages = run_suite(path, chunk_size=300)
+        result = report(stages, 1000, {})
+        self.assertEqual(list(result['stages']), [
+            'read', 'parse', 'rule.CityRule', 'rule.FreeLargeRule', 'rule.LowestSPriceRule',
+            'rule.PopularPairDiscountRule', 'rule.MonthlyCapRule', 'format', 'write'])
+        self.assertGreater(result['lines_per_second'], 0)
+
+    def test_legacy_rules_match_tables(self):
+        # bench_rules only compares speed, so both rule sets must price the same (in euros and in cents)
+        lines = list(generate(3000, seed=2, invalid_ratio=0.0))
+        outputs = []
+        for parse, rules, cents in (
+                (legacy_shipment, [LegacyCityRule(), LegacyLowestSPriceRule(), LegacyPopularPairDiscountRule()],
+                 to_cents),
+                (parse_line, [CityRule(), LowestSPriceRule(), PopularPairDiscountRule()], int)):
+            shipments = [parse(line) for line in lines]
+            for shipment in shipments:
+                for rule in rules:
+                    rule.apply(shipment, {})
+            outputs.append([(shipment.ignored, shipment.delivery_time, cents(shipment.final_price),
+                             cents(shipment.discount)) for shipment in shipments])
+        self.assertEqual(outputs[0], outputs[1])
+
+if __name__ == '__main__':
+    unittest.main()
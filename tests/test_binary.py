@@ -0,0 +1,105 @@
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+from shipments.__main__ import main, process_lines
+from shipments.binary import (FOOTER, BinaryFormatError, decode_input, decode_output, encode_input, process_records,
+                              read_input, write_output)
+from shipments.parser import parse_fields
+
+LINES = [
+    '2015-02-01 S MR Paris Lyon',
+    '2015-02-02 L LP Paris Nice',
+    '2015-02-03 L LP Dijon Paris',
+    '2015-02-05 L LP Paris Limoges',
+    '2015-02-29 M MR Paris Lyon',     # Impossible date: dropped by encode
+    '2015-02-06 S LP Paris Atlantis',  # Unknown city: kept, Ignored by the rules
+    'garbage',
+    '2015-03-01 XL LP Lyon Paris',
+    '2015-03-01 XS MR Bastia Tarbes',
+]
+
+
+class TestBinaryFormat(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.input_bin = os.path.join(self.tmp.name, 'input.bin')
+        with open(self.input_bin, 'wb') as f:
+            self.counts = encode_input(LINES, f)
+
+    def test_input_round_trip(self):
+        parsed = [line for line in LINES if parse_fields(line) is not None]
+        self.assertEqual(self.counts, (len(parsed), len(LINES) - len(parsed)))
+        self.assertEqual(list(decode_input(self.input_bin)), parsed)
+
+    def test_output_matches_text_pipeline(self):
+        parsed = list(decode_input(self.input_bin))
+        out = io.BytesIO()
+        self.assertEqual(write_output(process_records(read_input(self.input_bin)), out), len(parsed))
+        output_bin = os.path.join(self.tmp.name, 'output.bin')
+        with open(output_bin, 'wb') as f:
+            f.write(out.getvalue())
+        self.assertEqual(list(decode_output(output_bin)), process_lines(parsed))
+
+    def test_cli_binary_format(self):
+        output_bin = os.path.join(self.tmp.name, 'output.bin')
+        main(['--format', 'binary', self.input_bin, '-o', output_bin])
+        self.assertEqual(len(list(decode_output(output_bin))), self.counts[0])
+        with open(output_bin, 'rb') as f:
+            self.assertEqual(f.read(4), b'SHPO')
+
+    def test_missing_input_writes_nothing(self):
+        # Only the error message reaches stdout, no binary header
+        missing = os.path.join(self.tmp.name, 'missing.bin')
+        with mock.patch('sys.stdout', io.TextIOWrapper(io.BytesIO())) as stdout:
+            main(['--format', 'binary', missing])
+            stdout.flush()
+            self.assertEqual(stdout.buffer.getvalue().decode(), f"Input file '{missing}' not found.\n")
+
+    def test_rejects_other_files(self):
+        text = os.path.join(self.tmp.name, 'input.txt')
+        with open(text, 'w') as f:
+            f.write('\n'.join(LINES))
+        with self.assertRaises(BinaryFormatError):
+            list(read_input(text))
+        with self.assertRaises(BinaryFormatError):
+            list(decode_output(self.input_bin))
+        truncated = os.path.join(self.tmp.name, 'truncated.bin')
+        with open(self.input_bin, 'rb') as f, open(truncated, 'wb') as out:
+            out.write(f.read()[:-1])
+        with self.assertRaises(BinaryFormatError):
+            list(read_input(truncated))
+
+    def test_city_table_lists_used_cities(self):
+        with open(self.input_bin, 'rb') as f:
+            data = f.read()
+        start, size = FOOTER.unpack(data[-FOOTER.size:])
+        self.assertEqual(data[start:start + size].decode().split('\n'),
+                         ['Paris', 'Lyon', 'Nice', 'Dijon', 'Limoges', 'Atlantis', 'Bastia', 'Tarbes'])
+
+    def test_records_are_streamed(self):
+        out = io.BytesIO()
+        written = []
+
+        def lines():
+            for line in LINES:
+                written.append(out.tell())
+                yield line
+
+        with mock.patch('shipments.binary.WRITE_BUFFER', 1):
+            encode_input(lines(), out)
+        self.assertGreater(written[-1], written[0])
+
+    def test_numpy_view(self):
+        try:
+            from shipments.binary import load_array
+            records, cities = load_array(self.input_bin)
+        except ImportError:
+            self.skipTest('numpy is not installed')
+        self.assertEqual(len(records), self.counts[0])
+        self.assertEqual(cities[records['origin'][0]], 'Paris')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import io
+import os
+import tempfile
+import threading
+import unittest
+from shipments.bulkio import read_blocks_bulk, read_file_lines, read_stream_lines, write_lines_bulk
+
+CONTENT = 'a b\n\nc\r\nd\re\n  f  \n last'
+
+
+class TestBulkIO(unittest.TestCase):
+    def expected_lines(self, content: str):
+        # Text mode with universal newlines, as the pipeline used to read input
+        return [line.rstrip('\n') for line in io.StringIO(content, newline=None).readlines()]
+
+    def test_file_lines_match_text_mode(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'input.txt')
+            for content in (CONTENT, CONTENT + '\n', '', '\n', 'x' * 50 + '\n' + 'y' * 3):
+                with open(path, 'w', newline='') as f:
+                    f.write(content)
+                for block_size in (4, 7, 1 << 20):
+                    with self.subTest(content=content, block_size=block_size):
+                        self.assertEqual(list(read_file_lines(path, block_size=block_size)),
+                                         self.expected_lines(content))
+
+    def test_stream_lines_match_text_mode(self):
+        for block_size in (1, 3, 1 << 20):
+            stream = io.BytesIO(CONTENT.encode())
+            self.assertEqual(list(read_stream_lines(stream, block_size=block_size)), self.expected_lines(CONTENT))
+
+    @unittest.skipUnless(hasattr(os, 'mkfifo'), 'named pipes are not supported')
+    def test_file_lines_from_pipe(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'input.fifo')
+            os.mkfifo(path)
+
+            def write():
+                with open(path, 'w', newline='') as f:
+                    f.write(CONTENT)
+
+            writer = threading.Thread(target=write)
+            writer.start()
+            self.assertEqual(list(read_file_lines(path, block_size=4)), self.expected_lines(CONTENT))
+            writer.join()
+
+    def test_blocks_match_lines(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'input.txt')
+            for content in (CONTENT, CONTENT + '\r\n', '', '\r', 'x' * 50 + '\r\n' + 'y' * 3):
+                with open(path, 'w', newline='') as f:
+                    f.write(content)
+                for block_size in (4, 7, 1 << 20):
+                    with self.subTest(content=content, block_size=block_size):
+                        blocks = list(read_blocks_bulk(path, block_size=block_size))
+                        self.assertTrue(all(block.endswith(b'\n') and b'\r' not in block for block in blocks))
+                        self.assertEqual(b''.join(blocks).decode().split('\n')[:-1], self.expected_lines(content))
+
+    def test_write_lines_bulk(self):
+        out = io.BytesIO()
+        write_lines_bulk(['one', 'two', 'Paris'], out, buffer_size=5)
+        self.assertEqual(out.getvalue(), b'one\ntwo\nParis\n')
+
+if __name__ == '__main__':
+    unittest.main()
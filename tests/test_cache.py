@@ -0,0 +1,71 @@
+import os
+import tempfile
+import time
+import unittest
+from helpers import run_cli
+from shipments.__main__ import process_lines
+from shipments.cache import ResultCache, config_fingerprint, process_lines_cached, source_files
+
+LINES = [
+    '2015-01-03 L LP Paris Lyon',
+    '2015-02-01 S MR Paris Lyon',
+    '2015-01-04 L LP Paris Lyon',
+    '2015-02-02 S MR Paris Nice',
+    'garbage',
+    '2015-01-05 L LP Paris Lyon',
+    '2015-03-01 XL LP Dijon Albi',
+]
+
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.directory = os.path.join(self.tmp.name, 'cache')
+
+    def test_unchanged_months_are_served_from_cache(self):
+        expected = process_lines(LINES)
+        cache = ResultCache(self.directory)
+        self.assertEqual(process_lines_cached(LINES, cache), expected)
+        self.assertEqual((cache.hits, cache.misses), (0, 4))
+
+        cache = ResultCache(self.directory)
+        self.assertEqual(process_lines_cached(LINES, cache), expected)
+        self.assertEqual((cache.hits, cache.misses), (4, 0))
+
+        # Correcting one February line only re-prices February
+        changed = list(LINES)
+        changed[3] = '2015-02-02 S LP Paris Nice'
+        cache = ResultCache(self.directory)
+        self.assertEqual(process_lines_cached(changed, cache), process_lines(changed))
+        self.assertEqual((cache.hits, cache.misses), (3, 1))
+
+    def test_configuration_change_misses(self):
+        process_lines_cached(LINES, ResultCache(self.directory))
+        cache = ResultCache(self.directory, fingerprint='other configuration')
+        process_lines_cached(LINES, cache)
+        self.assertEqual(cache.hits, 0)
+        self.assertEqual(config_fingerprint(), config_fingerprint())
+        hashed = {os.path.basename(path) for path in source_files()}
+        self.assertLessEqual({'config.py', 'parser.py', 'rules.py', 'compiler.py', 'vectorized.py'}, hashed)
+
+    def test_lru_eviction(self):
+        cache = ResultCache(self.directory, max_bytes=100)
+        keys = [cache.key([str(i)]) for i in range(3)]
+        for key in keys[:2]:
+            cache.put(key, ['x' * 40])
+            time.sleep(0.01)
+        self.assertIsNotNone(cache.get(keys[0], 1))  # Refreshes the older entry
+        time.sleep(0.01)
+        cache.put(keys[2], ['y' * 40])  # Over the bound: the least recently used entry goes
+        self.assertIsNotNone(cache.get(keys[0], 1))
+        self.assertIsNone(cache.get(keys[1], 1))
+        self.assertIsNotNone(cache.get(keys[2], 1))
+
+    def test_cli_cache(self):
+        for _ in range(2):
+            self.assertEqual(run_cli(LINES, ['--cache', self.directory]), process_lines(LINES))
+        self.assertEqual(len(os.listdir(self.directory)), 4)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from collections import defaultdict
+from shipments.__main__ import main, parse_args, process_lines, process_stream
+from shipments.bulkio import write_lines_bulk
+from shipments.checkpoint import CheckpointError, decode_context, encode_context, process_incremental
+
+LINES = (
+    [f'2015-02-{i:02d} S MR Paris Lyon\n' for i in range(1, 15)]
+    + [f'2015-02-{i:02d} L LP Paris Lyon\n' for i in range(1, 5)]
+    + ['bad input\n', '2015-03-01 XL LP Paris Dijon\n']
+)
+
+
+class TestCheckpoint(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.input_file = os.path.join(self.tmp.name, 'input.txt')
+        self.checkpoint = os.path.join(self.tmp.name, 'checkpoint.json')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def run_incremental(self) -> str:
+        out = io.BytesIO()
+        process_incremental(self.input_file, self.checkpoint, out, process_stream, write_lines_bulk)
+        return out.getvalue().decode()
+
+    def test_incremental_runs_match_full_run(self):
+        output = ''
+        for start, end in ((0, 7), (7, 12), (12, 12), (12, len(LINES))):
+            with open(self.input_file, 'a') as f:
+                f.writelines(LINES[start:end])
+            output += self.run_incremental()
+        self.assertEqual(output.splitlines(), process_lines(LINES))
+
+    def test_partial_line_is_left_for_next_run(self):
+        with open(self.input_file, 'w') as f:
+            f.write(LINES[0] + '2015-02-02 S M')
+        first = self.run_incremental()
+        with open(self.input_file, 'a') as f:
+            f.write('R Paris Lyon\n')
+        second = self.run_incremental()
+        self.assertEqual((first + second).splitlines(), process_lines(LINES[:2]))
+
+    def test_newline_styles_match_run_without_checkpoint(self):
+        expected = process_lines(LINES)
+        for newline in ('\r\n', '\r'):
+            with self.subTest(newline=repr(newline)):
+                data = ''.join(line.replace('\n', newline) for line in LINES)
+                output = os.path.join(self.tmp.name, 'output.txt')
+                with open(self.input_file, 'w', newline='') as f:
+                    f.write(data)
+                main([self.input_file, '-o', output])
+                with open(output) as f:
+                    self.assertEqual(f.read().splitlines(), expected)
+                # Appended in pieces, some of them split between a \r and its \n
+                os.remove(self.input_file)
+                incremental = ''
+                for start in range(0, len(data), 37):
+                    with open(self.input_file, 'a', newline='') as f:
+                        f.write(data[start:start + 37])
+                    main(['--checkpoint', self.checkpoint, self.input_file, '-o', output])
+                    with open(output) as f:
+                        incremental += f.read()
+                os.remove(self.checkpoint)
+                self.assertEqual(incremental.splitlines(), expected)
+
+    def test_replaced_input_is_rejected(self):
+        with open(self.input_file, 'w') as f:
+            f.writelines(LINES[:5])
+        self.run_incremental()
+        with open(self.input_file, 'w') as f:
+            f.writelines(LINES[5:12])
+        with self.assertRaises(CheckpointError):
+            self.run_incremental()
+
+    def test_context_round_trip(self):
+        context = {
+            'l_lp_count': defaultdict(int, {('2015', '02'): 3}),
+            'l_lp_discount_given': {('2015', '02')},
+            'monthly_discount': defaultdict(float, {('2015', '02'): 0.1 + 0.2}),
+        }
+        decoded = decode_context(encode_context(context))
+        self.assertEqual(decoded, context)
+        self.assertEqual(decoded['monthly_discount'][('2015', '03')], 0.0)
+
+    def test_missing_checkpoint_directory_is_rejected(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'input.txt')
+            with open(path, 'w') as f:
+                f.write('2015-02-01 S MR Paris Lyon\n')
+            with contextlib.redirect_stderr(io.StringIO()) as err, self.assertRaises(SystemExit):
+                parse_args(['--checkpoint', os.path.join(tmp, 'missing', 'cp.json'), path])
+            self.assertIn('--checkpoint directory does not exist', err.getvalue())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import unittest
+from shipments.cities import NO_CITY, CityIndexError, CityRegistry
+from shipments.money import to_cents
+
+PAIRS = {('A', 'B'): 0.5, ('B', 'A'): 0.3, ('A', 'C'): 0.7, ('D', 'D'): 0.1, ('E', 'Z'): 0.2}
+
+
+class TestCityRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = CityRegistry.from_config(['A', 'B'], ['C', 'D', 'A'], PAIRS)
+
+    def test_ids_and_types(self):
+        registry = self.registry
+        self.assertEqual(registry.names[:4], ['A', 'B', 'C', 'D'])
+        self.assertEqual(registry.type_of(registry.id('A')), 'big')  # Listed as both: big wins
+        self.assertEqual(registry.type_of(registry.id('C')), 'small')
+        self.assertEqual(registry.type_of(registry.id('Z')), 'unknown')  # Only appears in a pair
+        self.assertEqual(registry.id('Nowhere'), NO_CITY)
+        self.assertEqual(registry.type_of(NO_CITY), 'unknown')
+
+    def test_pair_discounts(self):
+        # Each direction keeps its own entry; a pair listed once applies both ways
+        lookup = self.registry.pair_discount_by_name
+        self.assertEqual(lookup('A', 'B'), 50)  # Whole cents
+        self.assertEqual(lookup('B', 'A'), 30)
+        self.assertEqual(lookup('C', 'A'), 70)
+        self.assertEqual(lookup('D', 'D'), 10)
+        self.assertEqual(lookup('Z', 'E'), 20)
+        self.assertIsNone(lookup('B', 'C'))
+        self.assertIsNone(lookup('A', 'Nowhere'))
+
+    def test_matches_tuple_table(self):
+        rng = random.Random(3)
+        cities = [f"C{i}" for i in range(30)]
+        pairs = {(rng.choice(cities), rng.choice(cities)): rng.choice((0.1, 0.2, 0.3)) for _ in range(200)}
+        expected = {}
+        for (origin, destination), discount in pairs.items():
+            expected.setdefault((destination, origin), to_cents(discount))
+        expected.update((pair, to_cents(discount)) for pair, discount in pairs.items())
+        registry = CityRegistry.from_config(cities[:10], cities[10:], pairs)
+        for origin in cities:
+            for destination in cities:
+                self.assertEqual(registry.pair_discount_by_name(origin, destination),
+                                 expected.get((origin, destination)))
+
+    def test_index_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'cities.idx')
+            self.registry.save(path)
+            loaded = CityRegistry.load(path)
+            self.assertEqual(loaded.names, self.registry.names)
+            self.assertEqual(loaded.type_names, self.registry.type_names)
+            for origin, destination in PAIRS:
+                self.assertEqual(loaded.pair_discount_by_name(origin, destination),
+                                 self.registry.pair_discount_by_name(origin, destination))
+            with open(path, 'r+b') as f:
+                f.truncate(os.path.getsize(path) - 1)
+            with self.assertRaises(CityIndexError):
+                CityRegistry.load(path)
+
+    def test_pipeline_uses_index(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'cities.idx')
+            CityRegistry.from_config(['Paris', 'Kaunas'], [], {('Kaunas', 'Paris'): 0.25}).save(path)
+            result = subprocess.run(
+                [sys.executable, '-m', 'shipments', '-'], input='2015-02-01 S MR Paris Kaunas\n',
+                capture_output=True, text=True, check=True,
+                env={**os.environ, 'SHIPMENTS_CITY_INDEX': path},
+                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+            self.assertEqual(result.stdout, '2015-02-01 S MR Paris Kaunas 1.25 0.75 1-3 days\n')
+
+if __name__ == '__main__':
+    unittest.main()
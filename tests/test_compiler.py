@@ -0,0 +1,78 @@
+import itertools
+import random
+import unittest
+from benchmarks.generator import generate
+from helpers import run_cli
+from shipments.__main__ import build_rules, process_stream
+from shipments.compiler import compile_rules, process_stream_compiled
+from shipments.parser import parse_line
+from shipments.rules import DiscountRule, MonthlyCapRule
+from shipments.rulespec import MONTHLY_CAP, RuleStep
+
+
+def run_rule_classes(lines, rules, context):
+    # The rule classes one shipment at a time, as process_stream does with build_rules()
+    for line in lines:
+        shipment = parse_line(line)
+        if shipment is None:
+            yield f"{line.strip()} Ignored"
+            continue
+        for rule in rules:
+            rule.apply(shipment, context)
+        yield f"{line.strip()} Ignored" if shipment.ignored else shipment.output_line()
+
+
+class TestRuleCompiler(unittest.TestCase):
+    def test_matches_rule_classes_on_random_input(self):
+        for seed in range(8):
+            lines = list(generate(2000, seed=seed, months=3))
+            if seed % 2:
+                random.Random(seed).shuffle(lines)  # Not in date order
+            with self.subTest(seed=seed):
+                expected_context, context = {}, {}
+                expected = list(process_stream(lines, expected_context))
+                self.assertEqual(list(process_stream_compiled(lines, context)), expected)
+                self.assertEqual(context, expected_context)  # Same layout: checkpoints carry over
+
+    def test_matches_rule_subsets(self):
+        # Any ordered subset of the rule chain compiles to the same behaviour
+        lines = list(generate(1500, seed=11, months=3))
+        rules = build_rules()
+        for size in range(len(rules) + 1):
+            for subset in itertools.combinations(range(len(rules)), size):
+                with self.subTest(rules=[type(rules[i]).__name__ for i in subset]):
+                    chosen = [rules[i] for i in subset]
+                    expected_context, context = {}, {}
+                    expected = list(run_rule_classes(lines, chosen, expected_context))
+                    price_line = compile_rules(chosen)
+                    self.assertEqual([price_line(line, context) for line in lines], expected)
+                    self.assertEqual(context, expected_context)
+
+    def test_rejects_rules_it_cannot_compile(self):
+        class CustomRule(DiscountRule):
+            def apply(self, shipment, context):
+                shipment.final_price += 1
+
+        class SmallCapRule(MonthlyCapRule):
+            steps = (RuleStep(MONTHLY_CAP, sizes=frozenset({'S'})),)
+
+            def apply(self, shipment, context):
+                if shipment.size == 'S':
+                    super().apply(shipment, context)
+
+        with self.assertRaises(ValueError):
+            compile_rules(build_rules() + [CustomRule()])
+        with self.assertRaises(ValueError):
+            compile_rules([MonthlyCapRule()] + build_rules()[:-1])
+        with self.assertRaises(ValueError):
+            compile_rules(build_rules()[:-1] + [SmallCapRule()])
+        rules = build_rules()
+        with self.assertRaises(ValueError):  # City adjustment after the free-shipment counter
+            compile_rules([rules[1], rules[0]] + rules[2:])
+
+    def test_cli_engine(self):
+        lines = list(generate(300, seed=3, months=3))
+        self.assertEqual(run_cli(lines, ['--engine', 'compiled']), list(process_stream(lines)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import os
+import random
+import tempfile
+import unittest
+from benchmarks.generator import generate
+from helpers import run_cli
+from shipments.__main__ import process_lines, process_stream
+from shipments.extsort import _decode_output, external_sort, parse_size, process_sorted
+
+
+def shuffled_lines(count: int, seed: int):
+    # Generated lines plus one with odd spacing, out of date order
+    lines = list(generate(count, seed=seed, months=3, invalid_ratio=0.05)) + ['2015-01-05\tS  MR Paris\tLyon']
+    random.Random(seed).shuffle(lines)
+    return lines
+
+
+def expected_output(lines):
+    # Plain processing of the lines in stable date order, put back in input order
+    order = sorted(range(len(lines)), key=lambda i: (lines[i].split()[:1], i))
+    results = process_lines([lines[i] for i in order])
+    expected = [''] * len(lines)
+    for position, i in enumerate(order):
+        expected[i] = results[position]
+    return expected
+
+
+class TestExternalSort(unittest.TestCase):
+    def test_external_sort_spills_and_merges(self):
+        rng = random.Random(1)
+        records = [(rng.randint(0, 10 ** 6) * 1000 + i, f"line\t{i}") for i in range(500)]
+        self.assertNotEqual(records, sorted(records))
+        with tempfile.TemporaryDirectory() as tmp:
+            # A tiny budget spills every record: more runs than one merge pass can open
+            result = list(external_sort(records, 1, tmp, _decode_output))
+            self.assertEqual(result, sorted(records))
+            self.assertLessEqual(len(os.listdir(tmp)), 64)
+
+    def test_process_sorted_matches_sorted_input(self):
+        lines = shuffled_lines(400, seed=2)
+        expected = expected_output(lines)
+        for budget in (2000, 1 << 20):
+            with self.subTest(budget=budget), tempfile.TemporaryDirectory() as tmp:
+                self.assertEqual(list(process_sorted(lines, process_stream, budget, tmp)), expected)
+                self.assertEqual(os.listdir(tmp), [])  # Spill files are removed
+
+    def test_cli_sort(self):
+        lines = shuffled_lines(200, seed=3)
+        self.assertEqual(run_cli(lines, ['--sort', '--memory-budget', '4K']), expected_output(lines))
+
+    def test_parse_size(self):
+        self.assertEqual(parse_size('512'), 512)
+        self.assertEqual(parse_size('64M'), 64 << 20)
+        self.assertEqual(parse_size('1.5kb'), 1536)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+from shipments.__main__ import STATS_ENV_VAR, parse_args, process_lines, process_stream
+from shipments.instrumentation import Instrumentation
+from shipments.parser import BAD_DATE, PARSE_FAILURE, invalid_reason
+
+LINES = [
+    '2015-02-01 S MR Paris Lyon',      # lowest price, pair discount, cap
+    '2015-02-02 L LP Paris Lyon',
+    '2015-02-03 M MR Paris Lyon',      # only CityRule changes it
+    '2015-02-04 S MR Paris Nowhere',   # unknown city
+    '2015-02-30 S MR Paris Lyon',      # bad date
+    'bad input',                       # parse failure
+]
+
+
+class TestInstrumentation(unittest.TestCase):
+    def test_output_is_unchanged(self):
+        instrumentation = Instrumentation()
+        self.assertEqual(list(process_stream(LINES, instrumentation=instrumentation)), process_lines(LINES))
+
+    def test_counts(self):
+        instrumentation = Instrumentation()
+        list(process_stream(LINES, instrumentation=instrumentation))
+        stats = instrumentation.to_dict()
+        self.assertEqual(stats['parse']['calls'], 6)
+        self.assertEqual(stats['rules']['CityRule']['calls'], 4)
+        self.assertEqual(stats['rules']['CityRule']['modified'], 4)
+        self.assertEqual(stats['rules']['LowestSPriceRule']['modified'], 2)
+        self.assertEqual(stats['rules']['PopularPairDiscountRule']['modified'], 1)
+        self.assertEqual(stats['rules']['FreeLargeRule']['modified'], 0)
+        self.assertEqual(stats['ignored'], {'unknown_city': 1, BAD_DATE: 1, PARSE_FAILURE: 1})
+        self.assertEqual(sum(stats['rules']['MonthlyCapRule']['histogram_ns'].values()), 4)
+
+    def test_invalid_reason(self):
+        self.assertIsNone(invalid_reason('2015-02-01 S MR Paris Lyon'))
+        self.assertEqual(invalid_reason('2015-02-29 S MR Paris Lyon'), BAD_DATE)
+        self.assertEqual(invalid_reason('2015-02-29 Q MR Paris Lyon'), PARSE_FAILURE)
+
+    def test_export_formats(self):
+        instrumentation = Instrumentation()
+        list(process_stream(LINES, instrumentation=instrumentation))
+        with tempfile.TemporaryDirectory() as tmp:
+            json_path = os.path.join(tmp, 'stats.json')
+            prom_path = os.path.join(tmp, 'stats.prom')
+            instrumentation.export(json_path)
+            instrumentation.export(prom_path)
+            with open(json_path) as f:
+                self.assertEqual(json.load(f)['parse']['calls'], 6)
+            with open(prom_path) as f:
+                prom = f.read()
+        self.assertIn('shipments_rule_seconds_count{rule="CityRule"} 4', prom)
+        self.assertIn('shipments_parse_seconds_bucket{le="+Inf"} 6', prom)
+        self.assertIn('shipments_ignored_total{reason="bad_date"} 1', prom)
+
+    def test_stats_env_var_default(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'stats.json')
+            with mock.patch.dict(os.environ, {STATS_ENV_VAR: path}):
+                self.assertEqual(parse_args(['input.txt']).stats, path)
+                # Options that cannot record stats skip the env default with a warning instead of failing
+                with contextlib.redirect_stderr(io.StringIO()) as err:
+                    self.assertIsNone(parse_args(['--workers', '2', 'input.txt']).stats)
+                self.assertIn(STATS_ENV_VAR, err.getvalue())
+            with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+                parse_args(['--stats', path, '--workers', '2', 'input.txt'])
+
+if __name__ == '__main__':
+    unittest.main()
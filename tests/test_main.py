@@ -1,5 +1,9 @@
+import itertools
 import unittest
-from shipments.__main__ import process_lines
+from shipments.__main__ import build_rules, process_lines, process_stream
+from shipments.batch import ShipmentBatch
+from shipments.parser import parse_line
+from shipments.tables import RuleTables
 
 
 class TestShipmentDiscounts(unittest.TestCase):
@@ -200,5 +204,53 @@ class TestShipmentDiscounts(unittest.TestCase):
         ]
         self.assertEqual(process_lines(lines), expected)
 
+    def test_stream_is_lazy(self):
+        # An endless input must still produce results one line at a time
+        lines = itertools.cycle(['2015-02-01 S MR Paris Lyon', 'bad input'])
+        results = process_stream(lines)
+        self.assertEqual(next(results), '2015-02-01 S MR Paris Lyon 1.00 1.00 1-3 days')
+        self.assertEqual(next(results), 'bad input Ignored')
+
+    def test_shipment_is_compact(self):
+        shipment = parse_line('2015-02-01 S MR Paris Lyon')
+        self.assertFalse(hasattr(shipment, '__dict__'))
+        other = parse_line('2015-02-01 S MR Paris Lyon')
+        self.assertIs(shipment.origin, other.origin)  # Repeated strings are shared
+        self.assertIs(shipment.year_month, other.year_month)
+
+    def test_batch_round_trip(self):
+        lines = [
+            '2015-02-01 S MR Paris Lyon',
+            '2015-02-01 S MR Paris UnknownCity',
+            '2015-02-02 L LP Dijon Albi',
+            '2015-02-03 L LP Dijon Albi',
+            '2015-02-04 L LP Dijon Albi',
+            '2015-02-05 XS MR Bastia Nice',
+        ]
+        context: dict = {}
+        rules = build_rules()
+        shipments = []
+        for line in lines:
+            shipment = parse_line(line)
+            for rule in rules:
+                rule.apply(shipment, context)
+            shipments.append(shipment)
+        batch = ShipmentBatch.from_shipments(shipments)
+        self.assertEqual(len(batch), len(lines))
+        for original, restored in zip(shipments, batch):
+            self.assertEqual(restored.ignored, original.ignored)
+            self.assertEqual(restored.is_free, original.is_free)
+            self.assertEqual(restored.output_line(), original.output_line())
+        self.assertLess(batch.nbytes(), 64 * len(batch))
+
+    def test_rule_tables(self):
+        price_table = {'LP': {size: 1.0 for size in ('XS', 'S', 'M', 'L', 'XL')},
+                       'MR': {size: 2.0 for size in ('XS', 'S', 'M', 'L', 'XL')}}
+        tables = RuleTables(price_table)
+        route = tables.routes[('S', 'MR', 'small', 'small')]
+        self.assertEqual((route.city_adj, route.delivery_time, route.price, route.lowest_price),
+                         (200, '3-6 days', 400, 300))  # Cents
+        self.assertEqual(tables.routes[('L', 'LP', 'big', 'unknown')].delivery_time, '-')
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
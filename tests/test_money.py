@@ -0,0 +1,30 @@
+import unittest
+from shipments.config import Shipment
+from shipments.money import TABLE_SIZE, format_cents, to_cents
+from shipments.rules import MonthlyCapRule
+
+
+class TestMoney(unittest.TestCase):
+    def test_format_cents_matches_float_formatting(self):
+        for cents in list(range(-250, TABLE_SIZE + 250)) + [123456789, -98765]:
+            self.assertEqual(format_cents(cents), f"{cents / 100:.2f}")
+
+    def test_to_cents_rounds(self):
+        self.assertEqual(to_cents(6.90), 690)
+        self.assertEqual(to_cents(0.1 + 0.2), 30)
+        self.assertEqual(to_cents(10.0), 1000)
+
+    def test_monthly_cap_is_exact(self):
+        # 100 discounts of 0.10 reach the 10.00 cap exactly; summed as floats they stop just short
+        # (9.99999999999998) and the next shipment would get a '0.00' discount
+        rule, context = MonthlyCapRule(), {}
+        for day in range(101):
+            shipment = Shipment(f"2015-02-{day % 28 + 1:02d}", 'S', 'MR', 'Paris', 'Lyon')
+            shipment.discount = 10
+            shipment.final_price = shipment.price - 10
+            rule.apply(shipment, context)
+        self.assertEqual(context['monthly_discount'][('2015', '02')], 1000)
+        self.assertEqual((shipment.final_price, shipment.discount_str), (shipment.price, '-'))
+
+if __name__ == '__main__':
+    unittest.main()
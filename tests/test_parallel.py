@@ -0,0 +1,31 @@
+import contextlib
+import io
+import random
+import unittest
+from benchmarks.generator import generate
+from shipments.__main__ import parse_args, process_lines
+from shipments.parallel import partition_by_month, process_lines_parallel
+
+
+class TestParallelProcessing(unittest.TestCase):
+    def test_partition_by_month(self):
+        lines = ['2015-02-01 S MR Paris Lyon', 'bad input', '2015-03-01 S MR Paris Lyon',
+                 '', '2015-02-02 L LP Paris Lyon']
+        months = partition_by_month(lines)
+        self.assertEqual(months['2015-02'], [0, 4])
+        self.assertEqual(months['2015-03'], [2])
+        self.assertEqual(sorted(i for indices in months.values() for i in indices), list(range(len(lines))))
+
+    def test_matches_serial_output(self):
+        lines = list(generate(2000, seed=3, months=6, invalid_ratio=0.05)) + ['   ']
+        random.Random(3).shuffle(lines)
+        self.assertEqual(process_lines_parallel(lines, workers=2), process_lines(lines))
+
+    def test_rejects_invalid_worker_count(self):
+        for workers in ('0', '-2'):
+            with self.subTest(workers=workers), self.assertRaises(SystemExit), \
+                    contextlib.redirect_stderr(io.StringIO()):
+                parse_args(['--workers', workers, 'input.txt'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import random
+import unittest
+from benchmarks.bench_parser import legacy_parse_line
+from shipments.parser import parse_fields, parse_line
+
+
+def _fields(shipment):
+    if shipment is None:
+        return None
+    return (shipment.date, shipment.size, shipment.provider, shipment.origin,
+            shipment.destination, shipment.year_month)
+
+
+class TestFastParser(unittest.TestCase):
+    def test_matches_legacy_parser(self):
+        lines = [
+            '2015-02-01 S MR Paris Lyon',
+            '  2015-02-01\tS  MR Paris Lyon \n',  # extra whitespace and tabs
+            '2016-02-29 XL LP Dijon Albi',        # leap day
+            '2015-02-29 S MR Paris Lyon',         # not a leap year
+            '2015-13-01 S MR Paris Lyon',
+            '2015-00-10 S MR Paris Lyon',
+            '2015-01-32 S MR Paris Lyon',
+            '0000-01-01 S MR Paris Lyon',         # year out of range
+            '٢٠١٥-٠٢-٠١ S MR Paris Lyon',         # non-ASCII digits
+            '15-01-01 S MR Paris Lyon',
+            '2015-1-01 S MR Paris Lyon',
+            '2015-01-01 s MR Paris Lyon',         # sizes are case sensitive
+            '2015-01-01 S MR Paris-Nord Lyon',    # cities are single words
+            '2015-01-01 S MR Paris Lyon extra',
+            '2015-01-01 S MR Paris',
+            '2015-01-01 S MR Saint_Étienne Lyon',
+            '',
+        ]
+        for line in lines:
+            with self.subTest(line=line):
+                self.assertEqual(_fields(parse_line(line)), _fields(legacy_parse_line(line)))
+
+    def test_matches_legacy_parser_randomized(self):
+        rng = random.Random(42)
+        tokens = ['2015-02-01', '2015-02-29', '2016-02-29', '2015-12-31', '2015-04-31',
+                  'XS', 'S', 'M', 'L', 'XL', 'LP', 'MR', 'Paris', 'Lyon', 'Nowhere', '-', 'x1']
+        for _ in range(2000):
+            line = ' '.join(rng.choice(tokens) for _ in range(rng.randint(4, 6)))
+            self.assertEqual(_fields(parse_line(line)), _fields(legacy_parse_line(line)), line)
+
+    def test_parse_fields(self):
+        self.assertEqual(parse_fields('2015-02-01 S MR Paris Lyon'),
+                         ('2015-02-01', 'S', 'MR', 'Paris', 'Lyon'))
+        self.assertIsNone(parse_fields('bad input'))
+
+if __name__ == '__main__':
+    unittest.main()
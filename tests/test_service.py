@@ -0,0 +1,78 @@
+import asyncio
+import json
+import unittest
+from shipments.__main__ import process_lines
+from shipments.service import PricingService
+
+LINES = [f'2015-02-{i:02d} S MR Paris Lyon' for i in range(1, 15)] + [
+    '2015-02-01 L LP Paris Lyon', '2015-02-02 L LP Paris Lyon', '2015-02-03 L LP Paris Lyon',
+    'bad input', '2015-02-04 S MR Paris Nowhere',
+]
+
+
+class TestPricingService(unittest.TestCase):
+    def test_concurrent_requests_match_batch_run(self):
+        async def scenario():
+            service = PricingService(max_batch=4, max_delay=0.01)
+            batcher = asyncio.ensure_future(service.run())
+            try:
+                results = await asyncio.gather(*(service.price(line) for line in LINES))
+            finally:
+                batcher.cancel()
+            return results, service.batches
+
+        results, batches = asyncio.run(scenario())
+        # Requests are priced in arrival order, so the cap and free L count match a batch run
+        self.assertEqual(results, process_lines(LINES))
+        self.assertLess(batches, len(LINES))
+
+    def test_json_lines_over_tcp(self):
+        async def scenario():
+            service = PricingService(max_delay=0.001)
+            batcher = asyncio.ensure_future(service.run())
+            server = await asyncio.start_server(service.handle_client, '127.0.0.1', 0)
+            port = server.sockets[0].getsockname()[1]
+            try:
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+                for i, line in enumerate(LINES[:3]):
+                    writer.write(json.dumps({'id': i, 'line': line}).encode() + b'\n')
+                writer.write(b'not json\n')
+                await writer.drain()
+                responses = [json.loads(await reader.readline()) for _ in range(4)]
+                writer.close()
+            finally:
+                server.close()
+                batcher.cancel()
+            return responses
+
+        responses = asyncio.run(scenario())
+        results = {r['id']: r['result'] for r in responses if 'result' in r}
+        self.assertEqual([results[i] for i in range(3)], process_lines(LINES[:3]))
+        self.assertEqual(sum('error' in r for r in responses), 1)
+
+    def test_oversized_line_gets_an_error(self):
+        async def scenario():
+            service = PricingService(max_delay=0.001)
+            batcher = asyncio.ensure_future(service.run())
+            server = await asyncio.start_server(service.handle_client, '127.0.0.1', 0, limit=1024)
+            port = server.sockets[0].getsockname()[1]
+            try:
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+                writer.write(json.dumps({'id': 0, 'line': LINES[0]}).encode() + b'\n')
+                writer.write(json.dumps({'id': 1, 'line': 'x' * 4096}).encode() + b'\n')
+                await writer.drain()
+                responses = [json.loads(line) for line in (await reader.read()).splitlines()]
+                writer.close()
+            finally:
+                server.close()
+                batcher.cancel()
+            return responses
+
+        responses = asyncio.run(asyncio.wait_for(scenario(), 5))
+        # The request before the long line is answered, then the connection is closed
+        self.assertEqual(sorted(responses, key=lambda r: 'error' in r),
+                         [{'id': 0, 'result': process_lines(LINES[:1])[0]},
+                          {'id': None, 'error': 'Bad request: line too long'}])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import json
+import os
+import random
+import tempfile
+import unittest
+from collections import defaultdict
+from unittest import mock
+from benchmarks.generator import generate
+from helpers import run_cli
+from shipments.__main__ import process_lines
+from shipments.cities import CityRegistry, get_registry
+from shipments.config import load_cities
+from shipments.money import to_cents
+from shipments.tables import RuleTables
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+if numpy is not None:
+    from shipments.simulate import main, parse_tariffs, simulate
+
+CITIES = ['Paris', 'Lyon', 'Marseille', 'Nice', 'Dijon', 'Albi', 'Nowhere']
+
+
+def random_tariff(rng: random.Random, name: str):
+    return {
+        'name': name,
+        'price_table': {provider: {size: round(rng.uniform(0.5, 10), 2) for size in ('XS', 'S', 'M', 'L', 'XL')}
+                        for provider in ('LP', 'MR')},
+        'monthly_discount_cap': rng.choice([0, 2.5, 10, 25]),
+        'popular_pairs_discounts': [[rng.choice(CITIES), rng.choice(CITIES), round(rng.uniform(0, 2), 2)]
+                                    for _ in range(rng.randint(0, 6))],
+    }
+
+
+def rule_class_totals(lines, tariff):
+    # Runs the rule classes with the tariff patched into the configuration they read
+    registry = get_registry()
+    if tariff.popular_pairs_discounts is not None:
+        cities = load_cities()
+        registry = CityRegistry.from_config(cities['big'], cities['small'],
+                                            tariff.popular_pairs_discounts)
+    prices = {provider: {size: to_cents(price) for size, price in sizes.items()}
+              for provider, sizes in tariff.price_table.items()}
+    with mock.patch('shipments.config.PRICE_TABLE_CENTS', prices), \
+            mock.patch('shipments.config.get_registry', return_value=registry), \
+            mock.patch('shipments.rules.get_registry', return_value=registry), \
+            mock.patch('shipments.rules.get_tables', return_value=RuleTables(tariff.price_table)), \
+            mock.patch('shipments.rules.MONTHLY_DISCOUNT_CAP_CENTS', to_cents(tariff.monthly_discount_cap)):
+        results = process_lines(lines)
+    totals = defaultdict(lambda: [0, 0])
+    for result in results:
+        parts = result.split()
+        if parts[-1] != 'Ignored':
+            month = totals[tuple(parts[0].split('-')[:2])]
+            month[0] += to_cents(float(parts[5]))
+            month[1] += 0 if parts[6] == '-' else to_cents(float(parts[6]))
+    return {month: tuple(amounts) for month, amounts in totals.items()}
+
+
+@unittest.skipUnless(numpy, 'numpy is not installed')
+class TestTariffSimulation(unittest.TestCase):
+    def test_matches_rule_classes(self):
+        rng = random.Random(4)
+        tariffs = parse_tariffs([{'name': 'current'}] + [random_tariff(rng, f't{i}') for i in range(6)])
+        for seed in range(3):
+            lines = list(generate(1500, seed=seed, months=3))
+            if not seed:
+                random.Random(seed).shuffle(lines)  # Not in date order
+            results = simulate(lines, tariffs)
+            for t, tariff in enumerate(tariffs):
+                with self.subTest(seed=seed, tariff=tariff.name):
+                    self.assertEqual({month: tuple(totals[t]) for month, totals in results.items()},
+                                     rule_class_totals(lines, tariff))
+
+    def test_month_blocks(self):
+        # Blocks smaller than a month carry the running cap totals over
+        rng = random.Random(5)
+        tariffs = parse_tariffs([{'name': 'current'}] + [random_tariff(rng, f't{i}') for i in range(3)])
+        lines = list(generate(2000, seed=5, months=2))
+        expected = simulate(lines, tariffs)
+        with mock.patch('shipments.simulate.BLOCK_CELLS', 7):
+            self.assertEqual(simulate(lines, tariffs), expected)
+
+    def test_default_pairs_come_from_the_registry(self):
+        # With $SHIPMENTS_CITY_INDEX the registry's pairs can differ from POPULAR_PAIRS_DISCOUNTS
+        cities = load_cities()
+        registry = CityRegistry.from_config(cities['big'], cities['small'], {('Paris', 'Nice'): 0.5})
+        lines = ['2015-02-01 S MR Paris Nice', '2015-02-02 S MR Paris Lyon']
+        with mock.patch('shipments.simulate.get_registry', return_value=registry):
+            results = simulate(lines, parse_tariffs([{'name': 'current'}]))
+        self.assertEqual(results, {('2015', '02'): [(100 + 150, 100 + 50)]})
+
+    def test_invalid_tariffs(self):
+        for data in ([], [{'price_table': {'XX': {'S': 1}}}], [{'monthly_cap': 5}]):
+            with self.subTest(data=data), self.assertRaises(ValueError):
+                parse_tariffs(data)
+
+    def test_cli(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            tariffs = os.path.join(tmp, 'tariffs.json')
+            with open(tariffs, 'w') as f:
+                json.dump([{'name': 'current'}, {'name': 'dear-m', 'price_table': {'MR': {'M': 5}}}], f)
+            output = run_cli(['2015-02-01 S MR Paris Lyon', '2015-02-02 M MR Paris Dijon'], [tariffs], main)
+        self.assertEqual(output, ['current 2015-02 5.00 1.00', 'dear-m 2015-02 7.00 1.00'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import os
+import subprocess
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cold-start budget for importing the CLI entry point, best of RUNS fresh interpreters.
+# Currently ~35 ms, so the budget catches a 2x regression; importing numpy alone costs
+# several times that. Slow CI machines can raise it with SHIPMENTS_STARTUP_BUDGET_MS.
+BUDGET_MS = float(os.environ.get('SHIPMENTS_STARTUP_BUDGET_MS', 70))
+RUNS = 5
+
+# Modules the plain text pipeline must not import at startup
+HEAVY_MODULES = ('numpy', 'asyncio', 'concurrent.futures', 'sqlite3', 'datetime', '_strptime', 'json', 'csv',
+                 'shipments.vectorized', 'shipments.parallel', 'shipments.checkpoint', 'shipments.binary',
+                 'shipments.instrumentation', 'shipments.service', 'shipments.compiler')
+
+
+def python(*args: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, *args], capture_output=True, text=True, check=True, cwd=ROOT)
+
+
+def import_time_us(module: str) -> int:
+    """
+    Cumulative import time of module in a fresh interpreter, from python -X importtime.
+    """
+    stderr = python('-X', 'importtime', '-c', f'import {module}').stderr
+    for line in stderr.splitlines():
+        fields = line.split('|')
+        if len(fields) == 3 and fields[2].strip() == module:
+            return int(fields[1])
+    raise AssertionError(f'{module} not found in -X importtime output')
+
+
+class TestStartup(unittest.TestCase):
+    def test_import_time_budget(self):
+        best_ms = min(import_time_us('shipments.__main__') for _ in range(RUNS)) / 1000
+        self.assertLess(best_ms, BUDGET_MS, f'importing shipments.__main__ took {best_ms:.1f} ms')
+
+    def test_no_heavy_imports_or_file_io(self):
+        code = ('import sys, shipments.__main__, shipments.config as config\n'
+                'print(sorted(m for m in sys.argv[1:] if m in sys.modules))\n'
+                'print(config.load_cities.cache_info().currsize)\n')
+        loaded, cities_loaded = python('-c', code, *HEAVY_MODULES).stdout.split('\n')[:2]
+        self.assertEqual(loaded, '[]')
+        self.assertEqual(cities_loaded, '0')  # cities.json is read on first use, not at import
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import os
+import random
+import unittest
+from unittest import mock
+from benchmarks.generator import generate
+from shipments.__main__ import process_lines
+from helpers import run_cli
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+if numpy is not None:
+    from shipments import vectorized
+    from shipments.vectorized import (process_blocks_vectorized, process_lines_vectorized,
+                                      process_stream_vectorized)
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+# Invalid lines and lines that do not fit the byte-level engine's fixed-width window
+ODD_LINES = ['', 'garbage line', '  2015-02-01 S MR Paris Lyon', '2015-02-01 S MR Paris Lyon  ',
+             '2015-02-30 S MR Paris Lyon', '2015-13-01 S MR Paris Lyon', '2015-2-01 S MR Paris Lyon', '2015-02-01',
+             '2015-02-01 ' + 'x' * 60,
+             '2015-02-01 S MR Paris Lyon' + ' ' * 40, '2015-02-01 S MR Zürich Lyon', 'Zürich 2015-02-01 S MR',
+             '2015-02-01 S MR Paris\tLyon', 'x' * 120]
+
+
+@unittest.skipUnless(numpy, 'numpy is not installed')
+class TestVectorizedEngine(unittest.TestCase):
+    def test_matches_scalar_on_input_file(self):
+        with open(os.path.join(ROOT, 'input.txt')) as f:
+            lines = f.readlines()
+        self.assertEqual(process_lines_vectorized(lines), process_lines(lines))
+
+    def test_matches_scalar_on_random_input(self):
+        for seed in range(5):
+            lines = list(generate(3000, seed=seed, months=3))
+            if seed % 2:
+                random.Random(seed).shuffle(lines)  # Not in date order
+            with self.subTest(seed=seed):
+                self.assertEqual(process_lines_vectorized(lines), process_lines(lines))
+
+    def test_matches_scalar_across_chunks(self):
+        # Monthly counters and the cap must carry over from one chunk to the next
+        lines = list(generate(2000, seed=7, months=3))
+        self.assertEqual(list(process_stream_vectorized(lines, chunk_size=37)), process_lines(lines))
+
+    def test_monthly_cap_partial_discount(self):
+        lines = ['2015-02-01 XS MR Paris Lyon'] * 60 + ['2015-02-02 S MR Paris Nice'] * 5
+        self.assertEqual(process_lines_vectorized(lines), process_lines(lines))
+
+    def test_ignored_lines(self):
+        lines = ['2015-02-01 S MR Paris Nowhere', 'bad input', '2015-02-01 L LP Nowhere Lyon']
+        self.assertEqual(process_lines_vectorized(lines), process_lines(lines))
+
+    def test_unusual_spacing(self):
+        # Lines are split on any whitespace; remembered dates and route texts must not accept more
+        lines = ['2015-02-01 S MR Paris Lyon', ' 2015-02-01 S MR Paris Lyon', '2015-02-01\tS MR Paris Lyon',
+                 '2015-02-01  S MR  Paris Lyon ', '2015-02-01XS MR Paris Lyon', '2015-02-011 S MR Paris Lyon',
+                 '2015-02-01 S MR Paris Lyon extra', '2015-02-01 S MR Paris Lyon\n', '2015-02-01 S MR Paris Nowhere ']
+        self.assertEqual(process_lines_vectorized(lines * 2), process_lines(lines * 2))
+
+    def block_output(self, lines, block_size=1 << 20):
+        data = ''.join(line + '\n' for line in lines).encode()
+        blocks, start = [], 0
+        while start < len(data):
+            end = data.index(b'\n', min(start + block_size, len(data)) - 1) + 1
+            blocks.append(data[start:end])
+            start = end
+        return b''.join(process_blocks_vectorized(blocks)).decode().splitlines()
+
+    def test_blocks_match_scalar(self):
+        for seed in range(3):
+            lines = list(generate(3000, seed=seed, months=3)) + ODD_LINES
+            random.Random(seed).shuffle(lines)
+            for block_size in (1 << 20, 997):
+                with self.subTest(seed=seed, block_size=block_size):
+                    self.assertEqual(self.block_output(lines, block_size), process_lines(lines))
+
+    def test_blocks_with_hash_collisions(self):
+        # Texts that share a hash must still be told apart word by word
+        lines = list(generate(500, seed=3, months=2)) + ODD_LINES
+        with mock.patch.object(vectorized, 'HASH_MULTIPLIERS', [0] * len(vectorized.HASH_MULTIPLIERS)):
+            self.assertEqual(self.block_output(lines, 2000), process_lines(lines))
+
+    def test_main_numpy_engine(self):
+        lines = list(generate(500, seed=4, months=2)) + ODD_LINES
+        for newline in ('', '\r'):  # \r\n line breaks
+            with self.subTest(newline=newline):
+                crlf = [line + newline for line in lines]
+                self.assertEqual(run_cli(crlf, ['--engine', 'numpy']), run_cli(crlf))
+
+
+if __name__ == '__main__':
+    unittest.main()